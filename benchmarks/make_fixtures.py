@@ -0,0 +1,235 @@
+"""Build (or record) the offline fixtures used by the benchmark suite.
+
+Default mode renders Basketball-Reference pages in the site's markup from the
+salary rows already in data/raw/bbr, and stats.nba.com payloads in the
+resultSets wire format, with seeded synthetic numbers. `--record` replaces
+them with live downloads instead.
+
+    python benchmarks/make_fixtures.py [--record]
+"""
+from __future__ import annotations
+import argparse
+import html
+import json
+import random
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+TEAM, YEAR, SEASON, TEAM_ID = "BOS", 2025, "2024-25", 1610612738
+
+LEAGUEGAMELOG_HEADERS = [
+    "SEASON_ID", "TEAM_ID", "TEAM_ABBREVIATION", "TEAM_NAME", "GAME_ID", "GAME_DATE", "MATCHUP", "WL", "MIN",
+    "FGM", "FGA", "FG_PCT", "FG3M", "FG3A", "FG3_PCT", "FTM", "FTA", "FT_PCT", "OREB", "DREB", "REB", "AST",
+    "STL", "BLK", "TOV", "PF", "PTS", "PLUS_MINUS", "VIDEO_AVAILABLE",
+]
+PLAYERSTATS_HEADERS = [
+    "PLAYER_ID", "PLAYER_NAME", "NICKNAME", "TEAM_ID", "TEAM_ABBREVIATION", "AGE", "GP", "W", "L", "W_PCT", "MIN",
+    "FGM", "FGA", "FG_PCT", "FG3M", "FG3A", "FG3_PCT", "FTM", "FTA", "FT_PCT", "OREB", "DREB", "REB", "AST", "TOV",
+    "STL", "BLK", "BLKA", "PF", "PFD", "PTS", "PLUS_MINUS", "NBA_FANTASY_PTS", "DD2", "TD3",
+]
+# Filler standing in for the rest of a real team page (nav, other tables, scripts).
+FILLER = '<div class="filler">' + '<p>Lorem ipsum <a href="/x">link</a> dolor sit amet.</p>' * 2500 + "</div>"
+
+
+def _players():
+    path = ROOT / "data" / "raw" / "bbr" / f"salaries_{YEAR}_{TEAM}.jsonl"
+    return [json.loads(line) for line in path.open(encoding="utf-8") if line.strip()]
+
+
+def _player_td(r, tag="td"):
+    pid, name = r["player_id"], html.escape(r["player"])
+    return (
+        f'<{tag} class="left " data-append-csv="{pid}" data-stat="player" csk="{pid}" >'
+        f'<a href="/players/{pid[0]}/{pid}.html">{name}</a></{tag}>'
+    )
+
+
+def render_team_page(rows) -> str:
+    roster = "".join(
+        f'<tr ><th scope="row" class="center " data-stat="number" >{i}</th>{_player_td(r)}'
+        f'<td class="center " data-stat="pos" >{"GFC"[i % 3]}</td><td class="right " data-stat="height" csk="77.0" >6-5</td>'
+        f'<td class="right " data-stat="weight" >{200 + i}</td><td class="left " data-stat="birth_date" csk="19980919" >September 19, 1998</td>'
+        f'<td class="center " data-stat="flag" ><span class="f-i f-us">us</span></td>'
+        f'<td class="right " data-stat="years_experience" >{i % 10 or "R"}</td>'
+        f'<td class="left " data-stat="college" ><a href="/friv/colleges.fcgi?college=duke">Duke</a></td></tr>'
+        for i, r in enumerate(rows)
+    )
+    salaries = "".join(
+        f'<tr ><th scope="row" class="right " data-stat="ranker" >{i + 1}</th>{_player_td(r)}'
+        f'<td class="right " data-stat="salary" csk="{r["salary"] if r["salary"] is not None else ""}" >{r["salary_text"]}</td></tr>'
+        for i, r in enumerate(rows)
+    )
+    return (
+        f"<html><head><title>{YEAR} {TEAM}</title></head><body>{FILLER}"
+        '<div id="all_roster" class="table_wrapper"><div class="table_container" id="div_roster">'
+        '<table class="sortable stats_table" id="roster"><caption>Roster Table</caption>'
+        '<thead><tr><th data-stat="number" scope="col">No.</th><th data-stat="player" scope="col">Player</th></tr></thead>'
+        f"<tbody>{roster}</tbody></table></div></div>"
+        '<div id="all_salaries2" class="table_wrapper setup_commented commented">\n<div class="placeholder"></div>\n<!--\n'
+        '<div class="table_container" id="div_salaries2"><table class="sortable stats_table" id="salaries2"><caption>Salaries Table</caption>'
+        '<thead><tr><th data-stat="ranker" scope="col">Rk</th><th data-stat="player" scope="col">Player</th><th data-stat="salary" scope="col">Salary</th></tr></thead>'
+        f"<tbody>{salaries}</tbody></table></div>\n-->\n</div>{FILLER}</body></html>"
+    )
+
+
+def render_contracts_page(rows) -> str:
+    body = []
+    for i, r in enumerate(rows):
+        amount = r["salary"] or 1_157_153
+        years = i % 5 + 1
+        tds = []
+        for y in range(1, 7):
+            if y > years:
+                tds.append(f'<td class="right iz" data-stat="y{y}" ></td>')
+                continue
+            cls = " salary-pl" if i % 7 == 3 and y == years else " salary-tm" if i % 7 == 5 and y == years else ""
+            text = f"${amount:,}"
+            if i % 6 == 4 and y == 2:
+                text = f"<em>{text}</em>"
+            tds.append(f'<td class="right{cls}" data-stat="y{y}" csk="{amount}" >{text}</td>')
+        body.append(
+            f'<tr >{_player_td(r, "th")}<td class="right " data-stat="age_today" >{22 + i % 12}</td>{"".join(tds)}'
+            f'<td class="right " data-stat="remain_gtd" csk="{amount * years}" >${amount * years:,}</td></tr>'
+        )
+    head = "".join(f'<th data-stat="y{y}" scope="col" class=" poptip right" >{YEAR + y - 1}-{(YEAR + y) % 100:02d}</th>' for y in range(1, 7))
+    return (
+        f"<html><head><title>{TEAM} contracts</title></head><body>{FILLER}"
+        '<div id="all_contracts" class="table_wrapper">\n<!--\n<div class="table_container">'
+        '<table class="sortable stats_table" id="contracts"><caption>Contracts</caption>'
+        '<thead><tr class="over_header"><th></th><th colspan="8">Salary</th></tr>'
+        f'<tr><th data-stat="player" scope="col">Player</th><th data-stat="age_today" scope="col">Age</th>{head}'
+        '<th data-stat="remain_gtd" scope="col">Guaranteed</th></tr></thead>'
+        f'<tbody>{"".join(body)}</tbody></table></div>\n-->\n</div></body></html>'
+    )
+
+
+def _result_set(resource, params, name, headers, rows):
+    return {"resource": resource, "parameters": params, "resultSets": [{"name": name, "headers": headers, "rowSet": rows}]}
+
+
+def render_leaguegamelog(rng: random.Random):
+    """A full 82-game league schedule (circle-method rounds) with rating-driven scores."""
+    from nba_api.stats.static import teams
+
+    league = sorted(teams.get_teams(), key=lambda t: t["id"])
+    rating = {t["id"]: rng.gauss(0, 5) for t in league}
+    ids = [t["id"] for t in league]
+    abbr = {t["id"]: t["abbreviation"] for t in league}
+    name = {t["id"]: t["full_name"] for t in league}
+    start = date(2024, 10, 22)
+    rows, game_no = [], 0
+    for rnd in range(82):
+        day = start + timedelta(days=2 * rnd)
+        order = [ids[0]] + ids[1:][rnd % 29:] + ids[1:][:rnd % 29]
+        for i in range(15):
+            home, away = order[i], order[29 - i]
+            if (rnd + i) % 2:
+                home, away = away, home
+            game_no += 1
+            margin = round(rng.gauss(rating[home] - rating[away] + 2.5, 12))
+            margin = margin or 1
+            home_pts = int(112 + margin / 2 + rng.gauss(0, 4))
+            away_pts = home_pts - margin
+            for tid, opp, pts, opp_pts, sep in ((home, away, home_pts, away_pts, "vs."), (away, home, away_pts, home_pts, "@")):
+                fga, fg3a, fta = rng.randint(80, 95), rng.randint(35, 50), rng.randint(15, 30)
+                fgm, fg3m, ftm = int(fga * 0.47), int(fg3a * 0.37), int(fta * 0.8)
+                oreb, dreb = rng.randint(6, 14), rng.randint(30, 40)
+                rows.append([
+                    "22024", tid, abbr[tid], name[tid], f"00224{game_no:05d}", day.isoformat(),
+                    f"{abbr[tid]} {sep} {abbr[opp]}", "W" if pts > opp_pts else "L", 240, fgm, fga, round(fgm / fga, 3),
+                    fg3m, fg3a, round(fg3m / fg3a, 3), ftm, fta, round(ftm / fta, 3), oreb, dreb, oreb + dreb,
+                    rng.randint(20, 32), rng.randint(4, 12), rng.randint(2, 9), rng.randint(8, 18), rng.randint(14, 24),
+                    pts, pts - opp_pts, 1,
+                ])
+    return _result_set(
+        "leaguegamelog",
+        {"Season": SEASON, "PlayerOrTeam": "T", "SeasonType": "Regular Season"},
+        "LeagueGameLog", LEAGUEGAMELOG_HEADERS, rows,
+    )
+
+
+def render_teamgamelog(league_payload):
+    """BOS's TeamGameLog, derived from the league log so the two fixtures agree."""
+    from nba_gm_llm.sources.nba_api_client import TEAM_GAMELOG_FIELDS, league_to_team_gamelogs
+
+    rs = league_payload["resultSets"][0]
+    logs = league_to_team_gamelogs(dict(zip(rs["headers"], r)) for r in rs["rowSet"])
+    rows = [[r[f] for f in TEAM_GAMELOG_FIELDS] for r in logs[TEAM_ID]]
+    return _result_set("teamgamelog", {"TeamID": TEAM_ID, "Season": SEASON, "SeasonType": "Regular Season"}, "TeamGameLog", TEAM_GAMELOG_FIELDS, rows)
+
+
+def render_leaguedashplayerstats(rng: random.Random):
+    from nba_api.stats.static import players, teams
+
+    team_ids = [(t["id"], t["abbreviation"]) for t in teams.get_teams()]
+    rows = []
+    for i, p in enumerate(sorted(players.get_active_players(), key=lambda p: p["id"])):
+        tid, abbr = team_ids[i % len(team_ids)]
+        gp = rng.randint(5, 82)
+        mpg = rng.uniform(6, 38)
+        fga = mpg * rng.uniform(0.25, 0.6)
+        fg3a = fga * rng.uniform(0.1, 0.55)
+        fta = fga * rng.uniform(0.1, 0.4)
+        fgm, fg3m, ftm = fga * rng.uniform(0.38, 0.6), fg3a * rng.uniform(0.28, 0.42), fta * rng.uniform(0.6, 0.9)
+        oreb, dreb = mpg * rng.uniform(0.01, 0.08), mpg * rng.uniform(0.08, 0.25)
+        ast, tov = mpg * rng.uniform(0.03, 0.3), mpg * rng.uniform(0.02, 0.1)
+        stl, blk = mpg * rng.uniform(0.01, 0.05), mpg * rng.uniform(0.0, 0.06)
+        pts = 2 * (fgm - fg3m) + 3 * fg3m + ftm
+        w = rng.randint(0, gp)
+        rows.append([
+            p["id"], p["full_name"], p["first_name"], tid, abbr, rng.randint(19, 39), gp, w, gp - w, round(w / gp, 3),
+            round(mpg, 1), round(fgm, 1), round(fga, 1), round(fgm / fga, 3), round(fg3m, 1), round(fg3a, 1),
+            round(fg3m / fg3a, 3), round(ftm, 1), round(fta, 1), round(ftm / fta, 3), round(oreb, 1), round(dreb, 1),
+            round(oreb + dreb, 1), round(ast, 1), round(tov, 1), round(stl, 1), round(blk, 1), round(blk / 2, 1),
+            round(mpg / 12, 1), round(fta / 2, 1), round(pts, 1), round(rng.uniform(-8, 8), 1),
+            round(pts + 1.2 * (oreb + dreb) + 1.5 * ast, 1), rng.randint(0, 20), rng.randint(0, 3),
+        ])
+    return _result_set("leaguedashplayerstats", {"Season": SEASON, "PerMode": "PerGame"}, "LeagueDashPlayerStats", PLAYERSTATS_HEADERS, rows)
+
+
+def record() -> None:
+    import requests
+    from nba_api.stats.endpoints import leaguedashplayerstats, leaguegamelog, teamgamelog
+    from nba_gm_llm.config import DEFAULT_HEADERS
+
+    base = "https://www.basketball-reference.com"
+    for url, name in [(f"{base}/teams/{TEAM}/{YEAR}.html", f"bbr_team_{TEAM}_{YEAR}.html"), (f"{base}/contracts/{TEAM}.html", f"bbr_contracts_{TEAM}.html")]:
+        resp = requests.get(url, headers=DEFAULT_HEADERS, timeout=30)
+        resp.raise_for_status()
+        (FIXTURES / name).write_text(resp.text, encoding="utf-8")
+    lg = leaguegamelog.LeagueGameLog(season=SEASON, player_or_team_abbreviation="T").get_dict()
+    (FIXTURES / f"nba_leaguegamelog_{SEASON}.json").write_text(json.dumps(lg), encoding="utf-8")
+    gl = teamgamelog.TeamGameLog(team_id=TEAM_ID, season=SEASON).get_dict()
+    (FIXTURES / f"nba_teamgamelog_{SEASON}.json").write_text(json.dumps(gl), encoding="utf-8")
+    ps = leaguedashplayerstats.LeagueDashPlayerStats(season=SEASON).get_dict()
+    (FIXTURES / f"nba_leaguedashplayerstats_{SEASON}.json").write_text(json.dumps(ps), encoding="utf-8")
+
+
+def synthesize() -> None:
+    rows = _players()
+    rng = random.Random(2025)
+    (FIXTURES / f"bbr_team_{TEAM}_{YEAR}.html").write_text(render_team_page(rows), encoding="utf-8")
+    (FIXTURES / f"bbr_contracts_{TEAM}.html").write_text(render_contracts_page(rows), encoding="utf-8")
+    league = render_leaguegamelog(rng)
+    (FIXTURES / f"nba_leaguegamelog_{SEASON}.json").write_text(json.dumps(league), encoding="utf-8")
+    (FIXTURES / f"nba_teamgamelog_{SEASON}.json").write_text(json.dumps(render_teamgamelog(league)), encoding="utf-8")
+    (FIXTURES / f"nba_leaguedashplayerstats_{SEASON}.json").write_text(json.dumps(render_leaguedashplayerstats(rng)), encoding="utf-8")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--record", action="store_true", help="Download live pages/payloads instead of synthesizing")
+    args = parser.parse_args()
+    FIXTURES.mkdir(parents=True, exist_ok=True)
+    record() if args.record else synthesize()
+    for p in sorted(FIXTURES.iterdir()):
+        print(f"{p.name}: {p.stat().st_size:,} bytes")
+
+
+if __name__ == "__main__":
+    main()
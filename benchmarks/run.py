@@ -0,0 +1,278 @@
+"""Offline benchmark suite for the fetch, parse and corpus hot paths.
+
+Runs entirely against the fixtures in benchmarks/fixtures and a local
+stand-in server (see standin.py); nothing touches the real sites or data/.
+
+    python benchmarks/run.py                       # full suite
+    python benchmarks/run.py --latency 0.08 --error-rate 0.05
+    python benchmarks/run.py --compare benchmarks/results/<previous>.json
+
+Results are written as JSON to benchmarks/results/ (or --out). With
+--compare, metrics that regress by more than --threshold fail the run.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from statistics import median
+from typing import Any, Callable, Dict, List
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT = BENCH_DIR.parent
+SRC = ROOT / "src"
+FIXTURES = BENCH_DIR / "fixtures"
+RESULTS = BENCH_DIR / "results"
+sys.path.insert(0, str(SRC))
+sys.path.insert(0, str(BENCH_DIR))
+
+# Metrics where larger is better; everything else numeric is treated as lower-is-better.
+HIGHER_IS_BETTER = ("pages_per_s", "mb_per_s")
+
+
+class _FixtureResponse:
+    def __init__(self, text: str):
+        self.text = text
+        self.content = text.encode("utf-8")
+        self.encoding = "utf-8"
+        self.status_code = 200
+        self.headers: Dict[str, str] = {}
+
+    def raise_for_status(self) -> None:
+        pass
+
+
+class _FixtureSession:
+    """Stands in for requests.Session, answering from the fixture files."""
+
+    def __init__(self):
+        self.team = (FIXTURES / "bbr_team_BOS_2025.html").read_text(encoding="utf-8")
+        self.contracts = (FIXTURES / "bbr_contracts_BOS.html").read_text(encoding="utf-8")
+
+    def get(self, url: str, **kwargs) -> _FixtureResponse:
+        return _FixtureResponse(self.contracts if "/contracts/" in url else self.team)
+
+
+def _time(fn: Callable[[], Any], repeat: int) -> List[float]:
+    fn()  # warm-up
+    out = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        out.append(time.perf_counter() - t0)
+    return out
+
+
+def bench_parse(repeat: int) -> Dict[str, Any]:
+    from nba_gm_llm.cache import http_cache
+    from nba_gm_llm.ratelimit import limiter
+    from nba_gm_llm.scrapers import bbr
+
+    http_cache.enabled = False
+    limiter.set_rate("www.basketball-reference.com", 1e9, 10**9)
+    sess = _FixtureSession()
+    cases = {
+        "fetch_team_roster": (lambda: bbr.fetch_team_roster("BOS", 2025, session=sess), len(sess.team)),
+        "fetch_team_salaries": (lambda: bbr.fetch_team_salaries("BOS", 2025, session=sess), len(sess.team)),
+        "fetch_team_page": (lambda: bbr.fetch_team_page("BOS", 2025, session=sess), len(sess.team)),
+        "fetch_team_contracts": (lambda: bbr.fetch_team_contracts("BOS", session=sess), len(sess.contracts)),
+    }
+    out: Dict[str, Any] = {}
+    for name, (fn, size) in cases.items():
+        times = _time(fn, repeat)
+        med = median(times)
+        out[name] = {
+            "median_ms": round(med * 1000, 3),
+            "pages_per_s": round(1 / med, 1),
+            "mb_per_s": round(size / med / 1e6, 2),
+            "page_bytes": size,
+        }
+    return out
+
+
+def _cli_env(data_dir: Path, port: int) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": str(SRC),
+        "NBA_GM_DATA_DIR": str(data_dir),
+        "NBA_GM_BBR_BASE_URL": f"http://127.0.0.1:{port}",
+        "NBA_GM_STATS_BASE_URL": f"http://127.0.0.1:{port}/stats/{{endpoint}}",
+    })
+    return env
+
+
+def bench_fetch(latency: float, error_rate: float) -> Dict[str, Any]:
+    from standin import StandIn
+
+    commands = {
+        "bbr": ["--source", "bbr", "--season", "2025", "--what", "rosters", "--what", "salaries", "--what", "contracts"],
+        "nba_api": ["--source", "nba_api", "--season", "2024-25", "--what", "team_gamelogs"],
+        "nba_api_bulk": ["--source", "nba_api", "--season", "2024-25", "--what", "team_gamelogs", "--bulk"],
+    }
+    out: Dict[str, Any] = {}
+    for source, args in commands.items():
+        standin = StandIn(latency=latency, error_rate=error_rate)
+        server = standin.start()
+        with tempfile.TemporaryDirectory() as tmp:
+            cmd = [sys.executable, "-m", "nba_gm_llm.cli", "fetch", *args, "--no-cache"]
+            t0 = time.perf_counter()
+            proc = subprocess.run(cmd, env=_cli_env(Path(tmp), server.server_port), capture_output=True, text=True)
+            elapsed = time.perf_counter() - t0
+            files = list((Path(tmp) / "raw" / args[1]).glob("*.jsonl"))
+            out[source] = {
+                "wall_s": round(elapsed, 3),
+                "returncode": proc.returncode,
+                "requests": standin.counts["requests"],
+                "throttled": standin.counts["429"],
+                "bytes": standin.counts["bytes"],
+                "files": len(files),
+                "empty_files": sum(1 for f in files if f.stat().st_size == 0),
+            }
+            if proc.returncode:
+                out[source]["stderr_tail"] = proc.stderr[-2000:]
+        server.shutdown()
+    return out
+
+
+def _seed_corpus_inputs(data_dir: Path) -> None:
+    """Lay out a full league of team game logs and rosters from the fixtures."""
+    from nba_api.stats.static import teams
+
+    payload = json.loads((FIXTURES / "nba_teamgamelog_2024-25.json").read_text(encoding="utf-8"))
+    rs = payload["resultSets"][0]
+    nba_dir = data_dir / "raw" / "nba_api"
+    nba_dir.mkdir(parents=True, exist_ok=True)
+    with (nba_dir / "team_gamelogs_2024-25.jsonl").open("w", encoding="utf-8") as f:
+        for t in teams.get_teams():
+            for r in rs["rowSet"]:
+                row = dict(zip(rs["headers"], r))
+                row["Team_ID"] = row["TEAM_ID"] = t["id"]
+                f.write(json.dumps(row) + "\n")
+    bbr_dir = data_dir / "raw" / "bbr"
+    bbr_dir.mkdir(parents=True, exist_ok=True)
+    for src in (ROOT / "data" / "raw" / "bbr").glob("salaries_2025_*.jsonl"):
+        team = src.stem.split("_")[-1]
+        rows = [json.loads(line) for line in src.open(encoding="utf-8") if line.strip()]
+        with (bbr_dir / f"roster_2025_{team}.jsonl").open("w", encoding="utf-8") as f:
+            for r in rows:
+                f.write(json.dumps({"player": r["player"], "player_url": r["player_url"]}) + "\n")
+        (bbr_dir / src.name).write_bytes(src.read_bytes())
+
+
+def _corpus_child() -> None:
+    """Runs in a subprocess with NBA_GM_DATA_DIR set; prints one JSON line."""
+    import tracemalloc
+    from nba_gm_llm.build_corpus import build_corpus
+
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    build_corpus("2024-25", 2025)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    print(json.dumps({"wall_s": round(elapsed, 4), "peak_traced_mb": round(peak / 2**20, 2)}))
+
+
+def bench_corpus() -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        _seed_corpus_inputs(Path(tmp))
+        env = _cli_env(Path(tmp), 0)
+        proc = subprocess.run([sys.executable, __file__, "--child-corpus"], env=env, capture_output=True, text=True)
+        if proc.returncode:
+            return {"returncode": proc.returncode, "stderr_tail": proc.stderr[-2000:]}
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        result["docs"] = sum(1 for _ in (Path(tmp) / "corpus").rglob("*.md"))
+        return result
+
+
+def _git_sha() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def _flatten(d: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    for k, v in d.items():
+        key = f"{prefix}{k}"
+        if isinstance(v, dict):
+            out.update(_flatten(v, key + "."))
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            out[key] = float(v)
+    return out
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Return human-readable regressions beyond `threshold` (fractional)."""
+    cur, base = _flatten(current["results"]), _flatten(baseline["results"])
+    regressions = []
+    for key in sorted(cur.keys() & base.keys()):
+        if not any(key.endswith(s) for s in ("_ms", "_s", "_mb") + HIGHER_IS_BETTER) or base[key] == 0:
+            continue
+        ratio = cur[key] / base[key]
+        worse = ratio < 1 - threshold if key.endswith(HIGHER_IS_BETTER) else ratio > 1 + threshold
+        if worse:
+            regressions.append(f"{key}: {base[key]:g} -> {cur[key]:g} ({ratio:.2f}x)")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmarks for fetch/parse/corpus")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed iterations per parse case")
+    parser.add_argument("--latency", type=float, default=0.02, help="Stand-in latency per request (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of stand-in requests answered 429")
+    parser.add_argument("--only", nargs="*", choices=["parse", "fetch", "corpus"], help="Subset of benchmarks")
+    parser.add_argument("--out", type=Path, help="Result file (default: benchmarks/results/bench_<ts>_<sha>.json)")
+    parser.add_argument("--compare", type=Path, help="Previous result file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed fractional slowdown with --compare")
+    parser.add_argument("--child-corpus", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child_corpus:
+        _corpus_child()
+        return 0
+
+    only = set(args.only or ["parse", "fetch", "corpus"])
+    results: Dict[str, Any] = {}
+    if "parse" in only:
+        results["parse"] = bench_parse(args.repeat)
+    if "fetch" in only:
+        results["fetch"] = bench_fetch(args.latency, args.error_rate)
+    if "corpus" in only:
+        results["corpus"] = bench_corpus()
+
+    sha = _git_sha()
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    doc = {
+        "meta": {
+            "timestamp": stamp,
+            "git_sha": sha,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "latency": args.latency,
+            "error_rate": args.error_rate,
+        },
+        "results": results,
+    }
+    out = args.out or RESULTS / f"bench_{stamp}_{sha or 'nogit'}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(doc, indent=2), encoding="utf-8")
+    print(json.dumps(results, indent=2))
+    print(f"wrote {out}")
+
+    if args.compare:
+        regressions = compare(doc, json.loads(args.compare.read_text(encoding="utf-8")), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
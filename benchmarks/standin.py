@@ -0,0 +1,150 @@
+"""Local HTTP stand-in for basketball-reference.com and stats.nba.com.
+
+Serves the recorded fixtures for any team and can inject per-request latency
+and a fraction of 429 responses, so fetch paths can be timed offline:
+
+    python benchmarks/standin.py --port 8765 --latency 0.05 --error-rate 0.05
+
+Point the package at it with NBA_GM_BBR_BASE_URL=http://127.0.0.1:8765 and
+NBA_GM_STATS_BASE_URL=http://127.0.0.1:8765/stats/{endpoint}.
+"""
+from __future__ import annotations
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+
+class StandIn:
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.counts: Dict[str, int] = {"requests": 0, "429": 0, "304": 0, "bytes": 0}
+        self._lock = threading.Lock()
+        self._files: Dict[str, bytes] = {}
+
+    def fixture(self, pattern: str) -> bytes:
+        if pattern not in self._files:
+            self._files[pattern] = next(FIXTURES.glob(pattern)).read_bytes()
+        return self._files[pattern]
+
+    def route(self, path: str, query: Dict[str, str]) -> Tuple[int, bytes, str]:
+        if re.fullmatch(r"/teams/\w+/\d+\.html", path):
+            return 200, self.fixture("bbr_team_*.html"), "text/html; charset=utf-8"
+        if re.fullmatch(r"/contracts/\w+\.html", path):
+            return 200, self.fixture("bbr_contracts_*.html"), "text/html; charset=utf-8"
+        m = re.fullmatch(r"/stats/(\w+)", path)
+        if m:
+            endpoint = m.group(1).lower()
+            if endpoint == "leaguegamelog" and query.get("PlayerOrTeam", "T") != "T":
+                return 404, b"{}", "application/json"  # only the team log is recorded
+            files = list(FIXTURES.glob(f"nba_{endpoint}_*.json"))
+            if not files:
+                return 404, b"{}", "application/json"
+            payload = json.loads(self.fixture(files[0].name))
+            return 200, json.dumps(self.shape(endpoint, payload, query)).encode("utf-8"), "application/json"
+        return 404, b"not found", "text/plain"
+
+    @staticmethod
+    def shape(endpoint: str, payload: dict, query: Dict[str, str]) -> dict:
+        """Make the recorded payload answer the request: per-team ids and DateFrom filters."""
+        rs = payload["resultSets"][0]
+        headers, rows = rs["headers"], rs["rowSet"]
+        if endpoint == "teamgamelog" and query.get("TeamID"):
+            tid = int(query["TeamID"])
+            i = headers.index("Team_ID")
+            rows = [r[:i] + [tid] + r[i + 1:] for r in rows]
+        date_from = query.get("DateFrom")
+        if date_from and "GAME_DATE" in headers:
+            i = headers.index("GAME_DATE")
+            cutoff = datetime.strptime(date_from, "%m/%d/%Y")
+            rows = [r for r in rows if _parse_date(r[i]) >= cutoff]
+        return {**payload, "resultSets": [{**rs, "rowSet": rows}]}
+
+    def handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                if standin.latency:
+                    time.sleep(standin.latency)
+                parts = urlsplit(self.path)
+                query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+                with standin._lock:
+                    standin.counts["requests"] += 1
+                    throttle = standin.rng.random() < standin.error_rate
+                    if throttle:
+                        standin.counts["429"] += 1
+                if throttle:
+                    self._send(429, b"Too Many Requests", "text/plain", {"Retry-After": "1"})
+                    return
+                status, body, ctype = standin.route(parts.path, query)
+                etag = '"%s"' % hashlib.md5(body).hexdigest()
+                if status == 200 and self.headers.get("If-None-Match") == etag:
+                    with standin._lock:
+                        standin.counts["304"] += 1
+                    self._send(304, b"", ctype, {"ETag": etag})
+                    return
+                self._send(status, body, ctype, {"ETag": etag})
+
+            def _send(self, status, body, ctype, extra):
+                self.send_response(status)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                for k, v in extra.items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(body)
+                with standin._lock:
+                    standin.counts["bytes"] += len(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self, port: int = 0) -> ThreadingHTTPServer:
+        server = ThreadingHTTPServer(("127.0.0.1", port), self.handler())
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+def _parse_date(text: str) -> datetime:
+    for fmt in ("%b %d, %Y", "%Y-%m-%d", "%Y-%m-%dT%H:%M:%S"):
+        try:
+            return datetime.strptime(text.title() if fmt.startswith("%b") else text, fmt)
+        except ValueError:
+            continue
+    raise ValueError(text)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local stand-in for BBR and stats.nba.com")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    args = parser.parse_args()
+    server = StandIn(args.latency, args.error_rate).start(args.port)
+    print(f"stand-in listening on http://127.0.0.1:{server.server_port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
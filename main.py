@@ -27,16 +27,21 @@ def main() -> None:
     else:
         year = int(year_env)
 
+    # Answer from a running `cli serve` daemon or local data before scraping.
+    from nba_gm_llm.serve import local_contracts, local_player_stats, query  # type: ignore
+
     if task == "player_stats":
-        try:
-            from nba_gm_llm.sources import nba_api_client  # type: ignore
-        except ModuleNotFoundError:
-            print(
-                "Missing nba_api. Run: pip install -r requirements.txt\n"
-                "If using venv: PYTHONPATH=src .venv/bin/python main.py"
-            )
-            raise
-        stats_by_season: Dict[str, List[Dict[str, Any]]] = nba_api_client.fetch_active_players_stats_last_n_years(n=5)
+        stats_by_season: Dict[str, List[Dict[str, Any]]] = local_player_stats()
+        if not stats_by_season:
+            try:
+                from nba_gm_llm.sources import nba_api_client  # type: ignore
+            except ModuleNotFoundError:
+                print(
+                    "Missing nba_api. Run: pip install -r requirements.txt\n"
+                    "If using venv: PYTHONPATH=src .venv/bin/python main.py"
+                )
+                raise
+            stats_by_season = nba_api_client.fetch_active_players_stats_last_n_years(n=5)
         seasons = sorted(stats_by_season.keys())[::-1]
         latest = seasons[0]
         sample = stats_by_season[latest][:5]
@@ -48,18 +53,30 @@ def main() -> None:
         print(json.dumps(output, indent=2, ensure_ascii=False))
         return
 
-    # Default: contracts
-    try:
-        from nba_gm_llm.scrapers.bbr import fetch_team_contracts  # type: ignore
-    except ModuleNotFoundError as e:
-        print(
-            "Missing dependencies or src path. Try: 'pip install -r requirements.txt' and rerun.\n"
-            "If using a venv: 'PYTHONPATH=src .venv/bin/python main.py'"
-        )
-        raise
+    if task == "payroll":
+        entry = query("/payroll", {"year": year, "team": team})
+        if entry is None:
+            from dataclasses import asdict
+            from nba_gm_llm.processing.payroll import get_payroll_index  # type: ignore
 
-    # Contracts page gives current season forward; ignore year mismatch and trust page
-    res = fetch_team_contracts(team)
+            found = get_payroll_index().get(team, year)
+            entry = asdict(found) if found else {"team": team, "year": year, "payroll": None}
+        print(json.dumps(entry, indent=2))
+        return
+
+    # Default: contracts
+    res = query("/contracts", {"team": team}) or local_contracts(team)
+    if res is None:
+        try:
+            from nba_gm_llm.scrapers.bbr import fetch_team_contracts  # type: ignore
+        except ModuleNotFoundError as e:
+            print(
+                "Missing dependencies or src path. Try: 'pip install -r requirements.txt' and rerun.\n"
+                "If using a venv: 'PYTHONPATH=src .venv/bin/python main.py'"
+            )
+            raise
+        # Contracts page gives current season forward; ignore year mismatch and trust page
+        res = fetch_team_contracts(team)
     players = res.get("players", [])
 
     # Build dictionary: player -> {salary_text, years_remaining, status}
@@ -1,50 +1,201 @@
 from __future__ import annotations
-from pathlib import Path
-from typing import Dict, Any, List
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Any, Callable, Iterable, List, Sequence
+import hashlib
 import json
+import os
+import threading
+from .columnar import iter_rows
 from .config import RAW_DIR, CORPUS_DIR
+from .metrics import metrics
+from .storage import file_sha256, read_json, write_json
+from .processing.team_summaries import render_team_summary, team_summaries
+from .processing.player_profiles import player_profiles, render_player_profile
+from .processing.simulation import DEFAULT_SIMS, render_projections, season_projections
+from .warehouse import get_warehouse
 
+MANIFEST_PATH = CORPUS_DIR / "manifest.json"
+# Bump when a renderer's output format changes so every document is re-rendered.
+CORPUS_FORMAT_VERSION = 3
+# Below this many changed documents, rendering in-process beats pool startup.
+PARALLEL_MIN_DOCS = 64
+# Serializes manifest read-modify-write when pipeline stages build docs concurrently.
+_manifest_lock = threading.Lock()
 
-def _iter_jsonl(path: Path):
-    with path.open("r", encoding="utf-8") as f:
-        for line in f:
-            if line.strip():
-                yield json.loads(line)
 
+@dataclass
+class DocJob:
+    """One output document: where it goes, how to render it, and the inputs it depends on."""
 
-def build_team_summaries(season: str):
+    path: str  # relative to CORPUS_DIR
+    group: str  # builder scope used for orphan cleanup, e.g. "team_summaries/2024-25"
+    render: Callable[..., str]  # module-level so jobs pickle into worker processes
+    inputs: Dict[str, Any]  # keyword arguments for `render`; also what gets hashed
+
+    def digest(self) -> str:
+        h = hashlib.sha256()
+        h.update(f"{CORPUS_FORMAT_VERSION}:{self.render.__module__}.{self.render.__qualname__}\n".encode())
+        h.update(json.dumps(self.inputs, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8"))
+        return h.hexdigest()
+
+
+def _write_doc(job: DocJob) -> str:
+    out = CORPUS_DIR / job.path
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(job.render(**job.inputs), encoding="utf-8")
+    return job.path
+
+
+def build_docs(jobs: Sequence[DocJob], groups: Iterable[str], workers: int | None = None) -> Dict[str, int]:
+    """Render only documents whose input hash changed; delete orphans within `groups`.
+
+    The manifest at data/corpus/manifest.json maps each document path to its
+    group and input hash. Returns counts of rendered, unchanged and deleted docs.
+    """
+    with _manifest_lock:
+        manifest: Dict[str, Dict[str, str]] = read_json(MANIFEST_PATH, {}) or {}
+    groups = set(groups)
+    todo: List[DocJob] = []
+    digests: Dict[str, str] = {}
+    for job in jobs:
+        digest = digests[job.path] = job.digest()
+        entry = manifest.get(job.path)
+        if entry is None or entry.get("hash") != digest or not (CORPUS_DIR / job.path).exists():
+            todo.append(job)
+
+    with metrics.span("corpus.render"):
+        if len(todo) >= PARALLEL_MIN_DOCS and (workers or os.cpu_count() or 1) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(_write_doc, todo, chunksize=max(1, len(todo) // (4 * (workers or os.cpu_count() or 1)))))
+        else:
+            for job in todo:
+                _write_doc(job)
+
+    live = {job.path for job in jobs}
+    deleted = 0
+    with _manifest_lock:
+        manifest = read_json(MANIFEST_PATH, {}) or {}
+        for path, entry in list(manifest.items()):
+            if entry.get("group") in groups and path not in live:
+                (CORPUS_DIR / path).unlink(missing_ok=True)
+                del manifest[path]
+                deleted += 1
+        for job in jobs:
+            manifest[job.path] = {"group": job.group, "hash": digests[job.path]}
+        write_json(MANIFEST_PATH, dict(sorted(manifest.items())))
+    metrics.incr("corpus.rendered", len(todo))
+    metrics.incr("corpus.unchanged", len(jobs) - len(todo))
+    metrics.incr("corpus.deleted", deleted)
+    return {"rendered": len(todo), "unchanged": len(jobs) - len(todo), "deleted": deleted}
+
+
+def render_roster_note(team: str, year: int, names: List[str]) -> str:
+    return "\n".join([f"# {team} Roster — {year}", "", *[f"- {n}" for n in names if n]])
+
+
+def team_summary_jobs(season: str, last_n: int = 10) -> List[DocJob]:
     # nba_api team logs if present
     src_path = RAW_DIR / "nba_api" / f"team_gamelogs_{season}.jsonl"
-    out_dir = CORPUS_DIR / season
-    out_dir.mkdir(parents=True, exist_ok=True)
-    if src_path.exists():
-        by_team: Dict[str, List[Dict[str, Any]]] = {}
-        for row in _iter_jsonl(src_path):
-            tid = str(row.get("TEAM_ID"))
-            by_team.setdefault(tid, []).append(row)
-        for tid, rows in by_team.items():
-            rows = sorted(rows, key=lambda r: r.get("GAME_DATE"))
-            # Simple summary
-            content = [f"# Team {tid} — Season {season}", "", "Recent Games:"]
-            for r in rows[-10:]:
-                content.append(f"- {r.get('GAME_DATE')}: {r.get('MATCHUP')} — {r.get('WL')} {r.get('PTS')} pts")
-            (out_dir / f"team_{tid}.md").write_text("\n".join(content), encoding="utf-8")
-
-
-def build_player_roster_notes(year: int):
-    src_dir = RAW_DIR / "bbr"
-    out_dir = CORPUS_DIR / str(year)
-    out_dir.mkdir(parents=True, exist_ok=True)
-    # Write one doc per team roster if present
-    for p in src_dir.glob(f"roster_{year}_*.jsonl"):
-        team = p.stem.split("_")[-1]
-        names = [row.get("player") or row.get("player_url", "") for row in _iter_jsonl(p)]
-        content = [f"# {team} Roster — {year}", "", *[f"- {n}" for n in names if n]]
-        (out_dir / f"roster_{team}.md").write_text("\n".join(content), encoding="utf-8")
-
-
-def build_corpus(season: str, year_for_bbr: int | None = None):
-    build_team_summaries(season)
-    if year_for_bbr:
-        build_player_roster_notes(year_for_bbr)
+    if not src_path.exists():
+        return []
+    # The summary is a pure function of the team's rows, so hashing it tracks input changes.
+    return [
+        DocJob(
+            f"{season}/team_{tid}.md", f"team_summaries/{season}", render_team_summary,
+            {"tid": tid, "season": season, "summary": summary, "last_n": last_n},
+        )
+        for tid, summary in team_summaries(src_path, last_n).items()
+    ]
+
+
+def render_season_projections(season: str, sims: int, seed: int, source: str) -> str:
+    model, rows = season_projections(RAW_DIR / "nba_api" / f"team_gamelogs_{season}.jsonl", season, source, sims, seed)
+    return render_projections(season, sims, round(model.home_court, 2), rows)
+
+
+def projection_job(season: str, sims: int = DEFAULT_SIMS, seed: int = 0) -> DocJob | None:
+    # Hashed inputs are the game logs' sha256, sims and seed; fitting and simulating happen in
+    # the renderer, so the manifest skips both when none of them changed.
+    src_path = RAW_DIR / "nba_api" / f"team_gamelogs_{season}.jsonl"
+    if not src_path.exists():
+        return None
+    return DocJob(
+        f"{season}/projections.md", f"projections/{season}", render_season_projections,
+        {"season": season, "sims": sims, "seed": seed, "source": file_sha256(src_path)},
+    )
 
+
+def roster_note_job(year: int, team: str) -> DocJob:
+    p = RAW_DIR / "bbr" / f"roster_{year}_{team}.jsonl"
+    names = [row.get("player") or row.get("player_url") or "" for row in iter_rows(p, ("player", "player_url"))]
+    return DocJob(f"{year}/roster_{team}.md", f"rosters/{year}", render_roster_note, {"team": team, "year": year, "names": names})
+
+
+def roster_note_jobs(year: int) -> List[DocJob]:
+    # One doc per team roster present
+    return [roster_note_job(year, p.stem.split("_")[-1]) for p in sorted((RAW_DIR / "bbr").glob(f"roster_{year}_*.jsonl"))]
+
+
+def _salaries_by_nba_id() -> Dict[int, List[Dict[str, Any]]]:
+    # BBR salaries keyed by nba_api PLAYER_ID: upsert the salary files and identity links into
+    # the warehouse (unchanged rows replace themselves) and let it do the join and the sums.
+    wh = get_warehouse()
+    wh.sync_raw("bbr", "salaries")
+    return {
+        pid: [{"year": r.year, "team": r.team, "salary": r.salary} for r in rows]
+        for pid, rows in wh.salaries_by_nba_id().items()
+    }
+
+
+def player_profile_jobs() -> List[DocJob]:
+    # One profile per player across every player_stats_{season}.jsonl on disk
+    paths = sorted((RAW_DIR / "nba_api").glob("player_stats_*.jsonl"))
+    profiles = player_profiles(paths)
+    if not profiles:
+        return []
+    salaries = _salaries_by_nba_id()
+    return [
+        DocJob(
+            f"players/player_{pid}.md", "players", render_player_profile,
+            {"profile": {**profile, "salaries": salaries.get(profile["player_id"], [])}},
+        )
+        for pid, profile in profiles.items()
+    ]
+
+
+def build_team_summaries(season: str, workers: int | None = None) -> Dict[str, int]:
+    return build_docs(team_summary_jobs(season), [f"team_summaries/{season}"], workers)
+
+
+def build_projections(season: str, sims: int = DEFAULT_SIMS, seed: int = 0) -> Dict[str, int]:
+    job = projection_job(season, sims, seed)
+    return build_docs([job] if job else [], [f"projections/{season}"], 1)
+
+
+def build_player_roster_notes(year: int, workers: int | None = None) -> Dict[str, int]:
+    return build_docs(roster_note_jobs(year), [f"rosters/{year}"], workers)
+
+
+def build_player_profiles(workers: int | None = None) -> Dict[str, int]:
+    return build_docs(player_profile_jobs(), ["players"], workers)
+
+
+def build_corpus(
+    season: str, year_for_bbr: int | None = None, workers: int | None = None, sims: int = DEFAULT_SIMS
+) -> Dict[str, int]:
+    with metrics.span("corpus.plan.team_summaries"):
+        jobs = team_summary_jobs(season)
+    with metrics.span("corpus.plan.players"):
+        jobs += player_profile_jobs()
+    groups = [f"team_summaries/{season}", "players"]
+    if sims:
+        with metrics.span("corpus.plan.projections"):
+            job = projection_job(season, sims)
+        jobs += [job] if job else []
+        groups.append(f"projections/{season}")
+    if year_for_bbr:
+        with metrics.span("corpus.plan.rosters"):
+            jobs += roster_note_jobs(year_for_bbr)
+        groups.append(f"rosters/{year_for_bbr}")
+    return build_docs(jobs, groups, workers)
@@ -0,0 +1,220 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Mapping
+from urllib.parse import urlencode
+import requests
+from .config import CACHE_DIR, CACHE_MAX_BYTES, CACHE_TTLS, DEFAULT_CACHE_TTL
+from .metrics import metrics
+from .ratelimit import limiter
+
+
+def cache_key(url: str, params: Mapping[str, Any] | None = None) -> str:
+    """Stable key from URL plus sorted params."""
+    q = urlencode(sorted((str(k), str(v)) for k, v in (params or {}).items()))
+    return hashlib.sha256(f"{url}?{q}".encode("utf-8")).hexdigest()
+
+
+def ttl_for(url: str) -> float:
+    for prefix, ttl in CACHE_TTLS.items():
+        if url.startswith(prefix):
+            return ttl
+    return DEFAULT_CACHE_TTL
+
+
+@dataclass
+class CachedResponse:
+    url: str
+    content: bytes
+    encoding: str
+    status_code: int = 200
+    from_cache: bool = False
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+
+class HttpCache:
+    """Size-bounded on-disk content cache with LRU eviction.
+
+    Bodies live zlib-compressed under `root/<k[:2]>/<k>`; a small SQLite index
+    tracks validators, freshness and last access for eviction.
+    """
+
+    def __init__(self, root: Path = CACHE_DIR / "http", max_bytes: int = CACHE_MAX_BYTES, enabled: bool = True):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "revalidated": 0, "stores": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.root.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(self.root / "index.sqlite"), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY, url TEXT, fetched_at REAL, last_access REAL,"
+                " etag TEXT, last_modified TEXT, encoding TEXT, size INTEGER)"
+            )
+        return self._db
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def _bump(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+        metrics.incr(f"cache.{name}")
+
+    def lookup(self, key: str) -> Dict[str, Any] | None:
+        with self._lock:
+            row = self.db.execute(
+                "SELECT url, fetched_at, etag, last_modified, encoding FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        path = self._path(key)
+        if not path.exists():
+            return None
+        url, fetched_at, etag, last_modified, encoding = row
+        return {"url": url, "fetched_at": fetched_at, "etag": etag, "last_modified": last_modified, "encoding": encoding, "path": path}
+
+    def read(self, entry: Dict[str, Any]) -> bytes | None:
+        """The cached body, or None if another thread evicted it since `lookup`."""
+        try:
+            return zlib.decompress(entry["path"].read_bytes())
+        except FileNotFoundError:
+            return None
+
+    def touch(self, key: str, refreshed: bool = False) -> None:
+        now = time.time()
+        with self._lock:
+            if refreshed:
+                self.db.execute("UPDATE entries SET fetched_at = ?, last_access = ? WHERE key = ?", (now, now, key))
+            else:
+                self.db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+            self.db.commit()
+
+    def store(self, key: str, url: str, content: bytes, encoding: str = "utf-8", etag: str | None = None, last_modified: str | None = None) -> None:
+        blob = zlib.compress(content, 6)
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Unique per writer: two threads storing the same key must not share a temp file.
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(blob)
+        tmp.replace(path)
+        now = time.time()
+        with self._lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, now, now, etag, last_modified, encoding, len(blob)),
+            )
+            self.db.commit()
+            self.stats["stores"] += 1
+        self.evict()
+
+    def evict(self) -> int:
+        """Drop least-recently-used entries until the cache fits `max_bytes`."""
+        removed = 0
+        with self._lock:
+            total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return 0
+            for key, size in self.db.execute("SELECT key, size FROM entries ORDER BY last_access").fetchall():
+                if total <= self.max_bytes:
+                    break
+                self._path(key).unlink(missing_ok=True)
+                self.db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                total -= size
+                removed += 1
+            self.db.commit()
+            self.stats["evictions"] += removed
+        return removed
+
+    def get(
+        self,
+        url: str,
+        session: requests.Session,
+        params: Mapping[str, Any] | None = None,
+        headers: Mapping[str, str] | None = None,
+        ttl: float | None = None,
+        timeout: float = 30,
+    ) -> CachedResponse:
+        """GET through the cache: fresh hit, conditional revalidation, or full fetch."""
+        key = cache_key(url, params)
+        entry = self.lookup(key) if self.enabled else None
+        # Read the body up front: an entry evicted before we get to it is a plain miss.
+        body = self.read(entry) if entry is not None else None
+        if body is None:
+            entry = None
+        ttl = ttl_for(url) if ttl is None else ttl
+        if entry is not None and time.time() - entry["fetched_at"] < ttl:
+            self._bump("hits")
+            self.touch(key)
+            return CachedResponse(url, body, entry["encoding"], from_cache=True)
+
+        req_headers = dict(headers or {})
+        if entry is not None:
+            if entry["etag"]:
+                req_headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                req_headers["If-Modified-Since"] = entry["last_modified"]
+        limiter.acquire(url)
+        with metrics.span("http.request"):
+            resp = session.get(url, params=params, headers=req_headers, timeout=timeout)
+        metrics.incr("http.bytes", len(resp.content))
+        if resp.status_code == 304 and entry is not None:
+            self._bump("revalidated")
+            self.touch(key, refreshed=True)
+            return CachedResponse(url, body, entry["encoding"], status_code=304, from_cache=True)
+        resp.raise_for_status()
+        self._bump("misses")
+        encoding = resp.encoding or "utf-8"
+        if self.enabled:
+            self.store(key, url, resp.content, encoding, resp.headers.get("ETag"), resp.headers.get("Last-Modified"))
+        return CachedResponse(url, resp.content, encoding, status_code=resp.status_code)
+
+    def cached_json(self, endpoint: str, params: Mapping[str, Any], fetch: Callable[[], Any], ttl: float | None = None) -> Any:
+        """Cache a JSON payload produced by `fetch()` (for clients that hide HTTP).
+
+        Without response headers there is nothing to revalidate against, so
+        these entries are TTL-only.
+        """
+        name = f"nba_api:{endpoint}"
+        key = cache_key(name, params)
+        ttl = ttl_for(name) if ttl is None else ttl
+        entry = self.lookup(key) if self.enabled else None
+        if entry is not None and time.time() - entry["fetched_at"] < ttl:
+            body = self.read(entry)
+            if body is not None:
+                self._bump("hits")
+                self.touch(key)
+                return json.loads(body)
+        self._bump("misses")
+        with metrics.span(f"http.{endpoint}"):
+            payload = fetch()
+        if self.enabled:
+            self.store(key, name, json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+        return payload
+
+    def summary(self) -> str:
+        s = self.stats
+        return f"cache: {s['hits']} hits, {s['revalidated']} revalidated, {s['misses']} misses, {s['evictions']} evicted"
+
+
+# Shared process-wide cache used by the scrapers and the nba_api client.
+http_cache = HttpCache()
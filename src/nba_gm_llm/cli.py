@@ -1,59 +1,93 @@
 from __future__ import annotations
-import json
+import time
+
+_T0 = time.perf_counter()
+
+import atexit
+import subprocess
+import sys
 from pathlib import Path
+from urllib.parse import urlsplit
 from typing import List
 import typer
 from rich import print
 
-from .config import RAW_DIR
-from .sources import nba_api_client
-from .scrapers import bbr
-from .storage import write_jsonl
-from .build_corpus import build_corpus
+from .config import RAW_DIR, PROC_DIR, BBR_BASE_URL, FETCH_WORKERS, SERVE_HOST, SERVE_PORT
+from .metrics import instrumented
+
+# Heavy dependencies (nba_api, requests, pandas, duckdb, pyarrow, numpy) are
+# imported inside the commands that use them, so e.g. `search` or `payroll`
+# does not pay for the scraping stack.
+HEAVY_MODULES = (
+    "requests", "numpy", "pandas", "pyarrow", "duckdb", "nba_api.stats.endpoints",
+    "nba_gm_llm.sources.nba_api_client", "nba_gm_llm.scrapers.bbr", "nba_gm_llm.build_corpus",
+    "nba_gm_llm.warehouse", "nba_gm_llm.retrieval.index", "nba_gm_llm.cli",
+)
 
 app = typer.Typer(help="NBA GM LLM — data fetch and corpus builder")
 
 
+@app.callback()
+def main(timings: bool = typer.Option(False, "--timings", help="Report CLI import and command wall time on exit")):
+    if timings:
+        started = time.perf_counter()
+
+        def report():
+            done = time.perf_counter()
+            print(
+                f"[dim]startup {1000 * (started - _T0):.0f} ms, command {1000 * (done - started):.0f} ms, "
+                f"{len(sys.modules)} modules loaded"
+            )
+
+        atexit.register(report)
+
+
+@app.command()
+def startup_report():
+    """Cold import time of each heavy module, each measured in a fresh interpreter."""
+    for mod in HEAVY_MODULES:
+        code = f"import time; t = time.perf_counter(); import {mod}; print(time.perf_counter() - t)"
+        res = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+        took = f"{1000 * float(res.stdout.strip()):7.0f} ms" if res.returncode == 0 else "  failed"
+        print(f"{took}  {mod}")
+
+
 @app.command()
 def fetch(
     source: str = typer.Option(..., help="nba_api or bbr"),
     season: str = typer.Option("2024-25", help="Season label, e.g., 2024-25 (nba_api) or year 2025 for BBR"),
     what: List[str] = typer.Option(
         ..., 
-        help="Items to fetch: nba_api: players,teams,team_gamelogs; bbr: rosters,team_gamelogs,salaries"
+        help="Items to fetch: nba_api: players,teams,team_gamelogs,player_gamelogs,player_stats; bbr: rosters,team_gamelogs,salaries,contracts"
     ),
+    workers: int = typer.Option(FETCH_WORKERS, help="Concurrent team fetches (BBR)"),
+    rate: float = typer.Option(0.0, help="Override BBR requests/second (0 = configured budget)"),
+    cache: bool = typer.Option(True, help="Use the on-disk HTTP cache under data/cache/"),
+    incremental: bool = typer.Option(False, help="team_gamelogs: append only games after each team's watermark"),
+    seasons: int = typer.Option(5, help="player_stats: number of recent seasons to backfill"),
+    bulk: bool = typer.Option(False, help="nba_api: use one league-wide LeagueGameLog request instead of per-team calls"),
+    fresh: bool = typer.Option(False, help="Ignore the fetch journal and refetch every unit"),
+    metrics_out: Path = typer.Option(None, "--metrics", help="Write stage timings and counters as JSON"),
+    prometheus: Path = typer.Option(None, help="Write metrics in Prometheus textfile-collector format"),
+    profile: Path = typer.Option(None, help="Run under cProfile and dump stats to this file"),
 ):
+    """Fetch raw data. A run that fails partway resumes on the next identical invocation (see `journal`)."""
+    with instrumented(metrics_out, prometheus, profile):
+        failed = _fetch(source, season, what, workers, rate, cache, incremental, seasons, bulk, fresh)
+    if failed:
+        raise typer.Exit(1)
+
+
+def _fetch(source, season, what, workers, rate, cache, incremental, seasons, bulk, fresh) -> int:
+    from .cache import http_cache
+    from .fetch import fetch_bbr, fetch_nba_api
+    from .ratelimit import limiter
+
     RAW_DIR.mkdir(parents=True, exist_ok=True)
+    http_cache.enabled = cache
     if source == "nba_api":
-        out_dir = RAW_DIR / "nba_api"
-        out_dir.mkdir(parents=True, exist_ok=True)
-        if "players" in what:
-            rows = nba_api_client.list_players(active_only=False)
-            write_jsonl(out_dir / f"players_{season}.jsonl", rows)
-            print(f"[green]Wrote players for {season}")
-        if "teams" in what:
-            rows = nba_api_client.list_teams()
-            write_jsonl(out_dir / f"teams_{season}.jsonl", rows)
-            print(f"[green]Wrote teams for {season}")
-        if "team_gamelogs" in what:
-            teams_rows = nba_api_client.list_teams()
-            tid_list = [t["id"] for t in teams_rows]
-            logs = nba_api_client.fetch_team_gamelogs(tid_list, season)
-            rows = []
-            for tid, lst in logs.items():
-                for r in lst:
-                    r["TEAM_ID"] = tid
-                    rows.append(r)
-            write_jsonl(out_dir / f"team_gamelogs_{season}.jsonl", rows)
-            print(f"[green]Wrote team logs for {season}")
-        if "player_stats" in what:
-            stats_by_season = nba_api_client.fetch_active_players_stats_last_n_years(n=5)
-            for seas, rows in stats_by_season.items():
-                write_jsonl(out_dir / f"player_stats_{seas}.jsonl", rows)
-            print(f"[green]Wrote player stats for seasons: {', '.join(stats_by_season.keys())}")
+        run = fetch_nba_api(season, what, incremental, seasons, bulk, fresh)
     elif source == "bbr":
-        out_dir = RAW_DIR / "bbr"
-        out_dir.mkdir(parents=True, exist_ok=True)
         # Allow special season labels for BBR
         try:
             year = int(season)
@@ -63,29 +97,415 @@ def fetch(
                 year = current_bbr_year()
             else:
                 raise
-        if "rosters" in what:
-            rosters = bbr.fetch_all_rosters(year)
-            for abbr, rows in rosters.items():
-                write_jsonl(out_dir / f"roster_{year}_{abbr}.jsonl", rows)
-            print(f"[green]Wrote rosters for {year}")
-        if "salaries" in what:
-            salaries = bbr.fetch_all_salaries(year)
-            for abbr, rows in salaries.items():
-                write_jsonl(out_dir / f"salaries_{year}_{abbr}.jsonl", rows)
-            print(f"[green]Wrote salaries for {year}")
+        if rate > 0:
+            limiter.set_rate(urlsplit(BBR_BASE_URL).netloc, rate)
+        run = fetch_bbr(year, what, workers, fresh)
         if "team_gamelogs" in what:
             print("[yellow]BBR team_gamelogs not yet implemented in scraper; skipping.")
     else:
         raise typer.BadParameter("source must be nba_api or bbr")
+    failed = _report_run(run)
+    if cache:
+        print(f"[blue]{http_cache.summary()}")
+    return failed
+
+
+def _report_run(run) -> int:
+    failed = run.finish()
+    done = len(run.pending) - len(failed)
+    resumed = f", {run.skipped} already done in the interrupted run" if run.skipped else ""
+    print(f"[green]Fetched {done} of {len(run.pending)} units{resumed}.")
+    for key, entry in failed[:10]:
+        print(f"[red]Failed {key} (attempt {entry['attempts']}): {entry['error']}")
+    if failed:
+        more = f" ({len(failed) - 10} more failures listed by `journal`)" if len(failed) > 10 else ""
+        print(f"[yellow]Re-run the same command to retry only the failed units{more}.")
+    return len(failed)
+
+
+@app.command()
+def refresh(
+    season: str = typer.Option("2024-25", help="nba_api season label"),
+    bbr_year: int = typer.Option(2025, help="BBR season year for rosters and salaries"),
+    source: List[str] = typer.Option(["nba_api", "bbr"], help="Sources to refresh"),
+    seasons: int = typer.Option(5, help="player_stats: number of recent seasons to backfill"),
+    workers: int = typer.Option(FETCH_WORKERS, help="Concurrent team fetches (BBR)"),
+    stage_workers: int = typer.Option(8, help="Pipeline stages that may run at once"),
+    rate: float = typer.Option(0.0, help="Override BBR requests/second (0 = configured budget)"),
+    cache: bool = typer.Option(True, help="Use the on-disk HTTP cache under data/cache/"),
+    fresh: bool = typer.Option(False, help="Ignore the fetch journal and refetch every unit"),
+    force: bool = typer.Option(False, help="Run processing stages even when their inputs are unchanged"),
+    metrics_out: Path = typer.Option(None, "--metrics", help="Write stage timings and counters as JSON"),
+    prometheus: Path = typer.Option(None, help="Write metrics in Prometheus textfile-collector format"),
+    profile: Path = typer.Option(None, help="Run under cProfile and dump stats to this file"),
+):
+    """Fetch every source concurrently, then update identity, payroll, corpus and index as inputs land."""
+    from .cache import http_cache
+    from .pipeline import Pipeline, refresh_stages
+    from .ratelimit import limiter
+
+    http_cache.enabled = cache
+    if rate > 0:
+        limiter.set_rate(urlsplit(BBR_BASE_URL).netloc, rate)
+    stages = refresh_stages(season, bbr_year, source, seasons, workers, fresh)
+    pipeline = Pipeline(stages, stage_workers, log=lambda msg: print(f"[dim]{msg}"))
+    with instrumented(metrics_out, prometheus, profile):
+        results = pipeline.run(force)
+    bad = [r for r in results.values() if r.status in ("failed", "blocked")]
+    for r in results.values():
+        color = "red" if r in bad else "green"
+        fanned = f" ({r.ran} run, {r.skipped} unchanged)" if r.ran or r.skipped else ""
+        print(f"[{color}]{r.name:<24} {r.status:<8} {r.seconds:6.1f}s{fanned}" + (f"  {r.error}" if r.error else ""))
+    if bad:
+        raise typer.Exit(1)
+
+
+@app.command()
+def journal(clear: bool = typer.Option(False, help="Forget every recorded run")):
+    """Show the fetch journal: runs in progress and the retry queue of failed units."""
+    from .journal import FetchJournal
+
+    j = FetchJournal()
+    if clear:
+        j.clear()
+        print("[green]Fetch journal cleared.")
+        return
+    for signature, run in j.runs.items():
+        states = [run["units"].get(k, {}).get("status", "pending") for k in run["planned"]]
+        state = "complete" if run.get("complete") else "incomplete"
+        print(f"{signature}: {state}, {states.count('done')}/{len(states)} units done")
+    for key, entry in j.retry_queue():
+        print(f"[red]{key} (attempt {entry['attempts']}): {entry['error']}")
+
+
+snapshot_app = typer.Typer(help="Snapshots of BBR rosters, salaries and contracts, and their diffs")
+app.add_typer(snapshot_app, name="snapshot")
+
+
+def _print_changes(changes, team: str | None = None) -> None:
+    for c in changes:
+        if team and team.upper() not in (c.get("team"), c.get("from_team")):
+            continue
+        where = f"{c['from_team']} -> {c['team']}" if c["change"] == "moved" else c["team"]
+        fields = "  ".join(f"{f}: {old} -> {new}" for f, (old, new) in c.get("fields", {}).items())
+        print(f"{c['entity']:<9} {where:<10} {c['change']:<15} {c['player'] or c['key']}  {fields}".rstrip())
+
+
+@snapshot_app.command("take")
+def snapshot_take():
+    """Snapshot the raw BBR files and append the changes since the last snapshot to the change log."""
+    from .snapshots import SnapshotStore
+
+    snap, changes = SnapshotStore().take()
+    if snap is None:
+        print("[yellow]Nothing changed since the last snapshot.")
+        return
+    print(f"[green]Snapshot {snap.id}: {len(snap.files)} files, {len(changes)} changes")
+    _print_changes(changes)
+
+
+@snapshot_app.command("list")
+def snapshot_list():
+    """Recorded snapshots, oldest first."""
+    from .snapshots import SnapshotStore
+
+    for snap in SnapshotStore().list():
+        print(f"{snap.id}  {snap.taken_at}  {len(snap.files)} files")
+
+
+@snapshot_app.command("diff")
+def snapshot_diff(
+    base: str = typer.Argument(None, help="Snapshot id or prefix (default: the second latest)"),
+    target: str = typer.Argument(None, help="Snapshot id or prefix (default: the latest)"),
+    team: str = typer.Option(None, help="Only changes involving this BBR team"),
+):
+    """Row-level changes between two snapshots."""
+    from .snapshots import SnapshotStore
+
+    store = SnapshotStore()
+    snaps = store.list()
+    try:
+        a = store.get(base) if base else (snaps[-2] if len(snaps) > 1 else None)
+        b = store.get(target) if target else (snaps[-1] if snaps else None)
+    except KeyError as e:
+        print(f"[red]{e.args[0]}")
+        raise typer.Exit(1)
+    if a is None or b is None:
+        print("[yellow]Need two snapshots to diff; run `snapshot take` after the next fetch.")
+        raise typer.Exit(1)
+    _print_changes(store.diff(a, b), team)
+
+
+@snapshot_app.command("affected")
+def snapshot_affected(since: str = typer.Option(None, help="Only changes recorded after this snapshot id")):
+    """Teams and players touched by the change log, as JSON."""
+    import json
+
+    from .snapshots import SnapshotStore
+
+    typer.echo(json.dumps(SnapshotStore().affected(since)))
+
+
+@app.command()
+def export_parquet(
+    source: str = typer.Option(None, help="nba_api or bbr (default: both)"),
+    entity: str = typer.Option(None, help="e.g. team_gamelogs, salaries, roster (default: all)"),
+    existing: str = typer.Option("replace", help="For partitions already on disk: replace, append or skip"),
+    batch_size: int = typer.Option(50_000, help="Rows per Arrow record batch"),
+):
+    """Stream raw JSONL into Hive-partitioned Parquet under data/processed/."""
+    from .processing.export import export_raw
+
+    totals = export_raw(source, entity, existing=existing, batch_size=batch_size)
+    for ent, n in totals.items():
+        print(f"[green]{ent}: {n} rows")
+
+
+warehouse_app = typer.Typer(help="DuckDB warehouse: keyed upserts and queries")
+app.add_typer(warehouse_app, name="warehouse")
+
+
+@warehouse_app.command("sync")
+def warehouse_sync(
+    source: str = typer.Option(None, help="nba_api or bbr (default: both)"),
+    parquet: bool = typer.Option(False, help="Load data/processed Parquet datasets instead of raw JSONL"),
+):
+    """Upsert raw data into the warehouse on natural keys."""
+    from .warehouse import TABLES, get_warehouse
+
+    wh = get_warehouse()
+    if parquet:
+        counts = {t: wh.load_parquet(t, PROC_DIR / t) for t in TABLES if (PROC_DIR / t).exists()}
+    else:
+        counts = wh.sync_raw(source)
+    for table, n in counts.items():
+        print(f"[green]{table}: {n:+d} rows")
+
+
+@warehouse_app.command("payrolls")
+def warehouse_payrolls(year: int = typer.Option(..., help="BBR season year, e.g. 2025")):
+    """Team payroll totals from the salaries table."""
+    from .warehouse import get_warehouse
+
+    for team, total in get_warehouse().team_payrolls(year).items():
+        print(f"{team}  ${total:,}")
+
+
+@warehouse_app.command("games")
+def warehouse_games(
+    season: str = typer.Option("2024-25"),
+    team_id: int = typer.Option(None, help="nba_api TEAM_ID (default: all teams)"),
+    n: int = typer.Option(10, help="Most recent games per team"),
+):
+    """Most recent games per team."""
+    from .warehouse import get_warehouse
+
+    for tid, games in get_warehouse().recent_games(season, n, team_id).items():
+        for g in games:
+            print(f"{tid} {g.game_date} {g.matchup} {g.wl} {g.pts}")
+
+
+@app.command()
+def payroll(
+    year: int = typer.Option(..., help="BBR season year, e.g. 2025 for 2024-25"),
+    team: str = typer.Option(None, help="BBR team abbreviation (default: league table)"),
+):
+    """Team payrolls, cap/tax/apron room and contract-status breakdown from the payroll index."""
+    from .processing.payroll import get_payroll_index
+
+    idx = get_payroll_index()
+    rows = [idx.get(team.upper(), year)] if team else idx.league(year)
+    rows = [r for r in rows if r]
+    if not rows:
+        print(f"[yellow]No payroll data for {team or 'any team'} in {year}.")
+        raise typer.Exit(1)
+    for r in rows:
+        room = "  ".join(f"{k} {v:+,}" for k, v in r.room.items() if v is not None)
+        print(f"{r.team}  ${r.payroll:,}  ({r.players} players)  {room}")
+        if team:
+            for status, amount in r.by_status.items():
+                if amount:
+                    print(f"  {status}: ${amount:,}")
+
+
+@app.command()
+def trades(
+    team: str = typer.Option(..., help="BBR team abbreviation sending the first package"),
+    shape: List[str] = typer.Option(["2x1", "3x2"], help="Package shapes as <team gives>x<partner gives>"),
+    partner: List[str] = typer.Option(None, help="Restrict to these partner teams (default: all)"),
+    status: List[str] = typer.Option(None, help="Only contracts with these statuses, e.g. guaranteed"),
+    max_years: int = typer.Option(None, help="Only contracts with at most this many years remaining"),
+    require: List[str] = typer.Option(None, help="BBR player_id(s) that must be in the outgoing package"),
+    k: int = typer.Option(20, help="Matches to print"),
+    workers: int = typer.Option(None, help="Search processes (default: CPU count)"),
+):
+    """Salary-legal trade packages between a team and every partner, closest salary match first."""
+    from .processing.trades import search_trades
+
+    shapes = [tuple(int(x) for x in sh.lower().split("x")) for sh in shape]
+    best: List = []
+    considered = 0
+    try:
+        for name, n, matches in search_trades(
+            team.upper(), shapes, partner or None, require or (), k, workers, statuses=status or None, max_years=max_years
+        ):
+            considered += n
+            best = sorted(best + matches, key=lambda m: (m.salary_gap, m.partner))[:k]
+            print(f"[dim]{name}: {len(matches)} matches from {n:,} package pairs")
+    except KeyError as e:
+        print(f"[red]{e.args[0]}")
+        raise typer.Exit(1)
+    for m in best:
+        print(
+            f"{m.team} sends {', '.join(m.outgoing)} (${m.outgoing_salary:,}) <-> {m.partner} sends "
+            f"{', '.join(m.incoming)} (${m.incoming_salary:,})  gap ${m.salary_gap:,}"
+        )
+    print(f"[green]{considered:,} package pairs considered.")
+
+
+@app.command()
+def comps(
+    player: List[str] = typer.Argument(None, help="Player names or nba_api PLAYER_IDs"),
+    season: str = typer.Option(None, help="Season of each queried player (default: their latest)"),
+    k: int = typer.Option(5, help="Comparables per player"),
+    pool_season: List[str] = typer.Option(None, help="Only comparables from these seasons"),
+    min_age: float = typer.Option(None, help="Only comparables at least this old that season"),
+    max_age: float = typer.Option(None, help="Only comparables at most this old that season"),
+    min_minutes: float = typer.Option(None, help="Only comparables with at least this MIN (season totals by default)"),
+    table: Path = typer.Option(None, help="Write the all-pairs comparables table as JSONL"),
+):
+    """Most similar player-seasons by per-season standardized rate stats, with BBR salaries."""
+    from .processing.comparables import get_comparables_index
+    from .storage import write_jsonl
+
+    idx = get_comparables_index()
+    if table:
+        pairs = list(idx.pairs_table(k))
+        write_jsonl(table, pairs)
+        print(f"[green]Wrote {len(pairs):,} comparables for {len(idx):,} player-seasons to {table}.")
+    rows, names = [], []
+    for name in player or []:
+        row = idx.find(name, season)
+        if row is None:
+            print(f"[yellow]No player-season found for {name!r}" + (f" in {season}" if season else "") + ".")
+        else:
+            rows.append(row)
+            names.append(name)
+    filters = {"seasons": pool_season or None, "min_age": min_age, "max_age": max_age, "min_minutes": min_minutes}
+    for row, found in zip(rows, idx.query(rows, k, **filters)):
+        me = idx.comparable(row, 0.0)
+        print(f"[bold]{me.name} {me.season} ({me.team}, age {me.age})")
+        for c in found:
+            paid = f"${c.salary:,}" if c.salary is not None else "—"
+            latest = f"  (latest ${c.latest_salary:,} in {c.latest_salary_year})" if c.latest_salary is not None else ""
+            print(f"  {c.distance:5.2f}  {c.name} {c.season} {c.team or ''} age {c.age}  salary {paid}{latest}")
+    if player and not rows:
+        raise typer.Exit(1)
+
+
+@app.command()
+def identity(
+    bbr_id: str = typer.Option(None, help="Look up the nba_api PLAYER_ID for a BBR slug, e.g. brownja02"),
+    nba_id: int = typer.Option(None, help="Look up the BBR slug for an nba_api PLAYER_ID"),
+    rematch: bool = typer.Option(False, help="Drop existing links and match everything again"),
+):
+    """Update the BBR <-> nba_api player identity index, or look up one id."""
+    from .processing.identity import IdentityIndex
+
+    idx = IdentityIndex()
+    stats = idx.update(rematch=rematch)
+    if bbr_id or nba_id:
+        print(idx.nba_id(bbr_id) if bbr_id else idx.bbr_id(nba_id))
+        return
+    print(f"[green]Identity: {stats['new']} new links, {stats['linked']} linked, {stats['unmatched']} unmatched BBR players.")
 
 
 @app.command()
 def build_corpus_cmd(
     season: str = typer.Option("2024-25"),
     bbr_year: int = typer.Option(2025, help="Year for BBR rosters to include"),
+    workers: int = typer.Option(None, help="Render processes (default: CPU count)"),
+    sims: int = typer.Option(100_000, help="Simulated seasons for the projections doc (0 = skip it)"),
+    metrics_out: Path = typer.Option(None, "--metrics", help="Write stage timings and counters as JSON"),
+    prometheus: Path = typer.Option(None, help="Write metrics in Prometheus textfile-collector format"),
+    profile: Path = typer.Option(None, help="Run under cProfile and dump stats to this file"),
+):
+    from .build_corpus import build_corpus
+
+    with instrumented(metrics_out, prometheus, profile):
+        stats = build_corpus(season, bbr_year, workers, sims)
+    print(f"[green]Corpus built: {stats['rendered']} rendered, {stats['unchanged']} unchanged, {stats['deleted']} deleted.")
+
+
+@app.command()
+def simulate(
+    season: str = typer.Option("2024-25"),
+    sims: int = typer.Option(100_000, help="Seasons to simulate"),
+    seed: int = typer.Option(0, help="Random seed; results depend only on seed and sims"),
+    workers: int = typer.Option(1, help="Simulation processes"),
+    team: str = typer.Option(None, help="nba_api team abbreviation (default: league table)"),
+    write: bool = typer.Option(True, help="Write the projections doc into the corpus"),
+):
+    """Monte Carlo projections of the rest of the season, the play-in and the playoffs."""
+    from .build_corpus import build_docs, projection_job
+    from .processing.simulation import season_projections
+
+    job = projection_job(season, sims, seed)
+    if job is None:
+        print(f"[yellow]No team game logs for {season}; run `fetch --source nba_api --what team_gamelogs` first.")
+        raise typer.Exit(1)
+    # Same run the doc renders from: build_docs below reuses it instead of simulating again.
+    _, rows = season_projections(RAW_DIR / "nba_api" / f"team_gamelogs_{season}.jsonl", season, job.inputs["source"], sims, seed, workers)
+    for r in rows:
+        if team and r["team"] != team.upper():
+            continue
+        print(
+            f"{r['team']:<4} {r['wins']:>2}-{r['losses']:<2} {r['rating']:+5.1f}  proj {r['projected_wins']:4.1f} W  "
+            f"playoffs {100 * r['playoffs']:5.1f}%  finals {100 * r['finals']:5.1f}%  title {100 * r['title']:5.1f}%"
+        )
+    if write:
+        stats = build_docs([job], [f"projections/{season}"], 1)
+        print(f"[green]Projections doc: {stats['rendered']} rendered, {stats['unchanged']} unchanged.")
+
+
+@app.command()
+def index(rebuild: bool = typer.Option(False, help="Re-index every document instead of only new/changed ones")):
+    """Build or update the local retrieval index over data/corpus."""
+    from .retrieval.index import RetrievalIndex
+
+    stats = RetrievalIndex().update(rebuild=rebuild)
+    print(f"[green]Index: {stats['added']} added/changed, {stats['removed']} removed, {stats['unchanged']} unchanged docs; {stats['chunks']} chunks.")
+
+
+@app.command()
+def search(
+    query: str = typer.Argument(..., help="Free-text question or keywords"),
+    k: int = typer.Option(5, help="Number of chunks to return"),
+    mode: str = typer.Option("hybrid", help="bm25, vector or hybrid"),
 ):
-    build_corpus(season, bbr_year)
-    print("[green]Corpus built.")
+    """Search the retrieval index."""
+    from .retrieval.index import get_index
+
+    try:
+        hits = get_index().search(query, k, mode)
+    except ValueError as e:
+        print(f"[red]{e}")
+        raise typer.Exit(1)
+    for hit in hits:
+        print(f"[bold]{hit.path}[/bold] #{hit.ordinal}  score={hit.score:.3f}")
+        print(hit.text)
+        print()
+
+
+@app.command()
+def serve(
+    host: str = typer.Option(SERVE_HOST),
+    port: int = typer.Option(SERVE_PORT),
+):
+    """Long-lived local HTTP daemon that keeps the indexes loaded (see nba_gm_llm.serve)."""
+    from .serve import run_server
+
+    run_server(host, port)
 
 
 if __name__ == "__main__":
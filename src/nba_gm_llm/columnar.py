@@ -0,0 +1,181 @@
+"""Columnar load cache for raw JSONL.
+
+The first read of `data/raw/<source>/<name>.jsonl` decodes it once and writes
+a typed Arrow IPC sidecar to `data/cache/columnar/<source>/<name>.arrow`
+(uncompressed, low-cardinality strings dictionary-encoded). Later reads
+memory-map the sidecar, so loading a file costs a few page faults rather than
+a `json.loads` per line, and columns nobody touches are never paged in.
+
+Sidecars are keyed by the source file's size, mtime and SHA-256 (stored in the
+schema metadata): a changed mtime with unchanged content just refreshes the
+stamp, anything else rebuilds.
+
+A column whose values have no common Arrow type (e.g. "10" and 10) is stored
+as JSON text with `json` field metadata; `iter_rows` decodes it back.
+"""
+from __future__ import annotations
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Sequence
+import hashlib
+import json
+import os
+import threading
+
+from .config import CACHE_DIR, RAW_DIR
+from .metrics import metrics
+from .storage import file_sha256
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+COLUMNAR_DIR = CACHE_DIR / "columnar"
+COLUMNAR_VERSION = "2"
+# String columns with at most this share of distinct values are dictionary-encoded.
+DICT_MAX_RATIO = 0.5
+# `iter_rows` decodes smaller files (e.g. one team's BBR page) straight from JSON:
+# for a few dozen rows, opening a sidecar costs more than it saves.
+ROWS_MIN_BYTES = 64 * 1024
+
+_tables: Dict[Path, tuple] = {}
+_lock = threading.Lock()
+
+
+def sidecar_path(path: Path, raw_dir: Path = RAW_DIR) -> Path:
+    path = Path(path)
+    try:
+        rel = path.relative_to(raw_dir)
+    except ValueError:
+        rel = Path("_other") / hashlib.sha1(str(path.resolve().parent).encode()).hexdigest()[:12] / path.name
+    return COLUMNAR_DIR / rel.with_suffix(".arrow")
+
+
+def _column(name: str, values: List[Any]) -> "tuple[pa.Field, pa.Array]":
+    import pyarrow as pa
+
+    meta = None
+    try:
+        arr = pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+        # Mixed types (e.g. "10" and 10): JSON-encode every value so each decodes to its own type.
+        arr = pa.array([None if v is None else json.dumps(v, ensure_ascii=False) for v in values], pa.string())
+        meta = {"json": "1"}
+    if pa.types.is_null(arr.type):
+        arr = arr.cast(pa.string())
+    if pa.types.is_string(arr.type) and len(arr):
+        enc = arr.dictionary_encode()
+        if len(enc.dictionary) <= DICT_MAX_RATIO * len(arr):
+            arr = enc
+    return pa.field(name, arr.type, metadata=meta), arr
+
+
+def _build(path: Path, stamp: Dict[str, str], dest: Path) -> None:
+    import pyarrow as pa
+
+    rows: List[Dict[str, Any]] = []
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                rows.append(json.loads(line))
+    names = list(dict.fromkeys(k for r in rows for k in r))
+    fields, arrays = zip(*[_column(k, [r.get(k) for r in rows]) for k in names]) if names else ((), ())
+    table = pa.Table.from_arrays(list(arrays), schema=pa.schema(list(fields)))
+    _write(table.replace_schema_metadata(stamp), dest)
+
+
+def _write(table: "pa.Table", dest: Path) -> None:
+    import pyarrow as pa
+
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_suffix(f".{os.getpid()}.tmp")
+    with pa.OSFile(str(tmp), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp, dest)
+
+
+def _open(dest: Path) -> "pa.Table | None":
+    import pyarrow as pa
+
+    try:
+        with pa.memory_map(str(dest), "r") as source:
+            return pa.ipc.open_file(source).read_all()
+    except FileNotFoundError:
+        return None
+
+
+def load_table(path: Path) -> "pa.Table":
+    """The rows of a JSONL file as a memory-mapped Arrow table, via its sidecar.
+
+    Tables are also kept per process until the source file changes. A key absent
+    from a row loads as null; a mixed-type column loads as JSON text.
+    """
+    path = Path(path)
+    st = path.stat()
+    stamp = {"version": COLUMNAR_VERSION, "size": str(st.st_size), "mtime_ns": str(st.st_mtime_ns)}
+    with _lock:
+        hit = _tables.get(path)
+    if hit and hit[0] == stamp:
+        metrics.incr("columnar.memory_hits")
+        return hit[1]
+    dest = sidecar_path(path)
+    with metrics.span("columnar.load"):
+        table = _open(dest)
+        meta = {k.decode(): v.decode() for k, v in (table.schema.metadata or {}).items()} if table is not None else {}
+        if table is None or any(meta.get(k) != v for k, v in stamp.items()):
+            # Same content under a new mtime (e.g. a rewrite or checkout) keeps the sidecar.
+            digest = file_sha256(path)
+            if table is not None and meta.get("version") == COLUMNAR_VERSION and meta.get("sha256") == digest:
+                _write(table.replace_schema_metadata({**stamp, "sha256": digest}), dest)
+                metrics.incr("columnar.restamped")
+                table = _open(dest)
+            else:
+                metrics.incr("columnar.builds")
+                with metrics.span("columnar.build"):
+                    _build(path, {**stamp, "sha256": digest}, dest)
+                table = _open(dest)
+        else:
+            metrics.incr("columnar.disk_hits")
+    with _lock:
+        _tables[path] = (stamp, table)
+    return table
+
+
+def _iter_jsonl(path: Path, columns: Sequence[str] | None) -> Iterator[Dict[str, Any]]:
+    # Same shape as rows from a sidecar: every key in the file on every row, None where absent.
+    with path.open("r", encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    names = list(dict.fromkeys(k for r in rows for k in r))
+    if columns is not None:
+        have = set(names)
+        names = [c for c in columns if c in have]
+    for row in rows:
+        yield {k: row.get(k) for k in names}
+
+
+def iter_rows(path: Path, columns: Sequence[str] | None = None, batch_size: int = 4096) -> Iterator[Dict[str, Any]]:
+    """Rows as dicts (only `columns`, if given), decoded a batch at a time from the sidecar.
+
+    Every row has every key found in the file, None where a row lacks it.
+
+    Prefer `load_table` where the caller can work on columns: building dicts
+    is most of the cost of this function.
+    """
+    path = Path(path)
+    if path.stat().st_size < ROWS_MIN_BYTES:
+        yield from _iter_jsonl(path, columns)
+        return
+    table = load_table(path)
+    if columns is not None:
+        have = set(table.column_names)
+        table = table.select([c for c in columns if c in have])
+    encoded = [f.name for f in table.schema if f.metadata and f.metadata.get(b"json")]
+    for batch in table.to_batches(batch_size):
+        rows = batch.to_pylist()
+        for c in encoded:
+            for r in rows:
+                if r[c] is not None:
+                    r[c] = json.loads(r[c])
+        yield from rows
+
+
+def read_rows(path: Path, columns: Sequence[str] | None = None) -> List[Dict[str, Any]]:
+    return list(iter_rows(path, columns))
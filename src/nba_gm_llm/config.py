@@ -1,9 +1,15 @@
+import os
 from pathlib import Path
+from urllib.parse import urlsplit
 
-DATA_DIR = Path(__file__).resolve().parent.parent.parent / "data"
+DATA_DIR = Path(os.environ.get("NBA_GM_DATA_DIR") or Path(__file__).resolve().parent.parent.parent / "data")
 RAW_DIR = DATA_DIR / "raw"
 PROC_DIR = DATA_DIR / "processed"
 CORPUS_DIR = DATA_DIR / "corpus"
+CACHE_DIR = DATA_DIR / "cache"
+WAREHOUSE_PATH = PROC_DIR / "warehouse.duckdb"
+INDEX_DIR = DATA_DIR / "index"
+JOURNAL_PATH = DATA_DIR / "fetch_journal.json"
 
 RAW_DIR.mkdir(parents=True, exist_ok=True)
 PROC_DIR.mkdir(parents=True, exist_ok=True)
@@ -14,3 +20,38 @@ DEFAULT_HEADERS = {
     "Accept-Language": "en-US,en;q=0.9",
 }
 
+# Upstream base URLs; override (e.g. to a local stand-in server) via environment.
+BBR_BASE_URL = os.environ.get("NBA_GM_BBR_BASE_URL", "https://www.basketball-reference.com").rstrip("/")
+NBA_STATS_BASE_URL = os.environ.get("NBA_GM_STATS_BASE_URL")  # e.g. http://127.0.0.1:8000/stats/{endpoint}
+
+# Polite request budgets per host: (requests per second, burst size).
+RATE_LIMITS = {
+    urlsplit(BBR_BASE_URL).netloc: (0.5, 2),
+    urlsplit(NBA_STATS_BASE_URL or "https://stats.nba.com").netloc: (1.5, 3),
+}
+DEFAULT_RATE_LIMIT = (1.0, 1)
+FETCH_WORKERS = 4
+
+# HTTP/content cache: total size bound and freshness per URL/endpoint prefix
+# (first match wins). Stale entries are revalidated with ETag/Last-Modified
+# where the source exposes them.
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+CACHE_TTLS = {
+    f"{BBR_BASE_URL}/contracts/": 6 * 3600,
+    f"{BBR_BASE_URL}/teams/": 6 * 3600,
+    "nba_api:teamgamelog": 3600,
+    "nba_api:leaguedashplayerstats": 6 * 3600,
+}
+DEFAULT_CACHE_TTL = 3600
+
+# Local query daemon (`cli serve`); main.py asks it before reading files or scraping.
+SERVE_HOST = os.environ.get("NBA_GM_SERVE_HOST", "127.0.0.1")
+SERVE_PORT = int(os.environ.get("NBA_GM_SERVE_PORT", "8787"))
+
+# League salary thresholds by BBR season year (2025 = 2024-25):
+# (salary cap, luxury tax, first apron, second apron).
+SALARY_THRESHOLDS = {
+    2024: (136_021_000, 165_294_000, 172_346_000, 182_794_000),
+    2025: (140_588_000, 170_814_000, 178_132_000, 188_931_000),
+    2026: (154_647_000, 187_895_000, 195_945_000, 207_824_000),
+}
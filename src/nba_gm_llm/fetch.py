@@ -0,0 +1,141 @@
+"""Journaled fetches of raw data, shared by `cli fetch` and the refresh pipeline.
+
+Each function plans its units, resumes or starts a run in the fetch journal,
+writes every unit's JSONL as soon as it is fetched and returns the finished
+`FetchRun` (whose `finish()` result is the retry queue).
+"""
+from __future__ import annotations
+from typing import Callable, Dict, Sequence
+
+from .config import RAW_DIR, FETCH_WORKERS
+from .journal import FetchJournal, FetchRun, Unit, write_unit
+
+NBA_API_ITEMS = ("players", "teams", "team_gamelogs", "player_gamelogs", "player_stats")
+BBR_PAGE_TABLES = {"rosters": ("roster", "roster"), "salaries": ("salaries2", "salaries")}  # item -> (table id, file prefix)
+
+
+def run_signature(source: str, season: str, what: Sequence[str]) -> str:
+    return f"{source}:{season}:{'+'.join(sorted(set(what)))}"
+
+
+def fetch_nba_api(
+    season: str,
+    what: Sequence[str],
+    incremental: bool = False,
+    seasons: int = 5,
+    bulk: bool = False,
+    fresh: bool = False,
+    journal: FetchJournal | None = None,
+) -> FetchRun:
+    from .sources import nba_api_client
+
+    journal = journal or FetchJournal()
+    out_dir = RAW_DIR / "nba_api"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stat_seasons = nba_api_client.last_n_seasons_labels(seasons) if "player_stats" in what else []
+    units = [Unit("nba_api", item, season) for item in NBA_API_ITEMS[:4] if item in what]
+    units += [Unit("nba_api", "player_stats", seas) for seas in stat_seasons]
+    run = journal.start(run_signature("nba_api", season, what), units, fresh)
+    pending = {u.key: u for u in run.pending}
+    teams_rows = nba_api_client.list_teams()
+    tid_list = [t["id"] for t in teams_rows]
+
+    def unit(item: str, seas: str = season) -> Unit | None:
+        return pending.get(Unit("nba_api", item, seas).key)
+
+    if unit("players"):
+        run.attempt(unit("players"), lambda: write_unit(out_dir / f"players_{season}.jsonl", nba_api_client.list_players(active_only=False)))
+    if unit("teams"):
+        run.attempt(unit("teams"), lambda: write_unit(out_dir / f"teams_{season}.jsonl", teams_rows))
+    if unit("team_gamelogs") and incremental:
+        def update() -> int:
+            counts = nba_api_client.update_team_gamelogs(out_dir / f"team_gamelogs_{season}.jsonl", tid_list, season, bulk=bulk)
+            return counts["appended"]
+
+        run.attempt(unit("team_gamelogs"), update)
+    elif unit("team_gamelogs"):
+        def team_gamelogs() -> int:
+            if bulk:
+                logs = nba_api_client.fetch_team_gamelogs_bulk(season, tid_list)
+            else:
+                logs = nba_api_client.fetch_team_gamelogs(tid_list, season)
+            rows = []
+            for tid, lst in logs.items():
+                for r in lst:
+                    r["TEAM_ID"] = tid
+                    rows.append(r)
+            n = write_unit(out_dir / f"team_gamelogs_{season}.jsonl", rows)
+            # A full rewrite invalidates incremental watermarks; they are rebuilt from the file.
+            (out_dir / f"team_gamelogs_{season}.watermarks.json").unlink(missing_ok=True)
+            return n
+
+        run.attempt(unit("team_gamelogs"), team_gamelogs)
+    if unit("player_gamelogs"):
+        run.attempt(
+            unit("player_gamelogs"),
+            lambda: write_unit(out_dir / f"player_gamelogs_{season}.jsonl", nba_api_client.fetch_player_gamelogs_bulk(season)),
+        )
+    todo = [seas for seas in stat_seasons if unit("player_stats", seas)]
+    if todo:
+        errors: Dict[str, str] = {}
+        stats_by_season = nba_api_client.fetch_player_stats_seasons(todo, errors=errors)
+        for seas in todo:
+            if seas in errors:
+                run.failed(unit("player_stats", seas), errors[seas])
+            else:
+                rows = stats_by_season[seas]
+                run.attempt(unit("player_stats", seas), lambda: write_unit(out_dir / f"player_stats_{seas}.jsonl", rows))
+    return run
+
+
+def fetch_bbr(
+    year: int,
+    what: Sequence[str],
+    workers: int = FETCH_WORKERS,
+    fresh: bool = False,
+    journal: FetchJournal | None = None,
+    on_team: Callable[[str, str], None] | None = None,
+) -> FetchRun:
+    """Team pages and/or contracts pages for every team, each team written as it completes.
+
+    `on_team(item, abbr)` is called once a team's units for "pages" or
+    "contracts" have all been written.
+    """
+    from .scrapers import bbr
+
+    journal = journal or FetchJournal()
+    out_dir = RAW_DIR / "bbr"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    # Rosters and salaries share the team season page: fetch and parse it once.
+    wanted = [item for item in BBR_PAGE_TABLES if item in what]
+    units = [Unit("bbr", BBR_PAGE_TABLES[item][1], str(year), abbr) for item in wanted for abbr in bbr.TEAM_ABBRS]
+    if "contracts" in what:
+        units += [Unit("bbr", "contracts", "current", abbr) for abbr in bbr.TEAM_ABBRS]
+    run = journal.start(run_signature("bbr", str(year), what), units, fresh)
+
+    page_units = [u for u in run.pending if u.entity in ("roster", "salaries")]
+    if page_units:
+        errors: Dict[str, str] = {}
+        teams = list(dict.fromkeys(u.team for u in page_units))
+        entities = {u.entity for u in page_units}
+        table_ids = [BBR_PAGE_TABLES[item][0] for item in wanted if BBR_PAGE_TABLES[item][1] in entities]
+        for abbr, page in bbr.iter_all_team_pages(year, table_ids, workers, teams, errors):
+            ok = True
+            for u in page_units:
+                if u.team == abbr:
+                    tid = "roster" if u.entity == "roster" else "salaries2"
+                    ok &= run.attempt(u, lambda: write_unit(out_dir / f"{u.entity}_{year}_{abbr}.jsonl", page[tid]))
+            if ok and on_team:
+                on_team("pages", abbr)
+        for u in page_units:
+            if u.team in errors:
+                run.failed(u, errors[u.team])
+    contract_units = {u.team: u for u in run.pending if u.entity == "contracts"}
+    if contract_units:
+        errors = {}
+        for abbr, res in bbr.iter_all_contracts(workers, list(contract_units), errors):
+            if run.attempt(contract_units[abbr], lambda: write_unit(out_dir / f"contracts_{abbr}.jsonl", bbr.contract_rows(res))) and on_team:
+                on_team("contracts", abbr)
+        for abbr, err in errors.items():
+            run.failed(contract_units[abbr], err)
+    return run
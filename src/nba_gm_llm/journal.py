@@ -0,0 +1,136 @@
+"""Checkpoint journal for resumable `cli fetch` runs.
+
+A run is split into units -- (source, entity, season, team) -- each written to
+its own JSONL file. The journal records every unit as done (with its row count)
+or failed (with the error), so a run that fails partway can be resumed: the
+next run with the same signature fetches only the units not yet done, i.e. the
+failed ones (the retry queue) and those never reached. Once every planned unit
+is done the run is complete and the next invocation starts afresh.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple
+import json
+import threading
+import time
+
+from .config import JOURNAL_PATH
+from .metrics import metrics
+from .storage import read_json, write_json, write_jsonl
+
+
+@dataclass(frozen=True)
+class Unit:
+    source: str
+    entity: str
+    season: str
+    team: str = ""
+
+    @property
+    def key(self) -> str:
+        return "/".join(p for p in (self.source, self.entity, self.season, self.team) if p)
+
+
+def write_unit(path: Path, rows: Iterable[Dict[str, Any]]) -> int:
+    """Write one unit's JSONL, refusing to replace a non-empty file with no rows.
+
+    A file whose content would not change is left untouched, so its mtime (and
+    everything fingerprinted on it downstream) stays put.
+    """
+    rows = list(rows)
+    if path.exists():
+        size = path.stat().st_size
+        if not rows and size:
+            raise ValueError(f"empty result; kept existing {path.name}")
+        data = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in rows).encode("utf-8")
+        if len(data) == size and path.read_bytes() == data:
+            metrics.incr("storage.jsonl_unchanged")
+            return len(rows)
+    write_jsonl(path, rows)
+    return len(rows)
+
+
+class FetchRun:
+    """One run's view of the journal; every update is persisted immediately."""
+
+    def __init__(self, journal: "FetchJournal", signature: str, pending: List[Unit], skipped: int):
+        self.journal = journal
+        self.signature = signature
+        self.pending = pending
+        self.skipped = skipped
+
+    def done(self, unit: Unit, rows: int) -> None:
+        self.journal._record(self.signature, unit, {"status": "done", "rows": rows})
+
+    def failed(self, unit: Unit, error: BaseException | str) -> None:
+        err = error if isinstance(error, str) else f"{type(error).__name__}: {error}"
+        self.journal._record(self.signature, unit, {"status": "failed", "error": err})
+
+    def attempt(self, unit: Unit, fetch_and_write) -> bool:
+        """Run `fetch_and_write()` (returning rows written) for one unit; a failure is journaled, not raised."""
+        try:
+            rows = fetch_and_write()
+        except Exception as e:
+            self.failed(unit, e)
+            return False
+        self.done(unit, rows)
+        return True
+
+    def finish(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """Close the run if every planned unit is done; returns the retry queue otherwise."""
+        return self.journal._finish(self.signature)
+
+
+class FetchJournal:
+    """Fetch runs keyed by signature, persisted as JSON (data/fetch_journal.json)."""
+
+    def __init__(self, path: Path = JOURNAL_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.runs: Dict[str, Dict[str, Any]] = (read_json(path, {}) or {}).get("runs", {})
+
+    def start(self, signature: str, units: Iterable[Unit], fresh: bool = False) -> FetchRun:
+        """Begin (or resume) the run `signature` over `units`."""
+        units = list(units)
+        with self._lock:
+            run = self.runs.get(signature)
+            if fresh or run is None or run.get("complete"):
+                run = self.runs[signature] = {"started_at": time.time(), "complete": False, "planned": [], "units": {}}
+            planned = set(run["planned"])
+            run["planned"] += [u.key for u in units if u.key not in planned]
+            pending = [u for u in units if run["units"].get(u.key, {}).get("status") != "done"]
+            self._save()
+        return FetchRun(self, signature, pending, len(units) - len(pending))
+
+    def retry_queue(self, signature: str | None = None) -> List[Tuple[str, Dict[str, Any]]]:
+        """(unit key, entry) for every failed unit, across runs unless `signature` is given."""
+        if signature is None:
+            runs = list(self.runs.values())
+        else:
+            runs = [self.runs[signature]] if signature in self.runs else []
+        return [(k, e) for run in runs for k, e in run["units"].items() if e["status"] == "failed"]
+
+    def clear(self) -> None:
+        with self._lock:
+            self.runs = {}
+            self._save()
+
+    def _record(self, signature: str, unit: Unit, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            units = self.runs[signature]["units"]
+            attempts = units.get(unit.key, {}).get("attempts", 0) + 1
+            units[unit.key] = {**entry, "attempts": attempts, "at": time.time()}
+            self._save()
+
+    def _finish(self, signature: str) -> List[Tuple[str, Dict[str, Any]]]:
+        with self._lock:
+            run = self.runs[signature]
+            run["complete"] = all(run["units"].get(k, {}).get("status") == "done" for k in run["planned"])
+            if run["complete"]:
+                run["finished_at"] = time.time()
+            self._save()
+        return self.retry_queue(signature)
+
+    def _save(self) -> None:
+        write_json(self.path, {"runs": self.runs})
@@ -0,0 +1,176 @@
+"""Process-wide timing spans and counters for fetch and corpus stages.
+
+Disabled by default: `span()` then returns a shared no-op context manager and
+`incr()`/`observe()` return after one attribute check, so instrumented hot
+paths cost next to nothing. `cli fetch` and `cli build-corpus-cmd` enable it
+with `--metrics out.json` and/or `--prometheus out.prom` (textfile-collector
+format), and `--profile out.prof` wraps the command, and the threads it starts, in cProfile.
+"""
+from __future__ import annotations
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, Dict, Iterator
+import os
+import re
+import sys
+import threading
+import time
+
+_NOOP = nullcontext()
+
+
+class _Span:
+    __slots__ = ("_metrics", "_name", "_t0")
+
+    def __init__(self, metrics: "Metrics", name: str):
+        self._metrics = metrics
+        self._name = name
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._metrics.observe(self._name, time.perf_counter() - self._t0)
+        return False
+
+
+class Metrics:
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self.counters: Dict[str, float] = {}
+        self.spans: Dict[str, list] = {}  # name -> [count, total seconds, max seconds]
+        self._started = time.time()
+
+    def enable(self) -> None:
+        self.enabled = True
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters.clear()
+            self.spans.clear()
+            self._started = time.time()
+
+    def span(self, name: str):
+        """Time a block: `with metrics.span("http.request"): ...`."""
+        if not self.enabled:
+            return _NOOP
+        return _Span(self, name)
+
+    def observe(self, name: str, seconds: float) -> None:
+        """Record an externally timed duration (e.g. a sleep) under `name`."""
+        if not self.enabled:
+            return
+        with self._lock:
+            s = self.spans.get(name)
+            if s is None:
+                self.spans[name] = [1, seconds, seconds]
+            else:
+                s[0] += 1
+                s[1] += seconds
+                if seconds > s[2]:
+                    s[2] = seconds
+
+    def incr(self, name: str, value: float = 1) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "started_at": self._started,
+                "wall_s": round(time.time() - self._started, 6),
+                "counters": dict(sorted(self.counters.items())),
+                "spans": {
+                    k: {"count": c, "total_s": round(t, 6), "mean_s": round(t / c, 6), "max_s": round(m, 6)}
+                    for k, (c, t, m) in sorted(self.spans.items())
+                },
+            }
+
+    def write_json(self, path: Path) -> None:
+        from .storage import write_json
+
+        write_json(Path(path), self.snapshot())
+
+    def write_prometheus(self, path: Path, prefix: str = "nba_gm") -> None:
+        """Write a node_exporter textfile-collector file (atomically)."""
+        snap = self.snapshot()
+        lines = [f"# TYPE {prefix}_span_seconds_total counter"]
+        lines += [f'{prefix}_span_seconds_total{{span="{name}"}} {s["total_s"]}' for name, s in snap["spans"].items()]
+        lines.append(f"# TYPE {prefix}_span_count counter")
+        lines += [f'{prefix}_span_count{{span="{name}"}} {s["count"]}' for name, s in snap["spans"].items()]
+        for name, v in snap["counters"].items():
+            metric = f"{prefix}_{re.sub(r'[^a-zA-Z0-9_]', '_', name)}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {v}"]
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        os.replace(tmp, path)
+
+
+metrics = Metrics()
+
+
+class _ThreadProfiles:
+    """cProfile for the calling thread plus every thread started while enabled.
+
+    cProfile only hooks the thread that enables it, so fetch and corpus worker
+    threads would be missing. `threading.setprofile` runs `_start` as the first
+    profile event of each new thread, which swaps in that thread's own profiler;
+    all of them are merged into one stats file.
+    """
+
+    def __init__(self):
+        import cProfile
+
+        self._new = cProfile.Profile
+        self._lock = threading.Lock()
+        self.profilers = [self._new()]
+
+    def _start(self, frame, event, arg) -> None:
+        profiler = self._new()
+        with self._lock:
+            self.profilers.append(profiler)
+        sys.setprofile(None)
+        profiler.enable()
+
+    def enable(self) -> None:
+        threading.setprofile(self._start)
+        self.profilers[0].enable()
+
+    def dump(self, path: Path) -> None:
+        import pstats
+
+        threading.setprofile(None)
+        self.profilers[0].disable()
+        with self._lock:
+            stats = pstats.Stats(*self.profilers)
+        stats.dump_stats(str(path))
+
+
+@contextmanager
+def instrumented(
+    metrics_path: Path | None = None, prometheus_path: Path | None = None, profile_path: Path | None = None
+) -> Iterator[Metrics]:
+    """Enable metrics (and optionally cProfile, across threads) for a block; write the outputs on exit."""
+    if metrics_path or prometheus_path:
+        metrics.enable()
+    profiles = None
+    if profile_path:
+        profiles = _ThreadProfiles()
+        profiles.enable()
+    try:
+        with metrics.span("command"):
+            yield metrics
+    finally:
+        if profiles is not None:
+            profiles.dump(profile_path)
+        if metrics_path:
+            metrics.write_json(metrics_path)
+        if prometheus_path:
+            metrics.write_prometheus(prometheus_path)
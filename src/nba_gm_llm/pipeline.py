@@ -0,0 +1,299 @@
+"""Dependency-aware executor for the fetch -> process -> corpus refresh.
+
+Stages form a DAG and run on a thread pool as soon as their dependencies have
+finished, so independent sources fetch concurrently (each paced by its own
+per-host rate budget) and processing starts as soon as its inputs land. A
+producer can `emit` keys (e.g. team abbreviations) while it runs; a stage that
+fans out over that producer runs once per key as soon as it is emitted,
+instead of waiting for the whole league.
+
+Stages that declare their input files are skipped when those files' sizes and
+mtimes match the last successful run (data/processed/pipeline_state.json).
+"""
+from __future__ import annotations
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+import queue
+import threading
+import time
+
+from .config import PROC_DIR, RAW_DIR, FETCH_WORKERS
+from .metrics import metrics
+from .storage import fingerprint, read_json, write_json
+
+PIPELINE_STATE_PATH = PROC_DIR / "pipeline_state.json"
+_OK = ("ok", "skipped")
+
+
+@dataclass
+class StageContext:
+    stage: str
+    key: str | None  # the fan-out key, or None for a whole stage
+    emit: Callable[[str], None]
+
+
+@dataclass
+class Stage:
+    """One step of the pipeline.
+
+    `run(ctx)` does the work and may call `ctx.emit(key)` as parts of its output
+    land. With `fan_out` naming one of `deps`, the stage instead runs once per
+    key that upstream emits (`ctx.key`). `inputs(key)` lists the files the stage
+    reads, for skipping; stages without it always run.
+    """
+
+    name: str
+    run: Callable[[StageContext], Any]
+    deps: Tuple[str, ...] = ()
+    inputs: Callable[[str | None], Iterable[Path]] | None = None
+    fan_out: str | None = None
+
+
+@dataclass
+class StageResult:
+    name: str
+    status: str = "pending"  # ok, skipped, failed or blocked once finished
+    seconds: float = 0.0
+    error: str | None = None
+    ran: int = 0  # fan-out: keys run
+    skipped: int = 0  # fan-out: keys skipped as unchanged
+
+
+def _toposort(stages: Dict[str, Stage]) -> List[str]:
+    order: List[str] = []
+    state: Dict[str, int] = {}
+
+    def visit(name: str) -> None:
+        if state.get(name) == 2:
+            return
+        if state.get(name) == 1:
+            raise ValueError(f"dependency cycle through stage {name}")
+        state[name] = 1
+        for dep in stages[name].deps:
+            if dep not in stages:
+                raise ValueError(f"stage {name} depends on unknown stage {dep}")
+            visit(dep)
+        state[name] = 2
+        order.append(name)
+
+    for name in stages:
+        visit(name)
+    return order
+
+
+class Pipeline:
+    def __init__(
+        self,
+        stages: Sequence[Stage],
+        workers: int = 8,
+        state_path: Path = PIPELINE_STATE_PATH,
+        log: Callable[[str], None] | None = None,
+    ):
+        self.stages = {s.name: s for s in stages}
+        for s in stages:
+            if s.fan_out and s.fan_out not in s.deps:
+                raise ValueError(f"stage {s.name} fans out over {s.fan_out}, which is not one of its deps")
+        self.order = _toposort(self.stages)
+        self.workers = workers
+        self.state_path = state_path
+        self.log = log or (lambda msg: None)
+
+    def run(self, force: bool = False) -> Dict[str, StageResult]:
+        """Run every stage; `force` ignores the skip state. Returns results in topological order."""
+        state: Dict[str, Dict[str, Any]] = read_json(self.state_path, {}) or {}
+        state_lock = threading.Lock()
+        results = {name: StageResult(name) for name in self.order}
+        events: "queue.Queue[Tuple[str, str, str | None, Any]]" = queue.Queue()
+        emitted: Dict[str, List[str]] = defaultdict(list)  # producer -> keys, in emission order
+        submitted: Dict[str, int] = defaultdict(int)  # fan-out stage -> keys submitted
+        running: Dict[str, int] = defaultdict(int)
+        started: Dict[str, float] = {}
+        finished: set = set()
+
+        def task(stage: Stage, key: str | None) -> str:
+            skey = stage.name if key is None else f"{stage.name}[{key}]"
+            fp = fingerprint(stage.inputs(key), key=str) if stage.inputs else None
+            if not force and fp is not None and state.get(skey, {}).get("inputs") == fp:
+                return "skipped"
+            with metrics.span(f"pipeline.{stage.name}"):
+                stage.run(StageContext(stage.name, key, lambda k: events.put(("emit", stage.name, k, None))))
+            with state_lock:
+                state[skey] = {"inputs": fp, "at": time.time()}
+                write_json(self.state_path, state)
+            return "ok"
+
+        def submit(pool: ThreadPoolExecutor, stage: Stage, key: str | None) -> None:
+            started.setdefault(stage.name, time.perf_counter())
+            running[stage.name] += 1
+            fut = pool.submit(task, stage, key)
+            fut.add_done_callback(lambda f: events.put(("done", stage.name, key, f)))
+
+        def finish(name: str, status: str, error: str | None = None) -> None:
+            r = results[name]
+            r.status, r.error = status, error
+            r.seconds = time.perf_counter() - started[name] if name in started else 0.0
+            finished.add(name)
+            self.log(f"{name}: {status}" + (f" ({error})" if error else "") + f" in {r.seconds:.1f}s")
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while True:
+                # Start, fan out, block or close stages until nothing changes.
+                progressed = True
+                while progressed:
+                    progressed = False
+                    for name in self.order:
+                        if name in finished:
+                            continue
+                        stage = self.stages[name]
+                        plain = [d for d in stage.deps if d != stage.fan_out]
+                        if any(results[d].status in ("failed", "blocked") for d in plain):
+                            finish(name, "blocked", "upstream failed")
+                            progressed = True
+                            continue
+                        if not all(d in finished for d in plain):
+                            continue
+                        if stage.fan_out is None:
+                            if name not in started:
+                                submit(pool, stage, None)
+                            continue
+                        keys = emitted[stage.fan_out]
+                        while submitted[name] < len(keys):
+                            submit(pool, stage, keys[submitted[name]])
+                            submitted[name] += 1
+                        if stage.fan_out in finished and not running[name]:
+                            r = results[name]
+                            if r.error:
+                                finish(name, "failed", r.error)
+                            elif results[stage.fan_out].status not in _OK and not (r.ran or r.skipped):
+                                finish(name, "blocked", "upstream failed")
+                            else:
+                                finish(name, "skipped" if r.skipped and not r.ran else "ok")
+                            progressed = True
+                if len(finished) == len(self.order):
+                    break
+                kind, name, key, payload = events.get()
+                if kind == "emit":
+                    emitted[name].append(key)
+                    continue
+                running[name] -= 1
+                r = results[name]
+                err = payload.exception()
+                status = "failed" if err else payload.result()
+                if self.stages[name].fan_out is None:
+                    finish(name, status, f"{type(err).__name__}: {err}" if err else None)
+                elif err:
+                    r.error = r.error or f"{key}: {type(err).__name__}: {err}"
+                elif status == "ok":
+                    r.ran += 1
+                else:
+                    r.skipped += 1
+        return results
+
+
+def _fetched(run) -> None:
+    failed = run.finish()
+    if failed:
+        raise RuntimeError(f"{len(failed)} unit(s) failed, e.g. {failed[0][0]}: {failed[0][1]['error']}; re-run to retry them")
+
+
+def refresh_stages(
+    season: str,
+    bbr_year: int,
+    sources: Sequence[str] = ("nba_api", "bbr"),
+    seasons: int = 5,
+    workers: int = FETCH_WORKERS,
+    fresh: bool = False,
+) -> List[Stage]:
+    """The full refresh: fetch both sources, update identity and payroll, rebuild the corpus and index.
+
+      nba.teams -> nba.team_gamelogs -> corpus.team_summaries, corpus.projections
+      nba.players, nba.player_stats --> identity -> corpus.players, comparables
+      bbr.pages -(per team)-> corpus.roster
+      bbr.pages, bbr.contracts -> payroll, snapshot
+      corpus.* -> index
+    """
+    from .build_corpus import build_docs, build_player_profiles, build_projections, build_team_summaries, roster_note_job
+    from .fetch import fetch_bbr, fetch_nba_api
+    from .journal import FetchJournal
+
+    journal = FetchJournal()  # one instance: stages share its lock
+    # Corpus stages render in-process (workers=1): forking a pool from a threaded process is unsafe.
+    nba_dir, bbr_dir = RAW_DIR / "nba_api", RAW_DIR / "bbr"
+    stages: List[Stage] = []
+    if "nba_api" in sources:
+        def nba(item: str, **kw) -> Callable[[StageContext], None]:
+            return lambda ctx: _fetched(fetch_nba_api(season, [item], fresh=fresh, journal=journal, **kw))
+
+        stages += [
+            Stage("nba.teams", nba("teams")),
+            Stage("nba.players", nba("players")),
+            Stage("nba.team_gamelogs", nba("team_gamelogs", incremental=True, bulk=True), ("nba.teams",)),
+            Stage("nba.player_stats", nba("player_stats", seasons=seasons)),
+            Stage(
+                "corpus.team_summaries", lambda ctx: build_team_summaries(season, workers=1), ("nba.team_gamelogs",),
+                inputs=lambda key: [nba_dir / f"team_gamelogs_{season}.jsonl"],
+            ),
+            Stage(
+                "corpus.projections", lambda ctx: build_projections(season), ("nba.team_gamelogs",),
+                inputs=lambda key: [nba_dir / f"team_gamelogs_{season}.jsonl"],
+            ),
+        ]
+    if "bbr" in sources:
+        def bbr(what: List[str]) -> Callable[[StageContext], None]:
+            return lambda ctx: _fetched(fetch_bbr(bbr_year, what, workers, fresh, journal, on_team=lambda item, abbr: ctx.emit(abbr)))
+
+        def payroll(ctx: StageContext) -> None:
+            from .processing.payroll import get_payroll_index
+
+            get_payroll_index()
+
+        def snapshot(ctx: StageContext) -> None:
+            from .snapshots import SnapshotStore
+
+            SnapshotStore().take()
+
+        stages += [
+            Stage("bbr.pages", bbr(["rosters", "salaries"])),
+            Stage("bbr.contracts", bbr(["contracts"])),
+            Stage(
+                "corpus.roster", lambda ctx: build_docs([roster_note_job(bbr_year, ctx.key)], (), workers=1), ("bbr.pages",),
+                inputs=lambda key: [bbr_dir / f"roster_{bbr_year}_{key}.jsonl"], fan_out="bbr.pages",
+            ),
+            Stage("payroll", payroll, ("bbr.pages", "bbr.contracts")),
+            Stage("snapshot", snapshot, ("bbr.pages", "bbr.contracts")),
+        ]
+
+    def identity(ctx: StageContext) -> None:
+        from .processing.identity import IdentityIndex
+
+        IdentityIndex().update()
+
+    def comparables(ctx: StageContext) -> None:
+        from .processing.comparables import get_comparables_index
+
+        get_comparables_index()
+
+    def index(ctx: StageContext) -> None:
+        from .retrieval.index import RetrievalIndex
+
+        RetrievalIndex().update()
+
+    stages += [
+        Stage("identity", identity, ("bbr.pages", "nba.players", "nba.player_stats")),
+        Stage("comparables", comparables, ("nba.player_stats", "identity")),
+        Stage(
+            "corpus.players", lambda ctx: build_player_profiles(workers=1), ("nba.player_stats", "identity"),
+            inputs=lambda key: [
+                *sorted(nba_dir.glob("player_stats_*.jsonl")), *sorted(bbr_dir.glob("salaries_*_*.jsonl")),
+                PROC_DIR / "identity.json",
+            ],
+        ),
+    ]
+    stages.append(Stage("index", index, tuple(s.name for s in stages if s.name.startswith("corpus."))))
+    names = {s.name for s in stages}
+    for s in stages:
+        s.deps = tuple(d for d in s.deps if d in names)
+    return stages
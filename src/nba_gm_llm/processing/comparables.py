@@ -0,0 +1,272 @@
+"""Player comparables: k-nearest neighbours over per-season stat vectors.
+
+Every player-season in player_stats_{season}.jsonl becomes a vector of rate
+stats (per-36 production, shooting profile, usage shape) standardized within
+its season, so a 2019 and a 2025 season compare against their own league.
+Nearest neighbours are exact Euclidean distances from a blocked matmul,
+|q|^2 + |v|^2 - 2 q.v, which over a few thousand rows beats a tree and batches
+queries for free.
+
+The vectors, filters, BBR salaries (through the identity index) and the
+all-pairs top-k table are stored as data/processed/comparables.npz plus a
+meta JSON with the source-file fingerprint; `load` rebuilds only when a source
+file changes.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+import numpy as np
+
+from ..columnar import iter_rows
+from ..config import RAW_DIR, PROC_DIR
+from ..metrics import metrics
+from ..storage import fingerprint, read_json, write_json
+from .identity import IDENTITY_PATH, get_identity_index, normalize_name
+from .identity import _source_files as _identity_sources
+from .player_profiles import load_player_stats, player_metrics
+
+INDEX_PATH = PROC_DIR / "comparables.npz"
+META_PATH = PROC_DIR / "comparables.meta.json"
+# Ratios only, so Totals and PerGame rows give the same vector.
+FEATURES = ("PTS_36", "REB_36", "AST_36", "STL_36", "BLK_36", "TOV_36", "TS_PCT", "FG3A_RATE", "FTA_RATE", "OREB_SHARE")
+# Seasons with fewer minutes than this do not shape the season's mean and spread.
+NORM_MIN_MINUTES = 200.0
+Z_CLIP = 4.0
+PAIRS_K = 10  # neighbours kept per row in the all-pairs table
+BLOCK_ROWS = 1024
+
+
+@dataclass(frozen=True)
+class Comparable:
+    player_id: int
+    name: str
+    season: str
+    team: str | None
+    age: float | None
+    minutes: float | None
+    distance: float
+    salary: int | None  # BBR salary for that season, summed over teams
+    latest_salary: int | None
+    latest_salary_year: int | None
+
+
+def _source_files(raw_dir: Path) -> List[Path]:
+    # Salaries are joined through the identity index, so the files its links come from
+    # (rosters, contracts, players) and the links themselves count as inputs too.
+    own = [*(raw_dir / "nba_api").glob("player_stats_*.jsonl"), *(raw_dir / "bbr").glob("salaries_*_*.jsonl")]
+    return [*sorted(set(own) | set(_identity_sources(raw_dir))), IDENTITY_PATH]
+
+
+def _season_end_year(label: str) -> int:
+    return int(label[:4]) + 1
+
+
+def feature_vectors(cols: Dict[str, np.ndarray]) -> np.ndarray:
+    """(rows, FEATURES) float32 z-scores within each season; missing stats score as league average."""
+    m = player_metrics(cols)
+    for name, num, den in (("FTA_RATE", "FTA", "FGA"), ("OREB_SHARE", "OREB", "REB")):
+        m[name] = np.full(cols[num].shape, np.nan)
+        np.divide(cols[num], cols[den], out=m[name], where=cols[den] > 0)
+    raw = np.column_stack([m[f] for f in FEATURES])
+    z = np.zeros(raw.shape)
+    seasons = cols["season"]
+    for s in np.unique(seasons):
+        rows = seasons == s
+        base = raw[rows & (np.nan_to_num(cols["MIN"]) >= NORM_MIN_MINUTES)]
+        if len(base) < 2:
+            base = raw[rows]
+        mean, std = np.nanmean(base, axis=0), np.nanstd(base, axis=0)
+        std = np.where(np.isfinite(std) & (std > 0), std, 1.0)
+        z[rows] = (raw[rows] - np.nan_to_num(mean)) / std
+    return np.clip(np.nan_to_num(z), -Z_CLIP, Z_CLIP).astype(np.float32)
+
+
+def _salaries(raw_dir: Path) -> Dict[Tuple[int, int], int]:
+    """BBR salaries keyed by (nba_api PLAYER_ID, season end year)."""
+    ids = get_identity_index()
+    out: Dict[Tuple[int, int], int] = {}
+    for p in sorted((raw_dir / "bbr").glob("salaries_*_*.jsonl")):
+        for row in iter_rows(p, ("player_id", "salary", "year")):
+            pid = ids.nba_id(row.get("player_id") or "")
+            if pid is not None and row.get("salary") and row.get("year"):
+                key = (pid, int(row["year"]))
+                out[key] = out.get(key, 0) + int(row["salary"])
+    return out
+
+
+def build_comparables_arrays(raw_dir: Path = RAW_DIR) -> Dict[str, np.ndarray]:
+    cols = load_player_stats((raw_dir / "nba_api").glob("player_stats_*.jsonl"))
+    if not cols:
+        return {}
+    vectors = feature_vectors(cols)
+    pids = cols["PLAYER_ID"].astype(np.int64)
+    years = np.array([_season_end_year(s) for s in cols["season"]], dtype=np.int64)
+    salaries = _salaries(raw_dir)
+    salary = np.array([salaries.get((p, y), -1) for p, y in zip(pids.tolist(), years.tolist())], dtype=np.int64)
+    latest_year = {}
+    for p, y in salaries:
+        latest_year[p] = max(latest_year.get(p, y), y)
+    latest = np.array([salaries[(p, latest_year[p])] if p in latest_year else -1 for p in pids.tolist()], dtype=np.int64)
+    arrays = {
+        "vectors": vectors,
+        "player_id": pids,
+        "name": np.array(cols["PLAYER_NAME"], dtype=str),
+        "season": np.array(cols["season"], dtype=str),
+        "team": np.array([t or "" for t in cols["TEAM_ABBREVIATION"]], dtype=str),
+        "age": cols["AGE"].astype(np.float32),
+        "minutes": cols["MIN"].astype(np.float32),
+        "salary": salary,
+        "latest_salary": latest,
+        "latest_salary_year": np.array([latest_year.get(p, -1) for p in pids.tolist()], dtype=np.int64),
+    }
+    with metrics.span("comparables.all_pairs"):
+        arrays["pair_index"], arrays["pair_distance"] = _knn(vectors, vectors, pids, pids, np.ones(len(pids), bool), PAIRS_K)
+    return arrays
+
+
+def _knn(
+    queries: np.ndarray, vectors: np.ndarray, query_pids: np.ndarray, pids: np.ndarray, allowed: np.ndarray, k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-k rows of `vectors` (among `allowed`, never the query's own player) per query, nearest first.
+
+    Missing neighbours (fewer than k candidates) are -1 with distance inf.
+    """
+    k = max(0, min(k, len(vectors)))
+    norms = np.einsum("ij,ij->i", vectors, vectors)
+    idx = np.full((len(queries), k), -1, dtype=np.int64)
+    dist = np.full((len(queries), k), np.inf, dtype=np.float32)
+    if not k:
+        return idx, dist
+    for start in range(0, len(queries), BLOCK_ROWS):
+        q = queries[start:start + BLOCK_ROWS]
+        d2 = np.einsum("ij,ij->i", q, q)[:, None] + norms[None, :] - 2.0 * (q @ vectors.T)
+        d2[:, ~allowed] = np.inf
+        d2[query_pids[start:start + BLOCK_ROWS, None] == pids[None, :]] = np.inf
+        part = np.argpartition(d2, k - 1, axis=1)[:, :k]
+        pd = np.take_along_axis(d2, part, axis=1)
+        order = np.argsort(pd, axis=1, kind="stable")
+        part, pd = np.take_along_axis(part, order, axis=1), np.take_along_axis(pd, order, axis=1)
+        ok = np.isfinite(pd)
+        idx[start:start + len(q)] = np.where(ok, part, -1)
+        dist[start:start + len(q)] = np.sqrt(np.maximum(pd, 0.0))
+    return idx, dist
+
+
+class ComparablesIndex:
+    """Player-season stat vectors with batched, filterable k-NN queries."""
+
+    def __init__(self, arrays: Dict[str, np.ndarray], files: Dict[str, List[int]] | None = None):
+        self.files = files or {}
+        self.arrays = arrays
+        self.vectors = arrays.get("vectors", np.zeros((0, len(FEATURES)), np.float32))
+        self.player_id = arrays.get("player_id", np.zeros(0, np.int64))
+        self.season = arrays.get("season", np.zeros(0, str))
+        self.age = arrays.get("age", np.zeros(0, np.float32))
+        self.minutes = arrays.get("minutes", np.zeros(0, np.float32))
+        self._names = [normalize_name(n) for n in arrays.get("name", [])]
+
+    @classmethod
+    def load(cls, raw_dir: Path = RAW_DIR, path: Path = INDEX_PATH, meta_path: Path = META_PATH) -> "ComparablesIndex":
+        get_identity_index()  # bring identity.json up to date first: it is part of the fingerprint
+        files = fingerprint(_source_files(raw_dir))
+        meta: Dict[str, Any] = read_json(meta_path, {}) or {}
+        if path.exists() and meta.get("files") == files and meta.get("features") == list(FEATURES):
+            with np.load(path) as z:
+                arrays = {k: z[k] for k in z.files}
+            return cls(arrays, files)
+        with metrics.span("comparables.build"):
+            arrays = build_comparables_arrays(raw_dir)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.stem + ".tmp.npz")
+        np.savez(tmp, **arrays)
+        tmp.replace(path)
+        write_json(meta_path, {"files": files, "features": list(FEATURES), "rows": len(arrays.get("player_id", []))})
+        return cls(arrays, files)
+
+    def __len__(self) -> int:
+        return len(self.player_id)
+
+    def find(self, player: str | int, season: str | None = None) -> int | None:
+        """Row of a player (nba_api id or name) in `season`, or their latest season."""
+        if isinstance(player, int) or str(player).isdigit():
+            rows = np.flatnonzero(self.player_id == int(player))
+        else:
+            norm = normalize_name(str(player))
+            rows = np.array([i for i, n in enumerate(self._names) if n == norm], dtype=np.int64)
+            if not rows.size:
+                rows = np.array([i for i, n in enumerate(self._names) if norm and norm in n], dtype=np.int64)
+        if season:
+            rows = rows[self.season[rows] == season]
+        if not rows.size:
+            return None
+        return int(rows[np.argmax([_season_end_year(s) for s in self.season[rows]])])
+
+    def mask(
+        self,
+        seasons: Sequence[str] | None = None,
+        min_age: float | None = None,
+        max_age: float | None = None,
+        min_minutes: float | None = None,
+    ) -> np.ndarray:
+        """Rows eligible as neighbours. Minutes are the MIN column as fetched (season totals by default)."""
+        allowed = np.ones(len(self), dtype=bool)
+        if seasons:
+            allowed &= np.isin(self.season, list(seasons))
+        if min_age is not None:
+            allowed &= self.age >= min_age
+        if max_age is not None:
+            allowed &= self.age <= max_age
+        if min_minutes is not None:
+            allowed &= self.minutes >= min_minutes
+        return allowed
+
+    def neighbours(self, rows: Sequence[int], k: int = 5, **filters: Any) -> Tuple[np.ndarray, np.ndarray]:
+        """(rows, k) neighbour rows and distances for a batch of query rows."""
+        rows = np.asarray(rows, dtype=np.int64)
+        if not len(self):
+            return np.full((len(rows), 0), -1, dtype=np.int64), np.zeros((len(rows), 0), dtype=np.float32)
+        if not any(v is not None for v in filters.values()) and k <= self.arrays["pair_index"].shape[1]:
+            return self.arrays["pair_index"][rows, :k], self.arrays["pair_distance"][rows, :k]
+        return _knn(self.vectors[rows], self.vectors, self.player_id[rows], self.player_id, self.mask(**filters), k)
+
+    def comparable(self, row: int, distance: float) -> Comparable:
+        a = self.arrays
+
+        def opt(x, missing=-1):
+            return None if x == missing or (isinstance(x, float) and np.isnan(x)) else x
+
+        return Comparable(
+            player_id=int(a["player_id"][row]), name=str(a["name"][row]), season=str(a["season"][row]),
+            team=str(a["team"][row]) or None, age=opt(float(a["age"][row]), None), minutes=opt(round(float(a["minutes"][row]), 1), None),
+            distance=round(float(distance), 3), salary=opt(int(a["salary"][row])),
+            latest_salary=opt(int(a["latest_salary"][row])), latest_salary_year=opt(int(a["latest_salary_year"][row])),
+        )
+
+    def query(self, rows: Sequence[int], k: int = 5, **filters: Any) -> List[List[Comparable]]:
+        """Comparables for each query row, nearest first."""
+        idx, dist = self.neighbours(rows, k, **filters)
+        return [[self.comparable(int(j), d) for j, d in zip(ri, rd) if j >= 0] for ri, rd in zip(idx, dist)]
+
+    def pairs_table(self, k: int = PAIRS_K) -> Iterable[Dict[str, Any]]:
+        """The all-pairs table as rows: one per (player-season, neighbour rank)."""
+        a = self.arrays
+        for i in range(len(self)):
+            for rank, (j, d) in enumerate(zip(a["pair_index"][i, :k], a["pair_distance"][i, :k]), 1):
+                if j >= 0:
+                    yield {
+                        "player_id": int(a["player_id"][i]), "season": str(a["season"][i]), "rank": rank,
+                        "comp_player_id": int(a["player_id"][j]), "comp_name": str(a["name"][j]),
+                        "comp_season": str(a["season"][j]), "distance": round(float(d), 3),
+                    }
+
+
+_index: ComparablesIndex | None = None
+
+
+def get_comparables_index() -> ComparablesIndex:
+    """Process-wide index, reloaded (and rebuilt if needed) when source files change."""
+    global _index
+    if _index is None or _index.files != fingerprint(_source_files(RAW_DIR)):
+        _index = ComparablesIndex.load()
+    return _index
@@ -0,0 +1,74 @@
+from __future__ import annotations
+import json
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+from ..config import RAW_DIR, PROC_DIR
+from ..metrics import metrics
+from ..storage import write_partitioned, DEFAULT_BATCH_ROWS
+
+# Raw JSONL layouts: (source, filename pattern, column holding the team).
+# Patterns capture the entity, then season and/or team where the filename carries them.
+RAW_LAYOUTS: List[Tuple[str, str, str | None]] = [
+    ("nba_api", r"(team_gamelogs)_(?P<season>[\d-]+)\.jsonl", "TEAM_ID"),
+    ("nba_api", r"(player_gamelogs)_(?P<season>[\d-]+)\.jsonl", "TEAM_ABBREVIATION"),
+    ("nba_api", r"(player_stats)_(?P<season>[\d-]+)\.jsonl", "TEAM_ABBREVIATION"),
+    ("bbr", r"(roster)_(?P<season>\d+)_(?P<team>\w+)\.jsonl", None),
+    ("bbr", r"(salaries)_(?P<season>\d+)_(?P<team>\w+)\.jsonl", None),
+    ("bbr", r"(contracts)_(?P<team>\w+)\.jsonl", None),
+]
+
+
+def _iter_jsonl(path: Path) -> Iterator[Dict[str, Any]]:
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def raw_files(source: str | None = None, entity: str | None = None) -> Iterator[Tuple[str, str, Path, Dict[str, str], str | None]]:
+    """Yield (source, entity, path, filename fields, team column) for known raw files."""
+    for src, pattern, team_col in RAW_LAYOUTS:
+        if source and src != source:
+            continue
+        d = RAW_DIR / src
+        if not d.exists():
+            continue
+        for p in sorted(d.glob("*.jsonl")):
+            m = re.fullmatch(pattern, p.name)
+            if not m or (entity and m.group(1) != entity):
+                continue
+            yield src, m.group(1), p, m.groupdict(), team_col
+
+
+def _rows_with_partitions(path: Path, src: str, fields: Dict[str, str], team_col: str | None) -> Iterator[Dict[str, Any]]:
+    for r in _iter_jsonl(path):
+        season = fields.get("season") or r.get("base_year") or r.get("year")
+        team = fields.get("team") or (r.get(team_col) if team_col else None)
+        yield {**r, "source": src, "season": str(season), "team": str(team)}
+
+
+def export_raw(
+    source: str | None = None,
+    entity: str | None = None,
+    out_root: Path = PROC_DIR,
+    existing: str = "replace",
+    batch_size: int = DEFAULT_BATCH_ROWS,
+) -> Dict[str, int]:
+    """Stream raw JSONL files into `out_root/<entity>/source=/season=/team=/` Parquet datasets.
+
+    Returns rows written per entity.
+    """
+    totals: Dict[str, int] = {}
+    for src, ent, path, fields, team_col in raw_files(source, entity):
+        with metrics.span(f"export.{ent}"):
+            counts = write_partitioned(
+                out_root / ent,
+                _rows_with_partitions(path, src, fields, team_col),
+                ("source", "season", "team"),
+                batch_size=batch_size,
+                existing=existing,
+            )
+        metrics.incr("export.rows", sum(counts.values()))
+        totals[ent] = totals.get(ent, 0) + sum(counts.values())
+    return totals
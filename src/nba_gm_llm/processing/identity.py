@@ -0,0 +1,199 @@
+from __future__ import annotations
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Set, Tuple
+import re
+import unicodedata
+
+from ..columnar import iter_rows
+from ..config import RAW_DIR, PROC_DIR
+from ..storage import fingerprint, read_json, write_json
+
+IDENTITY_PATH = PROC_DIR / "identity.json"
+# BBR team abbreviations that differ from nba_api's.
+BBR_TO_NBA_TEAM = {"BRK": "BKN", "CHO": "CHA", "PHO": "PHX"}
+FUZZY_MIN_SCORE = 0.5  # trigram Jaccard, candidates sharing a team-season
+FUZZY_MIN_SCORE_OPEN = 0.75  # trigram Jaccard, no team-season overlap required
+FUZZY_MIN_MARGIN_OPEN = 0.1  # ... and this far ahead of the runner-up
+_SUFFIXES = {"jr", "sr", "ii", "iii", "iv", "v"}
+
+
+def _repair_mojibake(text: str) -> str:
+    # Pages decoded as Latin-1 turn "Dončić" into "DonÄiÄ"; undo that when it round-trips.
+    try:
+        return text.encode("latin-1").decode("utf-8")
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        return text
+
+
+def normalize_name(name: str) -> str:
+    """Lower-case ASCII name without punctuation or generational suffixes."""
+    text = unicodedata.normalize("NFKD", _repair_mojibake(name or "")).encode("ascii", "ignore").decode("ascii").lower()
+    words = re.sub(r"[^a-z0-9 ]+", "", text.replace("-", " ")).split()
+    return " ".join(w for w in words if w not in _SUFFIXES)
+
+
+def trigrams(norm: str) -> Set[str]:
+    padded = f"  {norm} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _season_label(year: int) -> str:
+    return f"{year - 1}-{str(year)[-2:]}"
+
+
+def _source_files(raw_dir: Path) -> List[Path]:
+    bbr, nba = raw_dir / "bbr", raw_dir / "nba_api"
+    return sorted([
+        *bbr.glob("salaries_*_*.jsonl"), *bbr.glob("roster_*_*.jsonl"), *bbr.glob("contracts_*.jsonl"),
+        *nba.glob("player_stats_*.jsonl"), *nba.glob("players_*.jsonl"),
+    ])
+
+
+_COLUMNS = (
+    "player_id", "player", "year", "base_year", "team", "id", "full_name", "is_active",
+    "PLAYER_ID", "PLAYER_NAME", "TEAM_ABBREVIATION",
+)
+
+
+def _collect(raw_dir: Path) -> Tuple[Dict[str, Dict[str, Any]], Dict[int, Dict[str, Any]]]:
+    """BBR slugs and nba_api ids, each with a display name and its (team, season) stints.
+
+    Teams are normalized to nba_api abbreviations and seasons to '2024-25' labels.
+    nba_api players are `active` when flagged so or present in any player_stats file.
+    """
+    bbr: Dict[str, Dict[str, Any]] = {}
+    nba: Dict[int, Dict[str, Any]] = {}
+    for p in _source_files(raw_dir):
+        for row in iter_rows(p, _COLUMNS):
+            if p.parent.name == "bbr":
+                slug = row.get("player_id")
+                if not slug or not row.get("player"):
+                    continue
+                year = row.get("year") or row.get("base_year")
+                rec = bbr.setdefault(slug, {"name": row["player"], "stints": set()})
+                if year and row.get("team"):
+                    team = BBR_TO_NBA_TEAM.get(row["team"], row["team"])
+                    rec["stints"].add((team, _season_label(int(year))))
+            elif p.name.startswith("players_"):
+                if row.get("id") and row.get("full_name"):
+                    rec = nba.setdefault(int(row["id"]), {"name": row["full_name"], "stints": set(), "active": False})
+                    rec["active"] = rec["active"] or bool(row.get("is_active"))
+            elif row.get("PLAYER_ID") and row.get("PLAYER_NAME"):
+                rec = nba.setdefault(int(row["PLAYER_ID"]), {"name": row["PLAYER_NAME"], "stints": set()})
+                rec["name"] = row["PLAYER_NAME"]
+                rec["active"] = True
+                if row.get("TEAM_ABBREVIATION"):
+                    rec["stints"].add((row["TEAM_ABBREVIATION"], p.stem.rsplit("_", 1)[-1]))
+    return bbr, nba
+
+
+class IdentityIndex:
+    """Two-way map between BBR player slugs and nba_api PLAYER_IDs.
+
+    Exact normalized-name matches are linked first (several same-name players are
+    narrowed to the one sharing a team-season, then to the only active one); the
+    rest go through a trigram fuzzy match, restricted to players who share a
+    team-season unless the best score is high and clear of the runner-up. Links are
+    persisted in data/processed/identity.json and kept across updates, so only
+    newly seen BBR slugs are matched.
+    """
+
+    def __init__(self, path: Path = IDENTITY_PATH):
+        self.path = path
+        data: Dict[str, Any] = read_json(path, {}) or {}
+        self.links: Dict[str, Dict[str, Any]] = data.get("links", {})
+        self.unmatched: List[str] = data.get("unmatched", [])
+        self.files: Dict[str, List[int]] = data.get("files", {})
+        self._reindex()
+
+    def _reindex(self) -> None:
+        self._to_nba = {slug: link["nba_id"] for slug, link in self.links.items()}
+        self._to_bbr = {link["nba_id"]: slug for slug, link in self.links.items()}
+
+    def nba_id(self, bbr_slug: str) -> int | None:
+        return self._to_nba.get(bbr_slug)
+
+    def bbr_id(self, nba_id: int) -> str | None:
+        return self._to_bbr.get(int(nba_id))
+
+    def update(self, raw_dir: Path = RAW_DIR, rematch: bool = False) -> Dict[str, int]:
+        """Match BBR slugs not yet linked; a no-op when no source file changed."""
+        files = fingerprint(_source_files(raw_dir))
+        if files == self.files and not rematch:
+            return {"new": 0, "linked": len(self.links), "unmatched": len(self.unmatched)}
+        if rematch:
+            self.links = {}
+        bbr, nba = _collect(raw_dir)
+        taken = {link["nba_id"] for link in self.links.values()}
+        pending = [s for s in sorted(bbr) if s not in self.links]
+
+        by_name: Dict[str, List[int]] = defaultdict(list)
+        by_stint: Dict[Tuple[str, str], Set[int]] = defaultdict(set)
+        grams: Dict[int, Set[str]] = {}
+        postings: Dict[str, Set[int]] = defaultdict(set)
+        for pid, rec in nba.items():
+            if pid in taken:
+                continue
+            norm = normalize_name(rec["name"])
+            by_name[norm].append(pid)
+            for st in rec["stints"]:
+                by_stint[st].add(pid)
+            grams[pid] = trigrams(norm)
+            for g in grams[pid]:
+                postings[g].add(pid)
+
+        def link(slug: str, pid: int, method: str, score: float = 1.0) -> None:
+            self.links[slug] = {"nba_id": pid, "method": method, "score": round(score, 3)}
+            taken.add(pid)
+
+        fuzzy: List[str] = []
+        shared: Dict[str, Set[int]] = {}
+        for slug in pending:
+            rec = bbr[slug]
+            shared[slug] = set().union(*(by_stint.get(st, set()) for st in rec["stints"]))
+            exact = [pid for pid in by_name.get(normalize_name(rec["name"]), []) if pid not in taken]
+            if len(exact) > 1:
+                exact = [pid for pid in exact if pid in shared[slug]] or [pid for pid in exact if nba[pid].get("active")]
+            if len(exact) == 1:
+                link(slug, exact[0], "name")
+            else:
+                fuzzy.append(slug)
+
+        # Fuzzy fallback over the trigram postings, scored by Jaccard similarity.
+        unmatched: List[str] = []
+        for slug in fuzzy:
+            q = trigrams(normalize_name(bbr[slug]["name"]))
+            counts: Dict[int, int] = defaultdict(int)
+            for g in q:
+                for pid in postings.get(g, ()):
+                    counts[pid] += 1
+            scored = sorted(
+                ((n / len(q | grams[pid]), pid) for pid, n in counts.items() if pid not in taken), reverse=True
+            )
+            best = next(((sc, pid) for sc, pid in scored if pid in shared[slug] and sc >= FUZZY_MIN_SCORE), None)
+            if best is None and scored and scored[0][0] >= FUZZY_MIN_SCORE_OPEN:
+                if len(scored) == 1 or scored[0][0] - scored[1][0] >= FUZZY_MIN_MARGIN_OPEN:
+                    best = scored[0]
+            if best is not None:
+                link(slug, best[1], "fuzzy", best[0])
+            else:
+                unmatched.append(slug)
+
+        self.unmatched = unmatched
+        self.files = files
+        self._reindex()
+        write_json(self.path, {"links": self.links, "unmatched": self.unmatched, "files": self.files})
+        return {"new": len(pending) - len(unmatched), "linked": len(self.links), "unmatched": len(unmatched)}
+
+
+_index: IdentityIndex | None = None
+
+
+def get_identity_index() -> IdentityIndex:
+    """Process-wide identity index, brought up to date with the raw files on first use."""
+    global _index
+    if _index is None:
+        _index = IdentityIndex()
+        _index.update()
+    return _index
@@ -0,0 +1,154 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+import numpy as np
+
+from ..columnar import iter_rows
+from ..config import RAW_DIR, PROC_DIR, SALARY_THRESHOLDS
+from ..storage import fingerprint, read_json, write_json
+
+# Contract statuses as derived by `bbr.fetch_team_contracts`; "unknown" holds salary
+# for (team, year) cells with no matching contracts row.
+STATUSES = ("guaranteed", "non_guaranteed", "player_option", "team_option", "unknown")
+THRESHOLDS = ("cap", "tax", "first_apron", "second_apron")
+INDEX_PATH = PROC_DIR / "payroll.npz"
+META_PATH = PROC_DIR / "payroll.meta.json"
+
+
+@dataclass(frozen=True)
+class TeamPayroll:
+    team: str
+    year: int
+    payroll: int
+    players: int
+    by_status: Dict[str, int]
+    room: Dict[str, int | None]  # threshold minus payroll (negative = over); None when thresholds unknown
+
+
+def _source_files(raw_dir: Path) -> List[Path]:
+    bbr = raw_dir / "bbr"
+    return sorted([*bbr.glob("salaries_*_*.jsonl"), *bbr.glob("contracts_*.jsonl")])
+
+
+def build_payroll_arrays(raw_dir: Path = RAW_DIR) -> Tuple[List[str], List[int], Dict[str, np.ndarray]]:
+    """Aggregate salaries and contracts into team x year arrays.
+
+    A (team, year) payroll comes from the team-page salaries when present (duplicate
+    per-contract rows for a player are summed), else from the contracts page
+    `current_salary` for its base year. Status is taken from the contracts row
+    for the same player, team and base year.
+    """
+    salaries: Dict[Tuple[str, int], Dict[str, int]] = {}
+    contracts: Dict[Tuple[str, int], Dict[str, Tuple[int, str]]] = {}
+    columns = ("player_id", "player", "team", "year", "salary", "base_year", "current_salary", "status")
+    for p in _source_files(raw_dir):
+        for row in iter_rows(p, columns):
+            pid = row.get("player_id") or row.get("player")
+            if p.name.startswith("salaries_"):
+                cell = salaries.setdefault((row["team"], int(row["year"])), {})
+                cell[pid] = cell.get(pid, 0) + int(row.get("salary") or 0)
+            elif row.get("base_year"):
+                contracts.setdefault((row["team"], int(row["base_year"])), {})[pid] = (
+                    int(row.get("current_salary") or 0), row.get("status") or "guaranteed"
+                )
+
+    cells = sorted(set(salaries) | set(contracts))
+    teams = sorted({t for t, _ in cells})
+    years = sorted({y for _, y in cells})
+    ti = {t: i for i, t in enumerate(teams)}
+    yi = {y: j for j, y in enumerate(years)}
+    status_idx = {s: k for k, s in enumerate(STATUSES)}
+    by_status = np.zeros((len(teams), len(years), len(STATUSES)), dtype=np.int64)
+    players = np.zeros((len(teams), len(years)), dtype=np.int32)
+    present = np.zeros((len(teams), len(years)), dtype=bool)
+    for key in cells:
+        i, j = ti[key[0]], yi[key[1]]
+        present[i, j] = True
+        deals = contracts.get(key, {})
+        if key in salaries:
+            amounts = salaries[key]
+            for pid, amount in amounts.items():
+                status = deals[pid][1] if pid in deals else "unknown"
+                by_status[i, j, status_idx.get(status, status_idx["unknown"])] += amount
+        else:
+            amounts = {pid: amount for pid, (amount, _) in deals.items()}
+            for amount, status in deals.values():
+                by_status[i, j, status_idx.get(status, status_idx["unknown"])] += amount
+        players[i, j] = sum(1 for a in amounts.values() if a)
+    thresholds = np.array(
+        [SALARY_THRESHOLDS.get(y, (-1,) * len(THRESHOLDS)) for y in years], dtype=np.int64
+    ).reshape(len(years), len(THRESHOLDS))
+    return teams, years, {"by_status": by_status, "players": players, "present": present, "thresholds": thresholds}
+
+
+class PayrollIndex:
+    """Team x season payroll arrays with O(1) lookups by (team, year).
+
+    Stored as data/processed/payroll.npz plus a meta JSON holding the axis labels
+    and the (mtime, size) fingerprint of every source file; `load` rebuilds only
+    when that fingerprint changes.
+    """
+
+    def __init__(self, teams: List[str], years: List[int], arrays: Dict[str, np.ndarray], files: Dict[str, List[int]] | None = None):
+        self.teams = teams
+        self.files = files or {}
+        self.years = years
+        self._ti = {t: i for i, t in enumerate(teams)}
+        self._yi = {y: j for j, y in enumerate(years)}
+        self.by_status = arrays["by_status"]
+        self.players = arrays["players"]
+        self.present = arrays["present"]
+        self.thresholds = arrays["thresholds"]
+        self.payroll = self.by_status.sum(axis=2)
+        # room[t, y, k] = threshold k for year y minus payroll; negative means over.
+        self.room = self.thresholds[None, :, :] - self.payroll[:, :, None]
+
+    @classmethod
+    def load(cls, raw_dir: Path = RAW_DIR, path: Path = INDEX_PATH, meta_path: Path = META_PATH) -> "PayrollIndex":
+        files = fingerprint(_source_files(raw_dir))
+        meta: Dict[str, Any] = read_json(meta_path, {}) or {}
+        if path.exists() and meta.get("files") == files:
+            with np.load(path) as z:
+                arrays = {k: z[k] for k in z.files}
+            return cls(meta["teams"], meta["years"], arrays, files)
+        teams, years, arrays = build_payroll_arrays(raw_dir)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.stem + ".tmp.npz")
+        np.savez_compressed(tmp, **arrays)
+        tmp.replace(path)
+        write_json(meta_path, {"teams": teams, "years": years, "files": files, "statuses": list(STATUSES)})
+        return cls(teams, years, arrays, files)
+
+    def get(self, team: str, year: int) -> TeamPayroll | None:
+        i, j = self._ti.get(team), self._yi.get(year)
+        if i is None or j is None or not self.present[i, j]:
+            return None
+        known = self.thresholds[j, 0] >= 0
+        return TeamPayroll(
+            team=team,
+            year=year,
+            payroll=int(self.payroll[i, j]),
+            players=int(self.players[i, j]),
+            by_status={s: int(v) for s, v in zip(STATUSES, self.by_status[i, j])},
+            room={k: int(v) if known else None for k, v in zip(THRESHOLDS, self.room[i, j])},
+        )
+
+    def league(self, year: int) -> List[TeamPayroll]:
+        """Every team with data for `year`, highest payroll first."""
+        j = self._yi.get(year)
+        if j is None:
+            return []
+        order = np.argsort(-self.payroll[:, j], kind="stable")
+        return [self.get(self.teams[i], year) for i in order if self.present[i, j]]
+
+
+_index: PayrollIndex | None = None
+
+
+def get_payroll_index() -> PayrollIndex:
+    """Process-wide index, reloaded (and rebuilt if needed) when source files change."""
+    global _index
+    if _index is None or _index.files != fingerprint(_source_files(RAW_DIR)):
+        _index = PayrollIndex.load()
+    return _index
@@ -0,0 +1,211 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from ..columnar import load_table
+
+# Counting stats read from LeagueDashPlayerStats rows. The rate metrics are ratios of
+# these, so they are the same for Totals or PerGame rows; MIN, PLUS_MINUS and the MIN
+# delta are not, and read as whichever mode the rows were fetched in.
+STAT_COLUMNS = ("GP", "MIN", "PTS", "REB", "OREB", "AST", "STL", "BLK", "TOV", "FGA", "FTA", "FG3A", "PLUS_MINUS")
+PER36 = ("PTS", "REB", "AST", "STL", "BLK", "TOV")
+PER100 = ("PTS", "REB", "AST")
+# Metrics ranked against the league for the same season. The pool is players with at
+# least this share of the season's most minutes (a relative floor, so it holds for
+# Totals or PerGame rows and early in a season); players below it are still placed
+# against the pool, but a 40-minute cameo cannot set the top of a rate list.
+PERCENTILE_MIN_SHARE = 0.25
+PERCENTILE_METRICS = ("PTS_36", "REB_36", "AST_36", "STL_36", "BLK_36", "TS_PCT", "PTS_100")
+DELTA_METRICS = ("MIN", "PTS_36", "REB_36", "AST_36", "TS_PCT")
+
+
+def _season_of(path: Path) -> str:
+    return path.stem.rsplit("_", 1)[-1]
+
+
+def load_player_stats(paths: Iterable[Path]) -> Dict[str, np.ndarray]:
+    """Read player_stats_{season}.jsonl files into one set of NumPy columns.
+
+    Files are read through their memory-mapped columnar sidecars; a `season`
+    column is added from the file name. Missing stat columns load as NaN.
+    """
+    tables = []
+    for p in sorted(paths, key=_season_of):
+        t = load_table(p)
+        if t.num_rows == 0:
+            continue
+        n = t.num_rows
+        cols = {
+            "PLAYER_ID": pc.cast(t["PLAYER_ID"], pa.int64()),
+            "PLAYER_NAME": pc.cast(t["PLAYER_NAME"], pa.string()),
+            "TEAM_ABBREVIATION": pc.cast(t["TEAM_ABBREVIATION"], pa.string()) if "TEAM_ABBREVIATION" in t.column_names else pa.nulls(n, pa.string()),
+            "AGE": pc.cast(t["AGE"], pa.float64()) if "AGE" in t.column_names else pa.nulls(n, pa.float64()),
+            "season": pa.array([_season_of(p)] * n, pa.string()),
+        }
+        for c in STAT_COLUMNS:
+            cols[c] = pc.cast(t[c], pa.float64()) if c in t.column_names else pa.nulls(n, pa.float64())
+        tables.append(pa.table(cols))
+    if not tables:
+        return {}
+    table = pa.concat_tables(tables)
+    out = {c: table[c].to_numpy(zero_copy_only=False) for c in table.column_names}
+    for c in ("AGE", *STAT_COLUMNS):
+        out[c] = np.asarray(out[c], dtype=np.float64)
+    return out
+
+
+def _ratio(num: np.ndarray, den: np.ndarray, scale: float = 1.0) -> np.ndarray:
+    out = np.full(num.shape, np.nan)
+    np.divide(num * scale, den, out=out, where=den > 0)
+    return out
+
+
+def _group_percentiles(values: np.ndarray, groups: np.ndarray, pool: np.ndarray) -> np.ndarray:
+    """Percentile (0-100) of each value among the `pool` values of its group.
+
+    Ties share their average rank; values outside the pool are placed as if
+    inserted into it. NaN values, and groups with an empty pool, stay NaN.
+    """
+    pct = np.full(values.shape, np.nan)
+    valid = ~np.isnan(values)
+    for g in np.unique(groups[valid]):
+        in_group = valid & (groups == g)
+        ref = np.sort(values[in_group & pool])
+        n = ref.size
+        if not n:
+            continue
+        v = values[in_group]
+        less = np.searchsorted(ref, v, "left")
+        equal = np.searchsorted(ref, v, "right") - less
+        member = 100.0 * (less + (equal - 1) / 2) / (n - 1) if n > 1 else np.full(v.shape, 100.0)
+        pct[in_group] = np.where(pool[in_group], member, 100.0 * (less + equal / 2) / n)
+    return pct
+
+
+def player_metrics(cols: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Derived rates, league percentiles and season-over-season deltas, all vectorized.
+
+    Possessions use the usual box-score estimate FGA + 0.44*FTA - OREB + TOV.
+    Deltas compare a player's season with the immediately preceding season label.
+    """
+    m: Dict[str, np.ndarray] = {}
+    minutes = cols["MIN"]
+    for c in PER36:
+        m[f"{c}_36"] = _ratio(cols[c], minutes, 36.0)
+    poss = cols["FGA"] + 0.44 * cols["FTA"] - cols["OREB"] + cols["TOV"]
+    for c in PER100:
+        m[f"{c}_100"] = _ratio(cols[c], poss, 100.0)
+    m["TS_PCT"] = _ratio(cols["PTS"], 2.0 * (cols["FGA"] + 0.44 * cols["FTA"]))
+    m["FG3A_RATE"] = _ratio(cols["FG3A"], cols["FGA"])
+
+    seasons, season_idx = np.unique(cols["season"], return_inverse=True)
+    most = np.zeros(seasons.size)
+    np.fmax.at(most, season_idx, minutes)
+    pool = minutes >= PERCENTILE_MIN_SHARE * most[season_idx]
+    for k in PERCENTILE_METRICS:
+        m[f"{k}_PCTL"] = _group_percentiles(m[k], season_idx, pool)
+
+    # Previous-season row for the same player: sort by (player, season) and look one back.
+    start_year = np.array([int(s[:4]) for s in seasons])[season_idx]
+    order = np.lexsort((start_year, cols["PLAYER_ID"]))
+    prev = np.full(order.size, -1)
+    same = (cols["PLAYER_ID"][order][1:] == cols["PLAYER_ID"][order][:-1]) & (
+        start_year[order][1:] == start_year[order][:-1] + 1
+    )
+    prev[order[1:][same]] = order[:-1][same]
+    has_prev = prev >= 0
+    for k in DELTA_METRICS:
+        base = cols[k] if k in cols else m[k]
+        delta = np.full(base.shape, np.nan)
+        delta[has_prev] = base[has_prev] - base[prev[has_prev]]
+        m[f"{k}_DELTA"] = delta
+    return m
+
+
+def _clean(x: Any, digits: int) -> Any:
+    if isinstance(x, (float, np.floating)):
+        if np.isnan(x):
+            return None
+        return int(round(x)) if digits == 0 else round(float(x), digits)
+    if isinstance(x, np.integer):
+        return int(x)
+    return x
+
+
+def player_profiles(paths: Iterable[Path]) -> Dict[str, Dict[str, Any]]:
+    """Per-player records (one entry per season, oldest first) for profile documents."""
+    cols = load_player_stats(paths)
+    if not cols:
+        return {}
+    m = player_metrics(cols)
+    fields = {
+        "season": cols["season"], "team": cols["TEAM_ABBREVIATION"], "age": cols["AGE"],
+        "gp": cols["GP"], "min": cols["MIN"], "pts": cols["PTS"], "reb": cols["REB"], "ast": cols["AST"],
+        "plus_minus": cols["PLUS_MINUS"], **{k.lower(): v for k, v in m.items()},
+    }
+    # Rounding and NaN -> None happen column-wise; only the final grouping walks rows.
+    rounded = {
+        k: [_clean(x, 0 if k == "gp" else 3 if k in ("ts_pct", "ts_pct_delta", "fg3a_rate") else 1) for x in v.tolist()]
+        for k, v in fields.items()
+    }
+    order = np.lexsort((cols["season"], cols["PLAYER_ID"]))
+    pid_sorted = cols["PLAYER_ID"][order]
+    bounds = np.flatnonzero(np.r_[True, pid_sorted[1:] != pid_sorted[:-1], True])
+    names = cols["PLAYER_NAME"]
+    out: Dict[str, Dict[str, Any]] = {}
+    for a, b in zip(bounds[:-1], bounds[1:]):
+        rows = order[a:b]
+        out[str(pid_sorted[a])] = {
+            "player_id": int(pid_sorted[a]),
+            "name": names[rows[-1]],
+            "seasons": [{k: v[i] for k, v in rounded.items()} for i in rows],
+        }
+    return out
+
+
+def _fmt(x: Any, pct: bool = False) -> str:
+    if x is None:
+        return "—"
+    return f"{x * 100:.1f}%" if pct else f"{x}"
+
+
+def _signed(x: Any, pct: bool = False) -> str:
+    if x is None:
+        return "—"
+    return f"{x * 100:+.1f} pts" if pct else f"{x:+.1f}"
+
+
+def render_player_profile(profile: Dict[str, Any]) -> str:
+    seasons: List[Dict[str, Any]] = profile["seasons"]
+    latest = seasons[-1]
+    content = [
+        f"# {profile['name']} ({profile['player_id']})",
+        "",
+        f"Latest season: {latest['season']} — {latest['team']}, age {_fmt(latest['age'])}",
+        "",
+        "| Season | Team | GP | MIN | PTS | PTS/36 | REB/36 | AST/36 | PTS/100 | TS% | +/- |",
+        "|---|---|---|---|---|---|---|---|---|---|---|",
+    ]
+    for s in seasons:
+        content.append(
+            f"| {s['season']} | {s['team']} | {_fmt(s['gp'])} | {_fmt(s['min'])} | {_fmt(s['pts'])} | {_fmt(s['pts_36'])} "
+            f"| {_fmt(s['reb_36'])} | {_fmt(s['ast_36'])} | {_fmt(s['pts_100'])} | {_fmt(s['ts_pct'], True)} | {_fmt(s['plus_minus'])} |"
+        )
+    content += ["", f"League percentiles ({latest['season']}):"]
+    for k, label in (("pts_36", "PTS/36"), ("reb_36", "REB/36"), ("ast_36", "AST/36"), ("stl_36", "STL/36"),
+                     ("blk_36", "BLK/36"), ("ts_pct", "TS%"), ("pts_100", "PTS/100")):
+        content.append(f"- {label}: {_fmt(latest[f'{k}_pctl'])}")
+    if profile.get("salaries"):
+        content += ["", "Salary:"]
+        content += [f"- {s['year']} {s['team']}: ${s['salary']:,}" for s in profile["salaries"]]
+    if latest["min_delta"] is not None:
+        content += [
+            "",
+            f"Change vs previous season: MIN {_signed(latest['min_delta'])}, PTS/36 {_signed(latest['pts_36_delta'])}, "
+            f"REB/36 {_signed(latest['reb_36_delta'])}, AST/36 {_signed(latest['ast_36_delta'])}, "
+            f"TS% {_signed(latest['ts_pct_delta'], True)}",
+        ]
+    return "\n".join(content)
@@ -0,0 +1,337 @@
+"""Monte Carlo season and playoff projections from team game logs.
+
+Ratings come from a ridge least-squares fit of home point margin on
+`home court + rating[home] - rating[away]` over the games played so far; the
+residual spread turns a rating gap into a win probability. Each simulated
+season draws its own ratings from the fit's uncertainty, plays the remaining
+schedule, seeds both conferences (ties broken at random), runs the play-in and
+a best-of-seven bracket with 2-2-1-1-1 home court, all as NumPy arrays over a
+block of seasons at once.
+
+Blocks get child seeds from one `SeedSequence`, so results depend on `seed`
+and `sims` only, not on how many worker processes ran them.
+"""
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+import numpy as np
+
+from ..columnar import load_table
+from ..metrics import metrics
+
+# nba_api abbreviation -> (conference, division)
+DIVISIONS: Dict[str, Tuple[str, str]] = {
+    **{t: ("East", "Atlantic") for t in ("BOS", "BKN", "NYK", "PHI", "TOR")},
+    **{t: ("East", "Central") for t in ("CHI", "CLE", "DET", "IND", "MIL")},
+    **{t: ("East", "Southeast") for t in ("ATL", "CHA", "MIA", "ORL", "WAS")},
+    **{t: ("West", "Northwest") for t in ("DEN", "MIN", "OKC", "POR", "UTA")},
+    **{t: ("West", "Pacific") for t in ("GSW", "LAC", "LAL", "PHX", "SAC")},
+    **{t: ("West", "Southwest") for t in ("DAL", "HOU", "MEM", "NOP", "SAS")},
+}
+CONFERENCES = ("East", "West")
+GAMES_PER_TEAM = 82
+DEFAULT_SIMS = 100_000
+BLOCK_SIMS = 10_000  # seasons per block: bounds memory to ~100 MB and is the unit of work per process
+RIDGE = 2.0  # pulls each rating toward 0 by the weight of this many games
+ROUNDS = ("playoffs", "round2", "conf_finals", "finals", "title")
+_HOME_GAMES = np.array([1, 1, 0, 0, 1, 0, 1], dtype=bool)  # series games hosted by the better seed
+
+
+@dataclass
+class SeasonModel:
+    season: str
+    teams: List[str]  # abbreviations; index = team number below
+    team_ids: List[int]
+    conference: np.ndarray  # (teams,) 0 = East, 1 = West
+    wins: np.ndarray  # (teams,) wins so far
+    losses: np.ndarray
+    ratings: np.ndarray  # (teams,) points above average
+    rating_se: np.ndarray
+    home_court: float
+    sigma: float  # residual standard deviation of a game margin
+    home: np.ndarray  # (remaining games,) team numbers
+    away: np.ndarray
+
+
+def _read_games(path: Path) -> Tuple[Dict[str, int], Dict[str, Dict[str, Any]]]:
+    """Team ids by abbreviation, and each game's teams and per-side results keyed by Game_ID."""
+    table = load_table(path)
+    have = set(table.column_names)
+    col = {c: table.column(c).to_pylist() if c in have else [None] * table.num_rows
+           for c in ("Game_ID", "MATCHUP", "WL", "PTS", "PLUS_MINUS")}
+    ids = table.column("TEAM_ID" if "TEAM_ID" in have else "Team_ID").to_pylist()
+    team_ids: Dict[str, int] = {}
+    games: Dict[str, Dict[str, Any]] = {}
+    for i, matchup in enumerate(col["MATCHUP"]):
+        if not matchup or col["Game_ID"][i] is None:
+            continue
+        parts = matchup.split()
+        abbr, opp, home = parts[0], parts[-1], " vs. " in matchup
+        team_ids.setdefault(abbr, int(ids[i]))
+        g = games.setdefault(str(col["Game_ID"][i]), {})
+        g["home" if home else "away"] = {"wl": col["WL"][i], "pts": col["PTS"][i], "plus_minus": col["PLUS_MINUS"][i]}
+        g["teams"] = {"home": abbr, "away": opp} if home else {"home": opp, "away": abbr}
+    return team_ids, games
+
+
+def _home_margin(g: Dict[str, Any]) -> float | None:
+    h, a = g.get("home"), g.get("away")
+    if h and h["plus_minus"] is not None:
+        return float(h["plus_minus"])
+    if a and a["plus_minus"] is not None:
+        return -float(a["plus_minus"])
+    if h and a and h["pts"] is not None and a["pts"] is not None:
+        return float(h["pts"]) - float(a["pts"])
+    return None
+
+
+def remaining_schedule(teams: List[str], played: np.ndarray, hosted: np.ndarray, games: int = GAMES_PER_TEAM) -> Tuple[np.ndarray, np.ndarray]:
+    """An estimate of the games left: (home, away) team numbers.
+
+    Game logs only hold games already played, so the rest of the schedule is
+    rebuilt from the league format: 4 games against each division rival, 2
+    against each team in the other conference, 3 or 4 against the rest of the
+    conference. Pairs furthest below those counts are filled first until each
+    team has `games` (or no opponent with games left remains). Each game goes to
+    whichever side hosted fewer of the pair's games, then fewer games overall.
+    """
+    n = len(teams)
+    conf = [DIVISIONS.get(t, ("?", "?"))[0] for t in teams]
+    div = [DIVISIONS.get(t, ("?", "?"))[1] for t in teams]
+    left = games - played.sum(axis=1)
+    extra = np.zeros((n, n), dtype=int)
+    phases = [
+        (lambda i, j: div[i] == div[j], 4),
+        (lambda i, j: conf[i] != conf[j], 2),
+        (lambda i, j: conf[i] == conf[j] and div[i] != div[j], 3),
+        (lambda i, j: conf[i] == conf[j] and div[i] != div[j], 4),
+        (lambda i, j: True, 5),  # whatever the greedy fill could not place
+    ]
+    for same, cap in phases:
+        pairs = [(i, j) for i in range(n) for j in range(i + 1, n) if same(i, j)]
+        pairs.sort(key=lambda p: played[p] - cap)
+        for i, j in pairs:
+            k = min(cap - played[i, j] - extra[i, j], left[i], left[j])
+            if k > 0:
+                extra[i, j] = extra[j, i] = extra[i, j] + k
+                left[i] -= k
+                left[j] -= k
+    home, away = [], []
+    pair_hosted, total_hosted = hosted.copy(), hosted.sum(axis=1)
+    for _ in range(int(extra.max(initial=0))):
+        for i, j in zip(*np.nonzero(np.triu(extra))):
+            extra[i, j] -= 1
+            h, a = (i, j) if (pair_hosted[i, j], total_hosted[i]) <= (pair_hosted[j, i], total_hosted[j]) else (j, i)
+            pair_hosted[h, a] += 1
+            total_hosted[h] += 1
+            home.append(h)
+            away.append(a)
+    return np.array(home, dtype=np.int64), np.array(away, dtype=np.int64)
+
+
+def fit_season(path: Path, season: str = "") -> SeasonModel:
+    """Ratings, records so far and the remaining schedule from `team_gamelogs_{season}.jsonl`."""
+    with metrics.span("simulate.fit"):
+        team_ids, games = _read_games(path)
+        teams = sorted(team_ids)
+        idx = {t: i for i, t in enumerate(teams)}
+        n = len(teams)
+        wins, losses = np.zeros(n, dtype=np.int64), np.zeros(n, dtype=np.int64)
+        played, hosted = np.zeros((n, n), dtype=np.int64), np.zeros((n, n), dtype=np.int64)
+        rows, margins = [], []
+        for g in games.values():
+            h, a = idx.get(g["teams"]["home"]), idx.get(g["teams"]["away"])
+            if h is None or a is None:
+                continue
+            played[h, a] += 1
+            played[a, h] += 1
+            hosted[h, a] += 1
+            # Either side's row decides the game when the other is missing.
+            result = g["home"]["wl"] if "home" in g else {"W": "L", "L": "W"}.get(g["away"]["wl"])
+            if result in ("W", "L"):
+                winner, loser = (h, a) if result == "W" else (a, h)
+                wins[winner] += 1
+                losses[loser] += 1
+            m = _home_margin(g)
+            if m is not None:
+                rows.append((h, a))
+                margins.append(m)
+        # margin = home_court + r[home] - r[away]; the ridge term keeps it solvable early in the season.
+        X = np.zeros((len(rows), n + 1))
+        r = np.arange(len(rows))
+        pairs = np.array(rows, dtype=np.int64).reshape(-1, 2)
+        X[r, pairs[:, 0]] += 1.0
+        X[r, pairs[:, 1]] -= 1.0
+        X[:, n] = 1.0
+        y = np.array(margins)
+        penalty = np.diag([RIDGE] * n + [1e-6])
+        cov = np.linalg.inv(X.T @ X + penalty)
+        beta = cov @ X.T @ y
+        resid = y - X @ beta
+        sigma = float(np.sqrt(resid @ resid / max(len(y) - n - 1, 1))) if len(y) > n + 1 else 12.0
+        home, away = remaining_schedule(teams, played, hosted)
+    return SeasonModel(
+        season=season, teams=teams, team_ids=[team_ids[t] for t in teams],
+        conference=np.array([CONFERENCES.index(DIVISIONS.get(t, ("East",))[0]) for t in teams]),
+        wins=wins, losses=losses, ratings=beta[:n], rating_se=sigma * np.sqrt(np.diag(cov)[:n]),
+        home_court=float(beta[n]), sigma=sigma, home=home, away=away,
+    )
+
+
+def _games(model: SeasonModel, R: np.ndarray, rng: np.random.Generator, home: np.ndarray, away: np.ndarray) -> np.ndarray:
+    """Whether the home side wins: one game per row, (sims,) team numbers each."""
+    rows = np.arange(len(R))
+    mu = model.home_court + R[rows, home] - R[rows, away]
+    return mu + model.sigma * rng.standard_normal(len(R), dtype=np.float32) > 0
+
+
+def _series(model: SeasonModel, R: np.ndarray, rng: np.random.Generator, hi: np.ndarray, lo: np.ndarray) -> np.ndarray:
+    """Best-of-seven winners, `hi` holding home court. Playing all seven games picks the same winner."""
+    rows = np.arange(len(R))
+    diff = (R[rows, hi] - R[rows, lo])[:, None]
+    mu = np.where(_HOME_GAMES, diff + model.home_court, diff - model.home_court)
+    hi_wins = (mu + model.sigma * rng.standard_normal((len(R), 7), dtype=np.float32) > 0).sum(axis=1)
+    return np.where(hi_wins >= 4, hi, lo)
+
+
+def _simulate_block(model: SeasonModel, sims: int, seed: np.random.SeedSequence) -> Dict[str, np.ndarray]:
+    """Counts over `sims` seasons: wins histogram, seed by record, and rounds reached per team."""
+    rng = np.random.default_rng(seed)
+    n = len(model.teams)
+    rows = np.arange(sims)
+    R = (model.ratings + model.rating_se * rng.standard_normal((sims, n))).astype(np.float32)
+    wins = np.broadcast_to(model.wins, (sims, n)).copy()
+    if len(model.home):
+        # (sims, games) outcomes; one-hot matmuls credit each win to its team.
+        mu = model.home_court + R[:, model.home] - R[:, model.away]
+        home_won = (mu + model.sigma * rng.standard_normal(mu.shape, dtype=np.float32) > 0).astype(np.float32)
+        g = np.arange(len(model.home))
+        H = np.zeros((len(g), n), dtype=np.float32)
+        A = np.zeros((len(g), n), dtype=np.float32)
+        H[g, model.home] = 1.0
+        A[g, model.away] = 1.0
+        wins += np.rint(home_won @ H + (1.0 - home_won) @ A).astype(np.int64)
+    # Ties in the standings are broken at random.
+    key = wins + rng.random((sims, n))
+    seed_hist = np.zeros((n, 10), dtype=np.int64)
+    reached = {r: np.zeros(n, dtype=np.int64) for r in ROUNDS}
+    champs = []
+    for c in range(len(CONFERENCES)):
+        members = np.flatnonzero(model.conference == c)
+        if len(members) < 10:
+            continue
+        order = members[np.argsort(-key[:, members], axis=1)][:, :10]  # (sims, 10) team numbers by seed
+        seed_hist += np.bincount((order * 10 + np.arange(10)).ravel(), minlength=n * 10).reshape(n, 10)
+        # Play-in: 7 v 8 for the 7th seed; its loser v the winner of 9 v 10 for the 8th.
+        w78 = _games(model, R, rng, order[:, 6], order[:, 7])
+        seven = np.where(w78, order[:, 6], order[:, 7])
+        loser78 = np.where(w78, order[:, 7], order[:, 6])
+        w910 = np.where(_games(model, R, rng, order[:, 8], order[:, 9]), order[:, 8], order[:, 9])
+        eight = np.where(_games(model, R, rng, loser78, w910), loser78, w910)
+        seeds = np.column_stack([order[:, :6], seven, eight])
+        for t in seeds.T:
+            reached["playoffs"] += np.bincount(t, minlength=n)
+        # Bracket 1-8, 4-5, 3-6, 2-7; the better seed keeps home court throughout.
+        teams = [seeds[:, s] for s in (0, 7, 3, 4, 2, 5, 1, 6)]
+        seed_no = [np.full(sims, s) for s in (0, 7, 3, 4, 2, 5, 1, 6)]
+        for rnd in ("round2", "conf_finals", "finals"):
+            nxt_t, nxt_s = [], []
+            for k in range(0, len(teams), 2):
+                a_hi = seed_no[k] < seed_no[k + 1]
+                hi, lo = np.where(a_hi, teams[k], teams[k + 1]), np.where(a_hi, teams[k + 1], teams[k])
+                w = _series(model, R, rng, hi, lo)
+                nxt_t.append(w)
+                nxt_s.append(np.where(w == teams[k], seed_no[k], seed_no[k + 1]))
+                reached[rnd] += np.bincount(w, minlength=n)
+            teams, seed_no = nxt_t, nxt_s
+        champs.append(teams[0])
+    if len(champs) == 2:
+        east, west = champs
+        e_hi = key[rows, east] >= key[rows, west]
+        champion = _series(model, R, rng, np.where(e_hi, east, west), np.where(e_hi, west, east))
+        reached["title"] += np.bincount(champion, minlength=n)
+    bins = GAMES_PER_TEAM + 1
+    win_hist = np.bincount((np.arange(n) * bins + np.clip(wins, 0, GAMES_PER_TEAM)).ravel(), minlength=n * bins).reshape(n, bins)
+    return {"wins": win_hist, "seeds": seed_hist, **reached}
+
+
+def simulate(model: SeasonModel, sims: int = DEFAULT_SIMS, seed: int = 0, workers: int = 1) -> Dict[str, np.ndarray]:
+    """Counts summed over `sims` seasons, in blocks of BLOCK_SIMS (on `workers` processes if > 1)."""
+    sizes = [BLOCK_SIMS] * (sims // BLOCK_SIMS) + ([sims % BLOCK_SIMS] if sims % BLOCK_SIMS else [])
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    with metrics.span("simulate.run"):
+        if workers > 1 and len(sizes) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                blocks = list(pool.map(_simulate_block, [model] * len(sizes), sizes, seeds))
+        else:
+            blocks = [_simulate_block(model, n, s) for n, s in zip(sizes, seeds)]
+    metrics.incr("simulate.seasons", sims)
+    return {k: sum(b[k] for b in blocks) for k in blocks[0]}
+
+
+def projections(model: SeasonModel, counts: Dict[str, np.ndarray], sims: int) -> List[Dict[str, Any]]:
+    """Per-team projection rows, best projected record first."""
+    out = []
+    for i, team in enumerate(model.teams):
+        hist = counts["wins"][i]
+        cdf = np.cumsum(hist) / sims
+        out.append({
+            "team": team, "team_id": model.team_ids[i], "conference": CONFERENCES[model.conference[i]],
+            "wins": int(model.wins[i]), "losses": int(model.losses[i]),
+            "rating": round(float(model.ratings[i]), 2),
+            "projected_wins": round(float(hist @ np.arange(len(hist)) / sims), 1),
+            "wins_p10": int(np.searchsorted(cdf, 0.1)), "wins_p90": int(np.searchsorted(cdf, 0.9)),
+            "seed_probs": [round(float(x) / sims, 4) for x in counts["seeds"][i]],
+            "play_in": round(float(counts["seeds"][i, 6:].sum()) / sims, 4),
+            **{r: round(float(counts[r][i]) / sims, 4) for r in ROUNDS},
+        })
+    out.sort(key=lambda r: (-r["projected_wins"], -r["rating"]))
+    return out
+
+
+# (game log sha256, sims, seed) -> (model, rows): lets the CLI print a run and write its doc without simulating twice.
+_RESULTS: Dict[Tuple[str, int, int], Tuple[SeasonModel, List[Dict[str, Any]]]] = {}
+
+
+def season_projections(
+    path: Path, season: str, source: str, sims: int = DEFAULT_SIMS, seed: int = 0, workers: int = 1
+) -> Tuple[SeasonModel, List[Dict[str, Any]]]:
+    """Fitted model and projection rows for the game logs at `path`, whose sha256 is `source`."""
+    key = (source, sims, seed)
+    if key not in _RESULTS:
+        model = fit_season(path, season)
+        _RESULTS[key] = (model, projections(model, simulate(model, sims, seed, workers), sims))
+    return _RESULTS[key]
+
+
+def _pct(p: float) -> str:
+    return "<0.1%" if 0 < p < 0.001 else f"{100 * p:.1f}%"
+
+
+def render_projections(season: str, sims: int, home_court: float, rows: List[Dict[str, Any]]) -> str:
+    content = [
+        f"# Season Projections — {season}",
+        "",
+        f"{sims:,} simulated seasons from point-differential ratings (home court {home_court:+.1f} pts).",
+    ]
+    for conf in CONFERENCES:
+        content += [
+            "", f"## {conf}", "",
+            "| Team | Record | Rating | Proj. W (10-90%) | Top-6 | Play-in | Playoffs | 2nd Rd | Conf. Finals | Finals | Title |",
+            "|---|---|---|---|---|---|---|---|---|---|---|",
+        ]
+        for r in rows:
+            if r["conference"] == conf:
+                content.append(
+                    f"| {r['team']} | {r['wins']}-{r['losses']} | {r['rating']:+.1f} | "
+                    f"{r['projected_wins']} ({r['wins_p10']}-{r['wins_p90']}) | {_pct(sum(r['seed_probs'][:6]))} | "
+                    f"{_pct(r['play_in'])} | {_pct(r['playoffs'])} | {_pct(r['round2'])} | "
+                    f"{_pct(r['conf_finals'])} | {_pct(r['finals'])} | {_pct(r['title'])} |"
+                )
+    content += ["", "Seed probabilities (seeds 1-10 by regular-season record):", ""]
+    for r in rows:
+        seeds = ", ".join(f"{k + 1}: {_pct(p)}" for k, p in enumerate(r["seed_probs"]) if p)
+        content.append(f"- {r['team']}: {seeds or 'outside the top 10 in every simulation'}")
+    return "\n".join(content)
@@ -0,0 +1,127 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict
+import duckdb as ddb
+
+# Columns read from team game log JSONL; absent keys are NULL (DuckDB matches names case-insensitively).
+_COLUMNS = {
+    "TEAM_ID": "VARCHAR", "Game_ID": "VARCHAR", "GAME_DATE": "VARCHAR",
+    "MATCHUP": "VARCHAR", "WL": "VARCHAR", "PTS": "VARCHAR", "PLUS_MINUS": "VARCHAR",
+}
+
+_SQL = """
+WITH raw AS (
+    SELECT * FROM read_json(?, format='newline_delimited', columns={columns})
+),
+games AS (
+    SELECT
+        TRY_CAST(TEAM_ID AS BIGINT) AS team_id,
+        Game_ID AS game_id,
+        COALESCE(TRY_CAST(GAME_DATE AS DATE), CAST(TRY_STRPTIME(GAME_DATE, '%b %d, %Y') AS DATE)) AS game_date,
+        MATCHUP AS matchup,
+        split_part(MATCHUP, ' ', 1) AS abbr,
+        MATCHUP LIKE '% vs. %' AS home,
+        WL AS wl,
+        TRY_CAST(PTS AS INTEGER) AS pts,
+        TRY_CAST(PLUS_MINUS AS INTEGER) AS plus_minus
+    FROM raw
+    QUALIFY row_number() OVER (PARTITION BY team_id, game_id ORDER BY game_date DESC) = 1
+),
+scored AS (
+    -- Point differential: PLUS_MINUS when present, else the opponent's row for the same game.
+    SELECT g.*, COALESCE(g.plus_minus, g.pts - o.pts) AS diff,
+           row_number() OVER (PARTITION BY g.team_id ORDER BY g.game_date DESC, g.game_id DESC) AS rn_desc,
+           row_number() OVER (PARTITION BY g.team_id ORDER BY g.game_date, g.game_id)
+             - row_number() OVER (PARTITION BY g.team_id, g.wl ORDER BY g.game_date, g.game_id) AS run_id
+    FROM games g
+    LEFT JOIN games o ON o.game_id = g.game_id AND o.team_id <> g.team_id
+),
+runs AS (
+    SELECT team_id, wl, run_id, count(*) AS len, max(rn_desc) AS last_rn, min(rn_desc) AS first_rn
+    FROM scored GROUP BY team_id, wl, run_id
+),
+streaks AS (
+    SELECT team_id,
+           max(len) FILTER (WHERE wl = 'W') AS longest_win_streak,
+           max(len) FILTER (WHERE wl = 'L') AS longest_loss_streak,
+           arg_min(wl || len::VARCHAR, first_rn) AS current_streak
+    FROM runs GROUP BY team_id
+)
+SELECT s.team_id,
+       any_value(s.abbr) AS abbr,
+       count(*) AS games,
+       count(*) FILTER (WHERE s.wl = 'W') AS wins,
+       count(*) FILTER (WHERE s.wl = 'L') AS losses,
+       count(*) FILTER (WHERE s.home AND s.wl = 'W') AS home_wins,
+       count(*) FILTER (WHERE s.home AND s.wl = 'L') AS home_losses,
+       count(*) FILTER (WHERE NOT s.home AND s.wl = 'W') AS away_wins,
+       count(*) FILTER (WHERE NOT s.home AND s.wl = 'L') AS away_losses,
+       round(avg(s.pts), 1) AS ppg,
+       round(avg(s.pts - s.diff), 1) AS opp_ppg,
+       round(avg(s.diff), 1) AS avg_diff,
+       round(avg(s.diff) FILTER (WHERE s.home), 1) AS home_diff,
+       round(avg(s.diff) FILTER (WHERE NOT s.home), 1) AS away_diff,
+       count(*) FILTER (WHERE s.rn_desc <= ? AND s.wl = 'W') AS last_n_wins,
+       count(*) FILTER (WHERE s.rn_desc <= ? AND s.wl = 'L') AS last_n_losses,
+       round(avg(s.diff) FILTER (WHERE s.rn_desc <= ?), 1) AS last_n_diff,
+       any_value(k.longest_win_streak) AS longest_win_streak,
+       any_value(k.longest_loss_streak) AS longest_loss_streak,
+       any_value(k.current_streak) AS current_streak,
+       list(struct_pack(date := s.game_date::VARCHAR, matchup := s.matchup, wl := s.wl, pts := s.pts, diff := s.diff)
+            ORDER BY s.game_date, s.game_id) FILTER (WHERE s.rn_desc <= ?) AS recent
+FROM scored s JOIN streaks k USING (team_id)
+GROUP BY s.team_id
+ORDER BY s.team_id
+"""
+
+
+def team_summaries(path: Path, last_n: int = 10) -> Dict[str, Dict[str, Any]]:
+    """Per-team season summary from a team game log JSONL, computed in DuckDB.
+
+    Dates are parsed (TeamGameLog 'APR 13, 2025' or ISO), games deduplicated on
+    (TEAM_ID, Game_ID), and the last `last_n` games picked with a window
+    function, so memory is bounded by the number of teams, not the file size.
+    """
+    columns = "{" + ", ".join(f"'{c}': '{t}'" for c, t in _COLUMNS.items()) + "}"
+    con = ddb.connect()
+    try:
+        cur = con.execute(_SQL.format(columns=columns), [str(path), last_n, last_n, last_n, last_n])
+        names = [d[0] for d in cur.description]
+        out: Dict[str, Dict[str, Any]] = {}
+        for row in cur.fetchall():
+            rec = dict(zip(names, row))
+            rec["recent"] = [dict(g) for g in rec["recent"] or []]
+            out[str(rec["team_id"])] = rec
+        return out
+    finally:
+        con.close()
+
+
+def _record(w: int, l: int) -> str:
+    return f"{w}-{l}"
+
+
+def _signed(x: Any) -> str:
+    return "n/a" if x is None else f"{x:+.1f}"
+
+
+def render_team_summary(tid: str, season: str, summary: Dict[str, Any], last_n: int = 10) -> str:
+    s = summary
+    streak = s.get("current_streak") or ""
+    content = [
+        f"# Team {tid} — Season {season}",
+        "",
+        f"Team: {s.get('abbr')}",
+        f"Record: {_record(s['wins'], s['losses'])} ({s['games']} games)",
+        f"Home: {_record(s['home_wins'], s['home_losses'])} | Away: {_record(s['away_wins'], s['away_losses'])}",
+        f"Points: {s['ppg']} for, {s['opp_ppg']} against, differential {_signed(s['avg_diff'])}"
+        f" (home {_signed(s['home_diff'])}, away {_signed(s['away_diff'])})",
+        f"Last {last_n}: {_record(s['last_n_wins'], s['last_n_losses'])}, differential {_signed(s['last_n_diff'])}",
+        f"Streak: {streak or 'n/a'} current; longest W{s.get('longest_win_streak') or 0}, L{s.get('longest_loss_streak') or 0}",
+        "",
+        "Recent Games:",
+    ]
+    for g in s["recent"]:
+        diff = "" if g.get("diff") is None else f" ({g['diff']:+d})"
+        content.append(f"- {g['date']}: {g['matchup']} — {g['wl']} {g['pts']} pts{diff}")
+    return "\n".join(content)
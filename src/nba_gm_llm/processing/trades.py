@@ -0,0 +1,257 @@
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import combinations
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+import heapq
+import os
+import numpy as np
+
+from ..columnar import read_rows
+from ..config import RAW_DIR, SALARY_THRESHOLDS
+from .payroll import get_payroll_index
+
+# Outgoing-salary tiers for matching: (upper bound of tier, multiplier, cushion).
+MATCH_TIERS = ((7_500_000, 2.0, 250_000), (29_000_000, 1.0, 7_500_000), (float("inf"), 1.25, 250_000))
+APRON_MATCH = 1.10  # teams over the first apron after the trade may take back at most 110%
+SECOND_APRON_MATCH = 1.00  # and teams over the second apron at most 100%
+
+
+@dataclass
+class TeamBook:
+    """One team's tradeable contracts (after filters), as parallel arrays."""
+
+    team: str
+    base_year: int
+    payroll: int
+    names: List[str]
+    player_ids: List[str]
+    salary: np.ndarray  # int64
+    status: List[str]
+    years: np.ndarray  # years remaining, int32
+
+
+@dataclass(frozen=True)
+class TradeMatch:
+    team: str
+    partner: str
+    outgoing: Tuple[str, ...]
+    incoming: Tuple[str, ...]
+    outgoing_salary: int
+    incoming_salary: int
+    team_payroll_after: int
+    partner_payroll_after: int
+
+    @property
+    def salary_gap(self) -> int:
+        return abs(self.incoming_salary - self.outgoing_salary)
+
+
+def max_incoming(outgoing: np.ndarray) -> np.ndarray:
+    """Most salary a team may take back for `outgoing`, by the tiered matching rule."""
+    out = np.asarray(outgoing, dtype=np.float64)
+    limit = np.empty_like(out)
+    lower = 0.0
+    for upper, mult, cushion in MATCH_TIERS:
+        tier = (out > lower) & (out <= upper) if lower else out <= upper
+        limit[tier] = out[tier] * mult + cushion
+        lower = upper
+    return limit
+
+
+def is_legal(payroll: int, outgoing: np.ndarray, incoming: np.ndarray, n_out: int, thresholds: Tuple[int, ...] | None) -> np.ndarray:
+    """Vectorized legality of one side of a trade.
+
+    Legal when the team ends under the cap, or incoming salary is within the
+    matching limit (110% when the team ends over the first apron, 100% over the
+    second). A team ending over the second apron may not aggregate several
+    outgoing contracts.
+    """
+    outgoing = np.asarray(outgoing, dtype=np.float64)
+    incoming = np.asarray(incoming, dtype=np.float64)
+    if thresholds is None:
+        return incoming <= max_incoming(outgoing)
+    cap, _tax, apron1, apron2 = thresholds
+    after = payroll - outgoing + incoming
+    limit = np.where(
+        after > apron2, outgoing * SECOND_APRON_MATCH, np.where(after > apron1, outgoing * APRON_MATCH, max_incoming(outgoing))
+    )
+    legal = (after <= cap) | (incoming <= limit)
+    if n_out > 1:
+        legal &= after <= apron2
+    return legal
+
+
+@lru_cache(maxsize=None)
+def _combos(n: int, k: int) -> np.ndarray:
+    if k > n:
+        return np.zeros((0, k), dtype=np.int16)
+    return np.array(list(combinations(range(n), k)), dtype=np.int16).reshape(-1, k)
+
+
+def _packages(book: TeamBook, k: int, require: np.ndarray | None = None) -> Tuple[np.ndarray, np.ndarray]:
+    """All k-player packages as (index matrix, salary sums), sorted by salary."""
+    idx = _combos(len(book.salary), k)
+    if require is not None and require.any():
+        idx = idx[require[idx].sum(axis=1) == require.sum()]
+    sums = book.salary[idx].sum(axis=1) if idx.size else np.zeros(0, dtype=np.int64)
+    order = np.argsort(sums, kind="stable")
+    return idx[order], sums[order]
+
+
+def _candidate_pairs(sa: np.ndarray, sb: np.ndarray, hi_limit: np.ndarray, lo_cover: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Prune the |sa| x |sb| grid with searchsorted on sorted salary sums.
+
+    For each A package, B packages above `hi_limit` (what A may take back) are cut,
+    as are B packages whose running-max allowance `lo_cover` cannot absorb A's
+    salary. Returns flat index arrays of the surviving pairs.
+    """
+    hi = np.searchsorted(sb, hi_limit, side="right")
+    lo = np.searchsorted(lo_cover, sa, side="left")
+    counts = np.maximum(hi - lo, 0)
+    total = int(counts.sum())
+    ia = np.repeat(np.arange(sa.size), counts)
+    starts = np.repeat(lo - np.cumsum(counts) + counts, counts)
+    ib = np.arange(total) + starts
+    return ia, ib
+
+
+def match_pair(
+    a: TeamBook, b: TeamBook, shapes: Sequence[Tuple[int, int]], limit: int = 50, require: Sequence[str] = ()
+) -> Tuple[int, List[TradeMatch]]:
+    """Legal packages between `a` and `b` for each (a gives, b gives) shape.
+
+    Returns the number of package pairs considered (before pruning) and up to
+    `limit` legal matches, closest salary match first. If a `require`d player is
+    not in `a`'s (filtered) book, no package can include them: (0, []).
+    """
+    thresholds = SALARY_THRESHOLDS.get(a.base_year)
+    if set(require) - set(a.player_ids):
+        return 0, []
+    req = np.isin(np.array(a.player_ids, dtype=object), list(require)) if require else None
+    considered = 0
+    found: List[Tuple[int, int, TradeMatch]] = []
+    for give, get in shapes:
+        ia_idx, sa = _packages(a, give, req)
+        ib_idx, sb = _packages(b, get)
+        considered += sa.size * sb.size
+        if not sa.size or not sb.size:
+            continue
+        # Upper bound on what A may take back; under-cap room only widens it.
+        hi_limit = max_incoming(sa)
+        if thresholds is not None:
+            hi_limit = np.maximum(hi_limit, thresholds[0] - a.payroll + sa)
+            room_b = thresholds[0] - b.payroll + sb
+            lo_cover = np.maximum.accumulate(np.maximum(max_incoming(sb), room_b))
+        else:
+            lo_cover = np.maximum.accumulate(max_incoming(sb))
+        pa, pb = _candidate_pairs(sa, sb, hi_limit, lo_cover)
+        if not pa.size:
+            continue
+        out_a, in_a = sa[pa], sb[pb]
+        ok = is_legal(a.payroll, out_a, in_a, give, thresholds) & is_legal(b.payroll, in_a, out_a, get, thresholds)
+        pa, pb = pa[ok], pb[ok]
+        if not pa.size:
+            continue
+        gap = np.abs(sa[pa] - sb[pb])
+        keep = np.argsort(gap, kind="stable")[:limit] if gap.size > limit else np.argsort(gap, kind="stable")
+        for i in keep:
+            x, y = pa[i], pb[i]
+            m = TradeMatch(
+                team=a.team,
+                partner=b.team,
+                outgoing=tuple(a.names[j] for j in ia_idx[x]),
+                incoming=tuple(b.names[j] for j in ib_idx[y]),
+                outgoing_salary=int(sa[x]),
+                incoming_salary=int(sb[y]),
+                team_payroll_after=int(a.payroll - sa[x] + sb[y]),
+                partner_payroll_after=int(b.payroll - sb[y] + sa[x]),
+            )
+            found.append((m.salary_gap, len(found), m))
+    return considered, [m for _, _, m in heapq.nsmallest(limit, found)]
+
+
+_BOOK_COLUMNS = ("team", "base_year", "player", "player_id", "current_salary", "status", "years_remaining")
+
+
+def load_books(
+    raw_dir: Path = RAW_DIR,
+    statuses: Iterable[str] | None = None,
+    max_years: int | None = None,
+    min_salary: int = 1,
+) -> Dict[str, TeamBook]:
+    """Per-team contract books from contracts_*.jsonl, filtered on status, years and salary.
+
+    Payroll is the team's full payroll for the contracts base year (from the
+    payroll index), not just the tradeable rows.
+    """
+    allowed = set(statuses) if statuses else None
+    index = get_payroll_index()
+    books: Dict[str, TeamBook] = {}
+    for p in sorted((raw_dir / "bbr").glob("contracts_*.jsonl")):
+        rows = read_rows(p, _BOOK_COLUMNS)
+        if not rows or not rows[0].get("base_year"):
+            continue
+        team, base_year = rows[0]["team"], int(rows[0]["base_year"])
+        entry = index.get(team, base_year)
+        payroll = entry.payroll if entry else sum(int(r.get("current_salary") or 0) for r in rows)
+        rows = [
+            r for r in rows
+            if (r.get("current_salary") or 0) >= min_salary
+            and (allowed is None or r.get("status") in allowed)
+            and (max_years is None or (r.get("years_remaining") or 0) <= max_years)
+        ]
+        books[team] = TeamBook(
+            team=team,
+            base_year=base_year,
+            payroll=payroll,
+            names=[r.get("player") or "" for r in rows],
+            player_ids=[r.get("player_id") or r.get("player") or "" for r in rows],
+            salary=np.array([int(r["current_salary"]) for r in rows], dtype=np.int64),
+            status=[r.get("status") or "" for r in rows],
+            years=np.array([int(r.get("years_remaining") or 0) for r in rows], dtype=np.int32),
+        )
+    return books
+
+
+def search_trades(
+    team: str,
+    shapes: Sequence[Tuple[int, int]] = ((2, 1), (3, 2)),
+    partners: Sequence[str] | None = None,
+    require: Sequence[str] = (),
+    limit: int = 50,
+    workers: int | None = None,
+    **filters,
+) -> Iterator[Tuple[str, int, List[TradeMatch]]]:
+    """Stream (partner, pairs considered, ranked matches) as each partner finishes.
+
+    Partners are searched in a process pool; `workers=1` searches in-process.
+    `filters` go to `load_books` (statuses, max_years, min_salary).
+    """
+    books = load_books(**filters)
+    if team not in books:
+        raise KeyError(f"No contracts for {team}")
+    missing = sorted(set(require) - set(books[team].player_ids))
+    if missing:
+        raise KeyError(f"Not tradeable from {team} under these filters: {', '.join(missing)}")
+    others = [books[t] for t in (partners or sorted(books)) if t in books and t != team]
+    args = [(books[team], b, tuple(shapes), limit, tuple(require)) for b in others]
+    workers = workers or min(len(args), os.cpu_count() or 1)
+    if workers <= 1:
+        for a in args:
+            considered, matches = match_pair(*a)
+            yield a[1].team, considered, matches
+        return
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        futures = {ex.submit(match_pair, *a): a[1].team for a in args}
+        for fut in as_completed(futures):
+            considered, matches = fut.result()
+            yield futures[fut], considered, matches
+
+
+def best_trades(team: str, k: int = 20, **kwargs) -> List[TradeMatch]:
+    """Top-k matches across all partners, closest salary match first."""
+    ranked = (m for _, _, matches in search_trades(team, limit=k, **kwargs) for m in matches)
+    return heapq.nsmallest(k, ranked, key=lambda m: (m.salary_gap, m.partner))
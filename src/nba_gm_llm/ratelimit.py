@@ -0,0 +1,135 @@
+from __future__ import annotations
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Tuple, Type, TypeVar
+from urllib.parse import urlsplit
+from .config import RATE_LIMITS, DEFAULT_RATE_LIMIT
+from .metrics import metrics
+
+T = TypeVar("T")
+
+
+class TokenBucket:
+    """Thread-safe token bucket.
+
+    `acquire` reserves a token under the lock and sleeps outside it, so waiting
+    threads queue up at exactly `rate` requests per second after the burst.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take one token, blocking until it is available. Returns seconds waited."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1.0
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+            metrics.observe("ratelimit.wait", wait)
+        return wait
+
+
+class HostRateLimiter:
+    """One token bucket per host, shared by every thread that fetches from it."""
+
+    def __init__(self, limits: Dict[str, Tuple[float, int]] | None = None, default: Tuple[float, int] = DEFAULT_RATE_LIMIT):
+        self.limits = dict(RATE_LIMITS if limits is None else limits)
+        self.default = default
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, host: str) -> TokenBucket:
+        with self._lock:
+            b = self._buckets.get(host)
+            if b is None:
+                rate, burst = self.limits.get(host, self.default)
+                b = self._buckets[host] = TokenBucket(rate, burst)
+            return b
+
+    def set_rate(self, host: str, rate: float, burst: int | None = None) -> None:
+        with self._lock:
+            burst = burst if burst is not None else self.limits.get(host, self.default)[1]
+            self.limits[host] = (rate, burst)
+            self._buckets.pop(host, None)
+
+    def acquire(self, url: str) -> float:
+        return self.bucket(urlsplit(url).netloc).acquire()
+
+
+# Process-wide limiter so concurrent scrapers share one budget per host.
+limiter = HostRateLimiter()
+
+
+class AdaptiveBackoff:
+    """Shared, jittered exponential backoff that recovers on success.
+
+    Each failure (429, timeout) multiplies the current delay by `factor`; each
+    success shrinks it by `recover` until it drops below `base` and resets to
+    zero. Every caller sharing the instance slows down and speeds up together.
+    """
+
+    def __init__(self, base: float = 1.0, factor: float = 2.0, recover: float = 0.5, max_delay: float = 60.0, jitter: float = 0.5):
+        self.base = base
+        self.factor = factor
+        self.recover = recover
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.delay = 0.0
+        self._lock = threading.Lock()
+
+    def failure(self) -> float:
+        with self._lock:
+            self.delay = min(self.max_delay, max(self.base, self.delay * self.factor))
+            return self.delay
+
+    def success(self) -> None:
+        with self._lock:
+            self.delay *= self.recover
+            if self.delay < self.base:
+                self.delay = 0.0
+
+    def wait(self) -> float:
+        with self._lock:
+            delay = self.delay
+        if delay <= 0:
+            return 0.0
+        delay *= 1 + random.uniform(-self.jitter, self.jitter)
+        time.sleep(delay)
+        metrics.observe("backoff.sleep", delay)
+        return delay
+
+
+def retry_call(
+    fn: Callable[[], T],
+    backoff: AdaptiveBackoff,
+    attempts: int = 4,
+    retry_on: Tuple[Type[BaseException], ...] = (Exception,),
+    before: Callable[[], Any] | None = None,
+) -> T:
+    """Call `fn` up to `attempts` times, pacing every try through `backoff`."""
+    for attempt in range(1, attempts + 1):
+        backoff.wait()
+        if before is not None:
+            before()
+        try:
+            result = fn()
+        except retry_on:
+            metrics.incr("retry.failures")
+            backoff.failure()
+            if attempt == attempts:
+                raise
+            continue
+        backoff.success()
+        return result
+    raise AssertionError("unreachable")
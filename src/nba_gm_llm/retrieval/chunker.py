@@ -0,0 +1,51 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Iterator, List
+import re
+
+MAX_CHUNK_WORDS = 160
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.'%/][a-z0-9]+)*")
+_STOPWORDS = frozenset("a an and the of to in on for at by vs with is are was".split())
+
+
+@dataclass
+class Chunk:
+    path: str  # document path relative to the corpus root
+    ordinal: int  # position within the document
+    text: str
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def chunk_markdown(path: str, text: str, max_words: int = MAX_CHUNK_WORDS) -> Iterator[Chunk]:
+    """Split a generated Markdown document into retrieval chunks.
+
+    Sections start at headings; a section longer than `max_words` is cut at line
+    boundaries so table rows and list items stay whole. Every chunk after the
+    first is prefixed with the document title so it can be matched on its own.
+    """
+    lines = text.splitlines()
+    title = next((ln for ln in lines if ln.startswith("#")), "")
+    ordinal = 0
+    buf: List[str] = []
+    words = 0
+
+    def flush():
+        nonlocal ordinal, buf, words
+        body = "\n".join(buf).strip()
+        if body:
+            if ordinal and title and not body.startswith(title):
+                body = f"{title}\n{body}"
+            yield Chunk(path, ordinal, body)
+            ordinal += 1
+        buf, words = [], 0
+
+    for ln in lines:
+        n = len(ln.split())
+        if (ln.startswith("#") and words) or (words and words + n > max_words):
+            yield from flush()
+        buf.append(ln)
+        words += n
+    yield from flush()
@@ -0,0 +1,233 @@
+from __future__ import annotations
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+import hashlib
+import json
+import math
+import os
+import zlib
+import numpy as np
+
+from ..config import CORPUS_DIR, INDEX_DIR
+from ..storage import read_json, write_json
+from .chunker import Chunk, chunk_markdown, tokenize
+
+INDEX_VERSION = 1
+HASH_DIM = 1024  # hashed feature dimensions per chunk vector (float32 -> 4 KiB per chunk)
+BM25_K1 = 1.5
+BM25_B = 0.75
+# Weight of the max-normalized BM25 score against the vector score in hybrid search.
+# Exact term matches (team codes, names, "apron") are the stronger signal; the hashed
+# vectors mostly break ties among BM25 near-equals and add recall for rephrasings.
+HYBRID_BM25_WEIGHT = 4.0
+SEARCH_MODES = ("bm25", "vector", "hybrid")
+_ARRAYS = ("vectors", "dim_df", "post_rows", "post_terms", "post_tf", "chunk_len")
+
+
+@dataclass
+class Hit:
+    path: str
+    ordinal: int
+    score: float
+    text: str
+
+
+def _features(tokens: List[str]) -> List[str]:
+    return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+
+def hash_vector(tokens: List[str], dim: int = HASH_DIM) -> np.ndarray:
+    """Signed feature-hashing of unigrams and bigrams with sublinear tf, L2-normalized."""
+    vec = np.zeros(dim, dtype=np.float32)
+    for feat, n in Counter(_features(tokens)).items():
+        h = zlib.crc32(feat.encode("utf-8"))
+        vec[h % dim] += (1.0 + math.log(n)) * (1.0 if h & 0x80000000 else -1.0)
+    norm = float(np.linalg.norm(vec))
+    return vec / norm if norm else vec
+
+
+class RetrievalIndex:
+    """BM25 + hashed-vector index over the Markdown corpus, stored as memory-mapped arrays.
+
+    Layout under `root`:
+      meta.json       dims, per-document content hashes, term vocabulary
+      chunks.jsonl    chunk text and provenance, one line per row
+      vectors.npy     (chunks x HASH_DIM) float32, L2-normalized
+      post_*.npy      BM25 postings as parallel (row, term, tf) arrays
+    Arrays are opened with mmap_mode="r", so loading costs no more than reading meta.
+    IDF is applied at query time (per term for BM25, per hashed dimension for the
+    vectors), which keeps stored rows valid when other documents are added.
+    """
+
+    def __init__(self, root: Path = INDEX_DIR):
+        self.root = Path(root)
+        self._load()
+
+    def _load(self) -> None:
+        self.meta: Dict[str, Any] = read_json(self.root / "meta.json", {}) or {}
+        if self.meta.get("version") != INDEX_VERSION:
+            self.meta = {"version": INDEX_VERSION, "dim": HASH_DIM, "docs": {}, "vocab": {}}
+        self.dim: int = self.meta["dim"]
+        self.vocab: Dict[str, int] = self.meta["vocab"]
+        self._chunks: List[Dict[str, Any]] | None = None
+        if (self.root / "vectors.npy").exists() and self.meta["docs"]:
+            self.arrays = {name: np.load(self.root / f"{name}.npy", mmap_mode="r") for name in _ARRAYS}
+        else:
+            self.arrays = {
+                "vectors": np.zeros((0, self.dim), np.float32), "dim_df": np.zeros(self.dim, np.int64),
+                "post_rows": np.zeros(0, np.int32), "post_terms": np.zeros(0, np.int32),
+                "post_tf": np.zeros(0, np.float32), "chunk_len": np.zeros(0, np.float32),
+            }
+
+    @property
+    def size(self) -> int:
+        return int(self.arrays["vectors"].shape[0])
+
+    @property
+    def chunks(self) -> List[Dict[str, Any]]:
+        if self._chunks is None:
+            path = self.root / "chunks.jsonl"
+            self._chunks = [json.loads(ln) for ln in path.open(encoding="utf-8")] if path.exists() and self.size else []
+        return self._chunks
+
+    # ---- building ----
+
+    def update(self, corpus_dir: Path = CORPUS_DIR, rebuild: bool = False) -> Dict[str, int]:
+        """Index new and changed documents and drop deleted ones.
+
+        Unchanged documents keep their rows as-is; only the new chunks are
+        tokenized and vectorized. `rebuild=True` re-indexes everything (and
+        compacts the vocabulary).
+        """
+        docs = {
+            p.relative_to(corpus_dir).as_posix(): hashlib.sha256(p.read_bytes()).hexdigest()
+            for p in sorted(corpus_dir.rglob("*.md"))
+        }
+        old_docs: Dict[str, str] = {} if rebuild else self.meta["docs"]
+        changed = [p for p, h in docs.items() if old_docs.get(p) != h]
+        removed = [p for p in old_docs if p not in docs]
+        stats = {"added": len(changed), "removed": len(removed), "unchanged": len(docs) - len(changed)}
+        if not changed and not removed:
+            return {**stats, "chunks": self.size}
+
+        stale = set(changed) | set(removed)
+        old = self.arrays
+        if rebuild or not self.size:
+            keep = np.zeros(self.size, dtype=bool)
+            kept_chunks: List[Dict[str, Any]] = []
+        else:
+            keep = np.array([c["path"] not in stale for c in self.chunks], dtype=bool)
+            kept_chunks = [c for c, k in zip(self.chunks, keep) if k]
+        if rebuild:
+            self.vocab = {}
+
+        new_chunks: List[Chunk] = []
+        for rel in changed:
+            new_chunks.extend(chunk_markdown(rel, (corpus_dir / rel).read_text(encoding="utf-8")))
+        vectors = np.zeros((len(new_chunks), self.dim), np.float32)
+        rows: List[int] = []
+        terms: List[int] = []
+        tfs: List[float] = []
+        lengths = np.zeros(len(new_chunks), np.float32)
+        base = int(keep.sum())
+        for i, ch in enumerate(new_chunks):
+            tokens = tokenize(ch.text)
+            vectors[i] = hash_vector(tokens, self.dim)
+            lengths[i] = len(tokens)
+            for term, n in Counter(tokens).items():
+                rows.append(base + i)
+                terms.append(self.vocab.setdefault(term, len(self.vocab)))
+                tfs.append(n)
+
+        # Renumber surviving postings to their compacted row positions.
+        new_pos = np.cumsum(keep) - 1
+        post_keep = keep[old["post_rows"]] if old["post_rows"].size else np.zeros(0, dtype=bool)
+        kept_vectors = np.asarray(old["vectors"])[keep]
+        arrays = {
+            "vectors": np.concatenate([kept_vectors, vectors]),
+            "post_rows": np.concatenate([new_pos[old["post_rows"][post_keep]], rows]).astype(np.int32),
+            "post_terms": np.concatenate([old["post_terms"][post_keep], terms]).astype(np.int32),
+            "post_tf": np.concatenate([old["post_tf"][post_keep], tfs]).astype(np.float32),
+            "chunk_len": np.concatenate([old["chunk_len"][keep], lengths]).astype(np.float32),
+        }
+        arrays["dim_df"] = (arrays["vectors"] != 0).sum(axis=0).astype(np.int64)
+        chunks = kept_chunks + [{"path": c.path, "ordinal": c.ordinal, "text": c.text} for c in new_chunks]
+        # Release the old memory maps (ours and `old`) before their files are replaced.
+        del old
+        self._save(arrays, chunks, docs)
+        return {**stats, "chunks": len(chunks)}
+
+    def _save(self, arrays: Dict[str, np.ndarray], chunks: List[Dict[str, Any]], docs: Dict[str, str]) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.arrays = {}
+        for name, arr in arrays.items():
+            tmp = self.root / f"{name}.tmp.npy"
+            np.save(tmp, arr)
+            os.replace(tmp, self.root / f"{name}.npy")
+        tmp = self.root / "chunks.jsonl.tmp"
+        with tmp.open("w", encoding="utf-8") as f:
+            for c in chunks:
+                f.write(json.dumps(c, ensure_ascii=False) + "\n")
+        os.replace(tmp, self.root / "chunks.jsonl")
+        write_json(self.root / "meta.json", {**self.meta, "docs": docs, "vocab": self.vocab})
+        self._load()
+
+    # ---- querying ----
+
+    def bm25_scores(self, tokens: Sequence[str]) -> np.ndarray:
+        n = self.size
+        qids = np.array(sorted({self.vocab[t] for t in tokens if t in self.vocab}), dtype=np.int32)
+        if not n or not qids.size:
+            return np.zeros(n, np.float32)
+        a = self.arrays
+        mask = np.isin(a["post_terms"], qids)
+        rows, term, tf = a["post_rows"][mask], a["post_terms"][mask], a["post_tf"][mask]
+        df = np.bincount(term, minlength=len(self.vocab))[term]
+        idf = np.log1p((n - df + 0.5) / (df + 0.5))
+        lens = a["chunk_len"]
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * lens[rows] / max(float(lens.mean()), 1.0))
+        return np.bincount(rows, weights=idf * tf * (BM25_K1 + 1) / (tf + norm), minlength=n).astype(np.float32)
+
+    def vector_scores(self, tokens: Sequence[str]) -> np.ndarray:
+        n = self.size
+        if not n:
+            return np.zeros(0, np.float32)
+        idf = np.log((n + 1) / (self.arrays["dim_df"] + 1)).astype(np.float32) + 1.0
+        return self.arrays["vectors"] @ (hash_vector(list(tokens), self.dim) * idf)
+
+    def search(self, query: str, k: int = 5, mode: str = "hybrid") -> List[Hit]:
+        """Top-k chunks for `query`. mode: "bm25", "vector" or "hybrid" (weighted max-normalized sum)."""
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"unknown search mode {mode!r}; expected one of {', '.join(SEARCH_MODES)}")
+        tokens = tokenize(query)
+        if not self.size or not tokens:
+            return []
+        if mode == "bm25":
+            scores = self.bm25_scores(tokens)
+        elif mode == "vector":
+            scores = self.vector_scores(tokens)
+        else:
+            parts = [(HYBRID_BM25_WEIGHT, self.bm25_scores(tokens)), (1.0, np.maximum(self.vector_scores(tokens), 0))]
+            scores = sum(w * p / p.max() for w, p in parts if p.max() > 0)
+            if not isinstance(scores, np.ndarray):
+                return []
+        k = min(k, scores.size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        chunks = self.chunks
+        return [
+            Hit(chunks[i]["path"], chunks[i]["ordinal"], float(scores[i]), chunks[i]["text"])
+            for i in top if scores[i] > 0
+        ]
+
+
+_index: RetrievalIndex | None = None
+
+
+def get_index() -> RetrievalIndex:
+    global _index
+    if _index is None:
+        _index = RetrievalIndex()
+    return _index
@@ -1,11 +1,16 @@
 from __future__ import annotations
-import time
-from typing import List, Dict, Any
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Tuple, TypeVar
 import requests
-from bs4 import BeautifulSoup, Comment
-from ..config import DEFAULT_HEADERS
+from ..config import BBR_BASE_URL, DEFAULT_HEADERS, FETCH_WORKERS
+from ..cache import http_cache, CachedResponse
+from .html_tables import Table, extract_tables
+from ..metrics import metrics
 from datetime import datetime
 
+T = TypeVar("T")
+
 
 TEAM_ABBRS = [
     "ATL","BOS","BRK","CHI","CHO","CLE","DAL","DEN","DET","GSW","HOU","IND","LAC","LAL","MEM","MIA","MIL","MIN","NOP","NYK","OKC","ORL","PHI","PHO","POR","SAC","SAS","TOR","UTA","WAS"
@@ -22,91 +27,85 @@ def current_bbr_year(now: datetime | None = None) -> int:
     return dt.year + 1 if dt.month >= 7 else dt.year
 
 
-def fetch_team_roster(team_abbr: str, year: int, session: requests.Session | None = None) -> List[Dict[str, Any]]:
-    sess = session or requests.Session()
-    url = f"https://www.basketball-reference.com/teams/{team_abbr}/{year}.html"
-    resp = sess.get(url, headers=DEFAULT_HEADERS, timeout=30)
-    resp.raise_for_status()
-    soup = BeautifulSoup(resp.text, "html.parser")
-    table = soup.find("table", id="roster")
+_local = threading.local()
+
+
+def _thread_session() -> requests.Session:
+    sess = getattr(_local, "session", None)
+    if sess is None:
+        sess = _local.session = requests.Session()
+    return sess
+
+
+def _get(url: str, session: requests.Session | None = None) -> CachedResponse:
+    """GET a BBR page through the shared cache and per-host rate budget."""
+    return http_cache.get(url, session or _thread_session(), headers=DEFAULT_HEADERS)
+
+
+def iter_league(
+    fetch: Callable[[str], T],
+    teams: Iterable[str] = TEAM_ABBRS,
+    max_workers: int = FETCH_WORKERS,
+    errors: Dict[str, str] | None = None,
+) -> Iterator[Tuple[str, T]]:
+    """Run `fetch(abbr)` for every team on a bounded thread pool.
+
+    Yields `(abbr, result)` as each team completes so callers can write results
+    out immediately. Request pacing comes from the per-host limiter, not sleeps.
+    A team whose fetch raises is left out (its error recorded in `errors`), so
+    a failure never looks like an empty result.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(fetch, abbr): abbr for abbr in teams}
+        for fut in as_completed(futures):
+            abbr = futures[fut]
+            try:
+                result = fut.result()
+            except Exception as e:
+                metrics.incr("bbr.team_failures")
+                if errors is not None:
+                    errors[abbr] = f"{type(e).__name__}: {e}"
+                continue
+            yield abbr, result
+
+
+def _roster_rows(table: Table, team_abbr: str, year: int) -> List[Dict[str, Any]]:
     roster: List[Dict[str, Any]] = []
-    if not table:
-        return roster
-    for tr in table.tbody.find_all("tr"):
-        cells = tr.find_all("td")
+    for tr in table.body:
+        cells = tr.tds()
         if not cells:
             continue
-        row = {c.get("data-stat"): (c.get_text(strip=True)) for c in cells}
+        row = {c.get("data-stat"): c.text for c in cells}
         # player id
-        a = tr.find("a")
-        if a and a.get("href"):
-            row["player_url"] = "https://www.basketball-reference.com" + a.get("href")
+        if tr.href:
+            row["player_url"] = "https://www.basketball-reference.com" + tr.href
         roster.append(row)
     return roster
 
 
-def fetch_all_rosters(year: int) -> Dict[str, List[Dict[str, Any]]]:
-    sess = requests.Session()
-    out: Dict[str, List[Dict[str, Any]]] = {}
-    for abbr in TEAM_ABBRS:
-        try:
-            out[abbr] = fetch_team_roster(abbr, year, session=sess)
-            time.sleep(0.5)
-        except Exception:
-            out[abbr] = []
-    return out
-
-
-def fetch_team_salaries(team_abbr: str, year: int, session: requests.Session | None = None) -> List[Dict[str, Any]]:
-    """Fetch salaries table from a Basketball-Reference team season page.
-
-    Returns a list of rows with keys: player, player_url, player_id, salary, salary_text, team, year.
-    """
-    sess = session or requests.Session()
-    url = f"https://www.basketball-reference.com/teams/{team_abbr}/{year}.html"
-    resp = sess.get(url, headers=DEFAULT_HEADERS, timeout=30)
-    resp.raise_for_status()
-    soup = BeautifulSoup(resp.text, "html.parser")
-    # Salaries table is often within a commented HTML block inside #all_salaries2
-    container = soup.find(id="all_salaries2")
-    table = None
-    if container:
-        table = container.find("table", id="salaries2")
-        if table is None:
-            for el in container.children:
-                if isinstance(el, Comment):
-                    inner = BeautifulSoup(el, "html.parser")
-                    table = inner.find("table", id="salaries2")
-                    if table is not None:
-                        break
-    if table is None:
-        table = soup.find("table", id="salaries2")
+def _salary_rows(table: Table, team_abbr: str, year: int) -> List[Dict[str, Any]]:
     rows: List[Dict[str, Any]] = []
-    if not table or not table.tbody:
-        return rows
-    for tr in table.tbody.find_all("tr"):
-        tds = tr.find_all("td")
+    for tr in table.body:
+        tds = tr.tds()
         if not tds:
             continue
         # Map by data-stat
-        data: Dict[str, Any] = {td.get("data-stat"): td for td in tds}
+        data = {td.get("data-stat"): td for td in tds}
         player_cell = data.get("player")
         salary_cell = data.get("salary")
         if not player_cell:
             continue
-        a = player_cell.find("a")
-        player_name = player_cell.get_text(strip=True)
-        player_href = a.get("href") if a else None
+        player_href = player_cell.href
         player_id = player_cell.get("data-append-csv")
         # Salary may be empty (two-way/non-guaranteed)
-        salary_text = salary_cell.get_text(strip=True) if salary_cell else ""
+        salary_text = salary_cell.text if salary_cell else ""
         csk = salary_cell.get("csk") if salary_cell else None
         try:
             salary = int(csk) if csk is not None and csk != "" else None
         except ValueError:
             salary = None
         row = {
-            "player": player_name,
+            "player": player_cell.text,
             "player_url": ("https://www.basketball-reference.com" + player_href) if player_href else None,
             "player_id": player_id,
             "salary": salary,
@@ -118,18 +117,90 @@ def fetch_team_salaries(team_abbr: str, year: int, session: requests.Session | N
     return rows
 
 
-def fetch_all_salaries(year: int) -> Dict[str, List[Dict[str, Any]]]:
-    sess = requests.Session()
+def _generic_rows(table: Table, team_abbr: str, year: int) -> List[Dict[str, Any]]:
+    return [{c.get("data-stat"): c.text for c in tr.cells} for tr in table.body if tr.tds()]
+
+
+# Row extractors for team season page tables; other ids fall back to a plain data-stat mapping.
+TEAM_PAGE_TABLES: Dict[str, Callable[[Table, str, int], List[Dict[str, Any]]]] = {
+    "roster": _roster_rows,
+    "salaries2": _salary_rows,
+}
+
+
+def fetch_team_page(
+    team_abbr: str,
+    year: int,
+    tables: Iterable[str] = ("roster", "salaries2"),
+    session: requests.Session | None = None,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Download a team season page once and extract every requested table.
+
+    Returns `{table_id: rows}`; tables absent from the page map to `[]`.
+    """
+    table_ids = list(dict.fromkeys(tables))
+    url = f"{BBR_BASE_URL}/teams/{team_abbr}/{year}.html"
+    resp = _get(url, session)
+    found = extract_tables(resp.text, table_ids)
     out: Dict[str, List[Dict[str, Any]]] = {}
-    for abbr in TEAM_ABBRS:
-        try:
-            out[abbr] = fetch_team_salaries(abbr, year, session=sess)
-            time.sleep(0.5)
-        except Exception:
-            out[abbr] = []
+    for tid in table_ids:
+        table = found.get(tid)
+        extract = TEAM_PAGE_TABLES.get(tid, _generic_rows)
+        out[tid] = extract(table, team_abbr, year) if table is not None else []
     return out
 
 
+def iter_all_team_pages(
+    year: int,
+    tables: Iterable[str] = ("roster", "salaries2"),
+    max_workers: int = FETCH_WORKERS,
+    teams: Iterable[str] = TEAM_ABBRS,
+    errors: Dict[str, str] | None = None,
+) -> Iterator[Tuple[str, Dict[str, List[Dict[str, Any]]]]]:
+    table_ids = list(dict.fromkeys(tables))
+    return iter_league(lambda abbr: fetch_team_page(abbr, year, table_ids), teams, max_workers, errors)
+
+
+def fetch_team_roster(team_abbr: str, year: int, session: requests.Session | None = None) -> List[Dict[str, Any]]:
+    return fetch_team_page(team_abbr, year, ("roster",), session)["roster"]
+
+
+def iter_all_rosters(
+    year: int, max_workers: int = FETCH_WORKERS, errors: Dict[str, str] | None = None
+) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+    pages = iter_all_team_pages(year, ("roster",), max_workers, errors=errors)
+    return ((abbr, page["roster"]) for abbr, page in pages)
+
+
+def fetch_all_rosters(year: int, errors: Dict[str, str] | None = None) -> Dict[str, List[Dict[str, Any]]]:
+    """Rosters by team; teams that failed are absent (see `errors`)."""
+    return dict(iter_all_rosters(year, errors=errors))
+
+
+def fetch_team_salaries(team_abbr: str, year: int, session: requests.Session | None = None) -> List[Dict[str, Any]]:
+    """Fetch salaries table from a Basketball-Reference team season page.
+
+    Returns a list of rows with keys: player, player_url, player_id, salary, salary_text, team, year.
+    """
+    return fetch_team_page(team_abbr, year, ("salaries2",), session)["salaries2"]
+
+
+def iter_all_salaries(
+    year: int, max_workers: int = FETCH_WORKERS, errors: Dict[str, str] | None = None
+) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+    pages = iter_all_team_pages(year, ("salaries2",), max_workers, errors=errors)
+    return ((abbr, page["salaries2"]) for abbr, page in pages)
+
+
+def fetch_all_salaries(year: int, errors: Dict[str, str] | None = None) -> Dict[str, List[Dict[str, Any]]]:
+    """Salaries by team; teams that failed are absent (see `errors`)."""
+    return dict(iter_all_salaries(year, errors=errors))
+
+
+def _empty_contracts(team_abbr: str) -> Dict[str, Any]:
+    return {"team": team_abbr, "base_year_label": None, "base_year": None, "players": []}
+
+
 def fetch_team_contracts(team_abbr: str, session: requests.Session | None = None) -> Dict[str, Any]:
     """Fetch team contracts table and derive per-player status and years remaining.
 
@@ -144,35 +215,21 @@ def fetch_team_contracts(team_abbr: str, session: requests.Session | None = None
           status (str: one of guaranteed, non_guaranteed, player_option, team_option),
           flags (list[str]) among {non_guaranteed, player_option, team_option}
     """
-    sess = session or requests.Session()
-    url = f"https://www.basketball-reference.com/contracts/{team_abbr}.html"
-    resp = sess.get(url, headers=DEFAULT_HEADERS, timeout=30)
-    resp.raise_for_status()
-    soup = BeautifulSoup(resp.text, "html.parser")
-    table = soup.find("table", id="contracts")
-    if not table:
-        # Some pages might be commented; attempt to extract from wrapper
-        wrapper = soup.find(id="all_contracts")
-        if wrapper:
-            for el in wrapper.descendants:
-                if isinstance(el, Comment):
-                    inner = BeautifulSoup(el, "html.parser")
-                    table = inner.find("table", id="contracts")
-                    if table:
-                        break
+    url = f"{BBR_BASE_URL}/contracts/{team_abbr}.html"
+    resp = _get(url, session)
+    # The table may be live or inside a commented block under #all_contracts; either way
+    # only the table fragment is parsed.
+    table = extract_tables(resp.text, ("contracts",)).get("contracts")
     if not table:
-        return {"team": team_abbr, "base_year_label": None, "base_year": None, "players": []}
+        return _empty_contracts(team_abbr)
 
     # Map header labels for y1..y6
     header_map: Dict[str, str] = {}
-    thead = table.find("thead")
-    if thead:
-        header_row = thead.find_all("tr")[-1] if thead.find_all("tr") else None
-        if header_row:
-            for th in header_row.find_all("th"):
-                ds = th.get("data-stat")
-                if ds and ds.startswith("y"):
-                    header_map[ds] = th.get_text(strip=True)
+    if table.head:
+        for th in table.head[-1].cells:
+            ds = th.get("data-stat")
+            if th.tag == "th" and ds and ds.startswith("y"):
+                header_map[ds] = th.text
     base_label = header_map.get("y1")
     base_year = None
     if base_label and "-" in base_label:
@@ -186,20 +243,18 @@ def fetch_team_contracts(team_abbr: str, session: requests.Session | None = None
             base_year = None
 
     players: List[Dict[str, Any]] = []
-    tbody = table.find("tbody")
-    if not tbody:
-        return {"team": team_abbr, "base_year_label": base_label, "base_year": base_year, "players": players}
-
     year_cols = [f"y{i}" for i in range(1, 7)]
-    for tr in tbody.find_all("tr"):
-        th = tr.find("th", {"data-stat": "player"})
+    for tr in table.body:
+        th = next((c for c in tr.cells if c.tag == "th" and c.get("data-stat") == "player"), None)
         if not th:
             continue
-        a = th.find("a")
-        player = th.get_text(strip=True)
-        href = a.get("href") if a else None
+        href = th.href
         player_url = ("https://www.basketball-reference.com" + href) if href else None
         player_id = th.get("csk")
+        tds = {}
+        for c in tr.cells:
+            if c.tag == "td":
+                tds.setdefault(c.get("data-stat"), c)
 
         flags: List[str] = []
         years_remaining = 0
@@ -207,10 +262,10 @@ def fetch_team_contracts(team_abbr: str, session: requests.Session | None = None
         current_salary_text = ""
 
         for idx, col in enumerate(year_cols):
-            td = tr.find("td", {"data-stat": col})
+            td = tds.get(col)
             if not td:
                 continue
-            text = td.get_text(strip=True)
+            text = td.text
             csk = td.get("csk")
             has_value = bool(text) or (csk is not None and csk != "")
             if has_value:
@@ -222,14 +277,12 @@ def fetch_team_contracts(team_abbr: str, session: requests.Session | None = None
                     except ValueError:
                         current_salary = None
             # flags
-            classes = td.get("class", [])
-            if classes and any("salary-pl" == c for c in classes):
-                if "player_option" not in flags:
-                    flags.append("player_option")
-            if classes and any("salary-tm" == c for c in classes):
-                if "team_option" not in flags:
-                    flags.append("team_option")
-            if td.find("em") and "non_guaranteed" not in flags:
+            classes = td.classes
+            if "salary-pl" in classes and "player_option" not in flags:
+                flags.append("player_option")
+            if "salary-tm" in classes and "team_option" not in flags:
+                flags.append("team_option")
+            if td.has_em and "non_guaranteed" not in flags:
                 flags.append("non_guaranteed")
 
         # Derive primary status
@@ -243,7 +296,7 @@ def fetch_team_contracts(team_abbr: str, session: requests.Session | None = None
             status = "guaranteed"
 
         players.append({
-            "player": player,
+            "player": th.text,
             "player_url": player_url,
             "player_id": player_id,
             "current_salary": current_salary,
@@ -254,3 +307,17 @@ def fetch_team_contracts(team_abbr: str, session: requests.Session | None = None
         })
 
     return {"team": team_abbr, "base_year_label": base_label, "base_year": base_year, "players": players}
+
+
+def iter_all_contracts(
+    max_workers: int = FETCH_WORKERS, teams: Iterable[str] = TEAM_ABBRS, errors: Dict[str, str] | None = None
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    return iter_league(fetch_team_contracts, teams, max_workers, errors)
+
+
+def contract_rows(res: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Flatten a `fetch_team_contracts` result into JSONL rows (one per player)."""
+    return [
+        {**p, "team": res["team"], "base_year": res.get("base_year"), "base_year_label": res.get("base_year_label")}
+        for p in res.get("players", [])
+    ]
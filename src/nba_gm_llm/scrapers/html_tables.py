@@ -0,0 +1,146 @@
+from __future__ import annotations
+import re
+from html.parser import HTMLParser
+from typing import Dict, Iterable, List, Optional
+from ..metrics import metrics
+
+_TABLE_TAG = re.compile(r"<(/?)table\b", re.IGNORECASE)
+
+
+class Cell:
+    __slots__ = ("tag", "attrs", "text", "href", "has_em")
+
+    def __init__(self, tag: str, attrs: Dict[str, str]):
+        self.tag = tag
+        self.attrs = attrs
+        self.text = ""
+        self.href: Optional[str] = None
+        self.has_em = False
+
+    def get(self, name: str, default=None):
+        return self.attrs.get(name, default)
+
+    @property
+    def classes(self) -> List[str]:
+        return self.attrs.get("class", "").split()
+
+
+class Row:
+    __slots__ = ("cells", "href", "by_stat")
+
+    def __init__(self):
+        self.cells: List[Cell] = []
+        self.href: Optional[str] = None  # first link anywhere in the row
+        self.by_stat: Dict[str, Cell] = {}  # first cell per data-stat
+
+    def tds(self) -> List[Cell]:
+        return [c for c in self.cells if c.tag == "td"]
+
+
+class Table:
+    __slots__ = ("id", "head", "body")
+
+    def __init__(self, table_id: str):
+        self.id = table_id
+        self.head: List[Row] = []
+        self.body: List[Row] = []
+
+
+class _TableParser(HTMLParser):
+    """Single pass over one <table> fragment collecting thead/tbody rows.
+
+    Cell text follows BeautifulSoup's `get_text(strip=True)`: each text node is
+    stripped and the non-empty pieces are concatenated.
+    """
+
+    def __init__(self, table: Table):
+        super().__init__(convert_charrefs=True)
+        self.table = table
+        self._section: Optional[List[Row]] = None
+        self._row: Optional[Row] = None
+        self._cell: Optional[Cell] = None
+        self._text: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "tbody":
+            self._section = self.table.body
+        elif tag == "thead":
+            self._section = self.table.head
+        elif tag == "tr":
+            self._row = Row()
+        elif tag in ("td", "th") and self._row is not None:
+            self._close_cell()
+            self._cell = Cell(tag, {k: (v or "") for k, v in attrs})
+        elif tag == "a":
+            href = dict(attrs).get("href")
+            if self._cell is not None and self._cell.href is None:
+                self._cell.href = href
+            if self._row is not None and self._row.href is None and href:
+                self._row.href = href
+        elif tag == "em" and self._cell is not None:
+            self._cell.has_em = True
+
+    def handle_endtag(self, tag):
+        if tag in ("td", "th"):
+            self._close_cell()
+        elif tag == "tr":
+            self._close_row()
+        elif tag in ("tbody", "thead", "tfoot"):
+            self._close_row()
+            self._section = None
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            data = data.strip()
+            if data:
+                self._text.append(data)
+
+    def _close_cell(self):
+        cell = self._cell
+        if cell is None:
+            return
+        cell.text = "".join(self._text)
+        self._text = []
+        self._row.cells.append(cell)
+        stat = cell.attrs.get("data-stat")
+        if stat is not None and stat not in self._row.by_stat:
+            self._row.by_stat[stat] = cell
+        self._cell = None
+
+    def _close_row(self):
+        self._close_cell()
+        if self._row is not None and self._section is not None:
+            self._section.append(self._row)
+        self._row = None
+
+
+def find_table_html(html: str, table_id: str) -> Optional[str]:
+    """Return the raw `<table id=...>...</table>` fragment, live or inside a comment."""
+    m = re.search(r'<table\b[^>]*\bid="%s"' % re.escape(table_id), html)
+    if m is None:
+        return None
+    depth = 0
+    for tag in _TABLE_TAG.finditer(html, m.start()):
+        depth += -1 if tag.group(1) else 1
+        if depth == 0:
+            return html[m.start():html.index(">", tag.end()) + 1]
+    return html[m.start():]
+
+
+def parse_table(fragment: str, table_id: str = "") -> Table:
+    table = Table(table_id)
+    parser = _TableParser(table)
+    parser.feed(fragment)
+    parser.close()
+    return table
+
+
+def extract_tables(html: str, table_ids: Iterable[str]) -> Dict[str, Table]:
+    """Find and parse only the requested tables; the rest of the page is never tokenized."""
+    out: Dict[str, Table] = {}
+    with metrics.span("parse.html"):
+        for tid in table_ids:
+            fragment = find_table_html(html, tid)
+            if fragment is not None:
+                out[tid] = parse_table(fragment, tid)
+    return out
@@ -0,0 +1,251 @@
+"""Long-lived local query daemon.
+
+`python -m nba_gm_llm.cli serve` keeps the retrieval, payroll and identity
+indexes and recently read raw files in memory and answers JSON over HTTP on
+127.0.0.1 (SERVE_PORT), so repeated GM queries skip interpreter start-up,
+imports and disk parsing:
+
+    GET /health
+    GET /search?q=...&k=5&mode=hybrid
+    GET /payroll?year=2025[&team=BOS]
+    GET /identity?bbr=brownja02 | ?nba=1627759
+    GET /contracts?team=BOS
+    GET /player_stats[?season=2024-25]
+    GET /trades?team=BOS[&shape=2x1&shape=3x2&k=20]
+    GET /comparables?player=2544[&player=...&season=2024-25&k=5&pool_season=...&min_age=&max_age=&min_minutes=]
+
+`query()` is the client side; it returns None when no daemon is listening so
+callers can fall back to local files.
+"""
+from __future__ import annotations
+from dataclasses import asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+from urllib.parse import parse_qs, urlencode, urlsplit
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from . import columnar
+from .config import RAW_DIR, INDEX_DIR, SERVE_HOST, SERVE_PORT
+
+_files: Dict[Path, Tuple[Tuple[int, int], List[Dict[str, Any]]]] = {}
+_files_lock = threading.Lock()
+
+
+def read_rows(path: Path) -> List[Dict[str, Any]]:
+    """Rows of a JSONL file, decoded once (from its columnar sidecar) and reused until it changes."""
+    st = path.stat()
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _files_lock:
+        hit = _files.get(path)
+        if hit and hit[0] == stamp:
+            return hit[1]
+    rows = columnar.read_rows(path)
+    with _files_lock:
+        _files[path] = (stamp, rows)
+    return rows
+
+
+def local_contracts(team: str, raw_dir: Path = RAW_DIR) -> Dict[str, Any] | None:
+    """`fetch_team_contracts`-shaped result from contracts_{team}.jsonl, or None if absent."""
+    path = raw_dir / "bbr" / f"contracts_{team}.jsonl"
+    if not path.exists():
+        return None
+    rows = read_rows(path)
+    head = rows[0] if rows else {}
+    players = [{k: v for k, v in r.items() if k not in ("team", "base_year", "base_year_label")} for r in rows]
+    return {"team": team, "base_year_label": head.get("base_year_label"), "base_year": head.get("base_year"), "players": players}
+
+
+def local_player_stats(raw_dir: Path = RAW_DIR) -> Dict[str, List[Dict[str, Any]]]:
+    """Every player_stats_{season}.jsonl on disk, keyed by season label."""
+    return {p.stem.rsplit("_", 1)[-1]: read_rows(p) for p in sorted((raw_dir / "nba_api").glob("player_stats_*.jsonl"))}
+
+
+class _Indexes:
+    """Lazily loaded indexes, reloaded when their files change on disk."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._retrieval = None
+        self._retrieval_stamp = None
+        self._identity = None
+
+    def retrieval(self):
+        from .retrieval.index import RetrievalIndex
+
+        meta = INDEX_DIR / "meta.json"
+        stamp = meta.stat().st_mtime_ns if meta.exists() else None
+        with self._lock:
+            if self._retrieval is None or stamp != self._retrieval_stamp:
+                self._retrieval, self._retrieval_stamp = RetrievalIndex(), stamp
+            return self._retrieval
+
+    def payroll(self):
+        from .processing.payroll import get_payroll_index
+
+        with self._lock:
+            return get_payroll_index()
+
+    def identity(self):
+        from .processing.identity import IdentityIndex
+
+        with self._lock:
+            if self._identity is None:
+                self._identity = IdentityIndex()
+            self._identity.update()
+            return self._identity
+
+
+_indexes = _Indexes()
+_started = time.time()
+
+
+def _one(q: Dict[str, List[str]], name: str, default: Any = None) -> Any:
+    return q.get(name, [default])[0]
+
+
+def _health(q):
+    return {"ok": True, "uptime_s": round(time.time() - _started, 1)}
+
+
+def _search(q):
+    hits = _indexes.retrieval().search(_one(q, "q"), max(1, int(_one(q, "k", 5))), _one(q, "mode", "hybrid"))
+    return [asdict(h) for h in hits]
+
+
+def _payroll(q):
+    idx = _indexes.payroll()
+    year, team = int(_one(q, "year")), _one(q, "team")
+    if team:
+        entry = idx.get(team.upper(), year)
+        return asdict(entry) if entry else None
+    return [asdict(e) for e in idx.league(year)]
+
+
+def _identity(q):
+    idx = _indexes.identity()
+    if "bbr" in q:
+        return {"bbr_id": _one(q, "bbr"), "nba_id": idx.nba_id(_one(q, "bbr"))}
+    return {"nba_id": int(_one(q, "nba")), "bbr_id": idx.bbr_id(int(_one(q, "nba")))}
+
+
+def _contracts(q):
+    return local_contracts(_one(q, "team", "BOS").upper())
+
+
+def _player_stats(q):
+    stats = local_player_stats()
+    season = _one(q, "season")
+    if season:
+        return stats.get(season)
+    return {"seasons": sorted(stats, reverse=True), "counts": {s: len(r) for s, r in stats.items()}}
+
+
+def _comparables(q):
+    from .processing.comparables import get_comparables_index
+
+    idx = get_comparables_index()
+    rows = [idx.find(p, _one(q, "season")) for p in q.get("player", [])]
+    filters = {
+        "seasons": q.get("pool_season"),
+        **{f: float(_one(q, f)) if f in q else None for f in ("min_age", "max_age", "min_minutes")},
+    }
+    found = iter(idx.query([r for r in rows if r is not None], max(1, int(_one(q, "k", 5))), **filters))
+    out = []
+    for p, r in zip(q.get("player", []), rows):
+        comps = [] if r is None else [asdict(c) for c in next(found)]
+        out.append({"player": p, "season": None if r is None else str(idx.season[r]), "comparables": comps})
+    return out
+
+
+def _trades(q):
+    from .processing.trades import best_trades
+
+    shapes = [tuple(int(x) for x in sh.lower().split("x")) for sh in q.get("shape", ["2x1", "3x2"])]
+    return [asdict(m) for m in best_trades(_one(q, "team").upper(), max(1, int(_one(q, "k", 20))), shapes=shapes, workers=1)]
+
+
+ROUTES: Dict[str, Callable[[Dict[str, List[str]]], Any]] = {
+    "/health": _health,
+    "/search": _search,
+    "/payroll": _payroll,
+    "/identity": _identity,
+    "/contracts": _contracts,
+    "/player_stats": _player_stats,
+    "/trades": _trades,
+    "/comparables": _comparables,
+}
+# Query parameters each route needs; a tuple means any one of them will do.
+REQUIRED: Dict[str, List[Any]] = {
+    "/search": ["q"],
+    "/payroll": ["year"],
+    "/identity": [("bbr", "nba")],
+    "/trades": ["team"],
+    "/comparables": ["player"],
+}
+
+
+def _missing(path: str, q: Dict[str, List[str]]) -> List[str]:
+    need = [p if isinstance(p, tuple) else (p,) for p in REQUIRED.get(path, [])]
+    return [" or ".join(alts) for alts in need if not any(q.get(a, [""])[0] for a in alts)]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        route = ROUTES.get(parts.path)
+        if route is None:
+            return self._send(404, {"error": f"unknown path {parts.path}"})
+        q = parse_qs(parts.query)
+        missing = _missing(parts.path, q)
+        if missing:
+            return self._send(400, {"error": f"missing query parameter: {', '.join(missing)}"})
+        try:
+            body = route(q)
+        except (KeyError, TypeError, ValueError) as e:
+            return self._send(400, {"error": repr(e)})
+        except Exception as e:
+            return self._send(500, {"error": repr(e)})
+        self._send(200 if body is not None else 404, body)
+
+    def _send(self, status: int, body: Any) -> None:
+        data = json.dumps(body, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, fmt, *args):  # keep the terminal quiet
+        pass
+
+
+def run_server(host: str = SERVE_HOST, port: int = SERVE_PORT) -> None:
+    # Load the cheap indexes up front so the first query is as fast as the rest.
+    _indexes.payroll()
+    _indexes.retrieval()
+    server = ThreadingHTTPServer((host, port), _Handler)
+    print(f"Serving on http://{host}:{port} (Ctrl-C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def query(path: str, params: Dict[str, Any] | None = None, timeout: float = 0.5, host: str = SERVE_HOST, port: int = SERVE_PORT) -> Any:
+    """GET a daemon route; None if the daemon is not running or has no answer."""
+    url = f"http://{host}:{port}{path}"
+    if params:
+        url += "?" + urlencode(params, doseq=True)
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as resp:
+            return json.loads(resp.read().decode("utf-8"))
+    except (urllib.error.URLError, OSError, ValueError):
+        return None
@@ -0,0 +1,249 @@
+"""Content-addressed snapshots of BBR rosters, salaries and contracts, with keyed diffs.
+
+`SnapshotStore.take()` records the raw files as they are now in a SQLite store
+under data/snapshots/ (zlib-compressed blobs, like the HTTP cache):
+
+  rows       row hash -> canonical JSON of one row, stored once ever
+  trees      tree hash -> one file as [[row key, row hash], ...]
+  snapshots  id, time, {relative path: tree hash}
+
+An unchanged row costs nothing and an unchanged file one tree reference, so
+a daily snapshot of a quiet day is a few hundred bytes. Files whose size and
+mtime are unchanged since the last snapshot are not even re-read.
+
+Diffs join two snapshots' trees on row key and compare hashes; only changed
+rows are decoded. Each snapshot appends its diff against the previous one to
+data/snapshots/changes.jsonl, which downstream steps can read (`affected()`)
+to refresh only the teams and players involved.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path, PurePosixPath
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+from urllib.parse import urlsplit
+import hashlib
+import json
+import sqlite3
+import threading
+import zlib
+
+from .config import DATA_DIR, RAW_DIR
+
+SNAPSHOT_DIR = DATA_DIR / "snapshots"
+# Raw files snapshotted, relative to the raw dir; rows are keyed by BBR player id.
+SNAPSHOT_GLOBS = ("bbr/roster_*_*.jsonl", "bbr/salaries_*_*.jsonl", "bbr/contracts_*.jsonl")
+_OPTION_STATUSES = {"player_option", "team_option"}
+
+
+@dataclass
+class Snapshot:
+    id: str
+    taken_at: str
+    files: Dict[str, str]  # relative path -> tree hash
+
+
+def _canonical(obj: Any) -> bytes:
+    return json.dumps(obj, sort_keys=True, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:32]
+
+
+def _file_meta(rel: str) -> Dict[str, Any]:
+    """Entity, team and year from a raw file name, e.g. bbr/roster_2025_BOS.jsonl."""
+    parts = Path(rel).stem.split("_")
+    meta: Dict[str, Any] = {"entity": "salaries" if parts[0] == "salaries" else parts[0], "team": parts[-1]}
+    if len(parts) == 3:
+        meta["year"] = int(parts[1])
+    return meta
+
+
+def _player_id(row: Dict[str, Any]) -> str | None:
+    """BBR player id, from the row or its player URL (roster rows carry only the URL)."""
+    if row.get("player_id"):
+        return row["player_id"]
+    url = row.get("player_url")
+    return PurePosixPath(urlsplit(url).path).stem if url else None
+
+
+def _row_keys(rows: Sequence[Dict[str, Any]]) -> List[str]:
+    """Key per row: player id, else name; repeats get #2, #3, ..."""
+    seen: Dict[str, int] = {}
+    keys = []
+    for r in rows:
+        key = _player_id(r) or str(r.get("player") or "")
+        seen[key] = seen.get(key, 0) + 1
+        keys.append(key if seen[key] == 1 else f"{key}#{seen[key]}")
+    return keys
+
+
+class SnapshotStore:
+    def __init__(self, root: Path = SNAPSHOT_DIR, raw_dir: Path = RAW_DIR):
+        self.root = root
+        self.raw_dir = raw_dir
+        self.changes_path = root / "changes.jsonl"
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.root.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(self.root / "store.sqlite"), check_same_thread=False)
+            self._db.executescript(
+                "CREATE TABLE IF NOT EXISTS rows (hash TEXT PRIMARY KEY, data BLOB);"
+                "CREATE TABLE IF NOT EXISTS trees (hash TEXT PRIMARY KEY, data BLOB);"
+                "CREATE TABLE IF NOT EXISTS snapshots (id TEXT PRIMARY KEY, taken_at TEXT, files BLOB);"
+                "CREATE TABLE IF NOT EXISTS file_stamps (path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, tree TEXT);"
+            )
+        return self._db
+
+    # ---- writing ----
+
+    def _tree_for(self, path: Path, rel: str) -> str:
+        st = path.stat()
+        hit = self.db.execute("SELECT mtime_ns, size, tree FROM file_stamps WHERE path = ?", (rel,)).fetchone()
+        if hit and hit[0] == st.st_mtime_ns and hit[1] == st.st_size:
+            return hit[2]
+        with path.open("r", encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        blobs = [_canonical(r) for r in rows]
+        hashes = [_hash(b) for b in blobs]
+        self.db.executemany(
+            "INSERT OR IGNORE INTO rows VALUES (?, ?)", [(h, zlib.compress(b, 6)) for h, b in zip(hashes, blobs)]
+        )
+        tree = _canonical(sorted(zip(_row_keys(rows), hashes)))
+        tree_hash = _hash(tree)
+        self.db.execute("INSERT OR IGNORE INTO trees VALUES (?, ?)", (tree_hash, zlib.compress(tree, 6)))
+        self.db.execute("INSERT OR REPLACE INTO file_stamps VALUES (?, ?, ?, ?)", (rel, st.st_mtime_ns, st.st_size, tree_hash))
+        return tree_hash
+
+    def take(self) -> Tuple[Snapshot | None, List[Dict[str, Any]]]:
+        """Snapshot the raw files; returns (snapshot, changes vs the previous one).
+
+        When nothing changed since the latest snapshot, no snapshot is recorded
+        and (None, []) is returned.
+        """
+        with self._lock:
+            files: Dict[str, str] = {}
+            for pattern in SNAPSHOT_GLOBS:
+                for p in sorted(self.raw_dir.glob(pattern)):
+                    rel = p.relative_to(self.raw_dir).as_posix()
+                    files[rel] = self._tree_for(p, rel)
+            prev = self.latest()
+            if prev is not None and prev.files == files:
+                self.db.commit()
+                return None, []
+            now = datetime.now(timezone.utc)
+            snap_id = now.strftime("%Y%m%dT%H%M%S%fZ")
+            snap = Snapshot(snap_id, now.isoformat(timespec="seconds"), files)
+            self.db.execute("INSERT INTO snapshots VALUES (?, ?, ?)", (snap.id, snap.taken_at, zlib.compress(_canonical(files))))
+            self.db.commit()
+        changes = self.diff(prev, snap) if prev is not None else []
+        if changes:
+            with self.changes_path.open("a", encoding="utf-8") as f:
+                for c in changes:
+                    f.write(json.dumps(c, ensure_ascii=False) + "\n")
+        return snap, changes
+
+    # ---- reading ----
+
+    def _snapshot(self, row) -> Snapshot:
+        return Snapshot(row[0], row[1], json.loads(zlib.decompress(row[2])))
+
+    def list(self) -> List[Snapshot]:
+        return [self._snapshot(r) for r in self.db.execute("SELECT id, taken_at, files FROM snapshots ORDER BY id")]
+
+    def get(self, snap_id: str) -> Snapshot:
+        """A snapshot by id or unique id prefix."""
+        rows = self.db.execute("SELECT id, taken_at, files FROM snapshots WHERE id LIKE ? ORDER BY id", (f"{snap_id}%",)).fetchall()
+        if len(rows) != 1:
+            raise KeyError(f"{len(rows)} snapshots match {snap_id!r}")
+        return self._snapshot(rows[0])
+
+    def latest(self) -> Snapshot | None:
+        row = self.db.execute("SELECT id, taken_at, files FROM snapshots ORDER BY id DESC LIMIT 1").fetchone()
+        return self._snapshot(row) if row else None
+
+    def _tree(self, tree_hash: str | None) -> Dict[str, str]:
+        if tree_hash is None:
+            return {}
+        data = self.db.execute("SELECT data FROM trees WHERE hash = ?", (tree_hash,)).fetchone()[0]
+        return dict(json.loads(zlib.decompress(data)))
+
+    def _row(self, row_hash: str) -> Dict[str, Any]:
+        data = self.db.execute("SELECT data FROM rows WHERE hash = ?", (row_hash,)).fetchone()[0]
+        return json.loads(zlib.decompress(data))
+
+    def rows(self, snap: Snapshot, rel: str) -> Iterator[Dict[str, Any]]:
+        """The rows of one raw file as of `snap`."""
+        for _, h in sorted(self._tree(snap.files.get(rel)).items()):
+            yield self._row(h)
+
+    # ---- diffs ----
+
+    def diff(self, a: Snapshot, b: Snapshot) -> List[Dict[str, Any]]:
+        """Row-level changes from `a` to `b`, joined on row key within each file.
+
+        Files with the same tree hash are skipped without decoding. A player
+        removed from one team's roster and added to another's in the same year
+        is reported once as "moved"; a contract status change out of a player or
+        team option as "option_decision".
+        """
+        changes: List[Dict[str, Any]] = []
+        for rel in sorted(set(a.files) | set(b.files)):
+            if a.files.get(rel) == b.files.get(rel):
+                continue
+            old, new = self._tree(a.files.get(rel)), self._tree(b.files.get(rel))
+            meta = _file_meta(rel)
+            for key in sorted(set(old) | set(new)):
+                ho, hn = old.get(key), new.get(key)
+                if ho == hn:
+                    continue
+                ro = self._row(ho) if ho else None
+                rn = self._row(hn) if hn else None
+                row = rn or ro
+                change = {
+                    "snapshot": b.id, "base": a.id, **meta, "key": key,
+                    "player_id": _player_id(row), "player": row.get("player"),
+                    "change": "added" if ro is None else "removed" if rn is None else "changed",
+                }
+                if ro is not None and rn is not None:
+                    change["fields"] = {
+                        f: [ro.get(f), rn.get(f)] for f in sorted(set(ro) | set(rn)) if ro.get(f) != rn.get(f)
+                    }
+                    if meta["entity"] == "contracts" and ro.get("status") in _OPTION_STATUSES and ro.get("status") != rn.get("status"):
+                        change["change"] = "option_decision"
+                changes.append(change)
+        return _pair_moves(changes)
+
+    def affected(self, since: str | None = None) -> Dict[str, List[Any]]:
+        """Teams and players touched by changes recorded after snapshot `since` (all, if None)."""
+        teams, players = set(), set()
+        if self.changes_path.exists():
+            with self.changes_path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    c = json.loads(line)
+                    if since is None or c["snapshot"] > since:
+                        teams.update(t for t in (c.get("team"), c.get("from_team")) if t)
+                        if c.get("player_id"):
+                            players.add(c["player_id"])
+        return {"teams": sorted(teams), "players": sorted(players)}
+
+
+def _pair_moves(changes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Fold a roster removal and addition of the same player and year into one "moved" change."""
+    removed = {
+        (c["player_id"], c.get("year")): i
+        for i, c in enumerate(changes) if c["entity"] == "roster" and c["change"] == "removed" and c["player_id"]
+    }
+    drop = set()
+    for c in changes:
+        if c["entity"] == "roster" and c["change"] == "added":
+            i = removed.get((c["player_id"], c.get("year")))
+            if i is not None and i not in drop:
+                c["change"], c["from_team"] = "moved", changes[i]["team"]
+                drop.add(i)
+    return [c for i, c in enumerate(changes) if i not in drop]
@@ -1,10 +1,43 @@
 from __future__ import annotations
-import time
-from typing import Iterable, Dict, Any, List
-from datetime import datetime
+import json
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterable, Dict, Any, List, Tuple, TypeVar
+from datetime import date, datetime
+from itertools import compress
+import numpy as np
+import pandas as pd
+import requests
 from nba_api.stats.static import teams, players
-from nba_api.stats.endpoints import teamgamelog, leaguedashplayerstats
-from nba_api.stats.library.parameters import Season
+from nba_api.stats.endpoints import teamgamelog, leaguegamelog, leaguedashplayerstats
+from nba_api.stats.library.http import NBAStatsHTTP
+from ..cache import http_cache
+from ..config import NBA_STATS_BASE_URL
+from ..ratelimit import AdaptiveBackoff, limiter, retry_call
+from ..storage import append_jsonl_dedup, read_json, write_json
+
+if NBA_STATS_BASE_URL:
+    NBAStatsHTTP.base_url = NBA_STATS_BASE_URL
+
+T = TypeVar("T")
+
+# One backoff for every stats.nba.com call in the process: throttling seen by
+# any worker slows all of them, and successes bring the pace back up.
+stats_backoff = AdaptiveBackoff(base=1.0, factor=2.0, recover=0.5, max_delay=60.0)
+STATS_RETRIES = 4
+# 429s and blocked responses surface from nba_api as JSON decode errors.
+_RETRYABLE = (requests.RequestException, ValueError, KeyError)
+
+
+def _stats_call(call: Callable[[], T], attempts: int = STATS_RETRIES) -> T:
+    """Run one nba_api request inside the stats host rate budget with adaptive retries."""
+    return retry_call(
+        call,
+        stats_backoff,
+        attempts=attempts,
+        retry_on=_RETRYABLE,
+        before=lambda: limiter.acquire(NBAStatsHTTP.base_url),
+    )
 
 
 def list_teams() -> List[Dict[str, Any]]:
@@ -15,15 +48,176 @@ def list_players(active_only: bool = True) -> List[Dict[str, Any]]:
     return players.get_players() if not active_only else [p for p in players.get_players() if p.get("is_active")]
 
 
-def fetch_team_gamelogs(team_ids: Iterable[int], season: str, sleep: float = 0.6) -> Dict[int, List[Dict[str, Any]]]:
+def parse_game_date(text: str) -> date:
+    """Parse stats.nba.com GAME_DATE values ('APR 13, 2025' or ISO '2025-04-13')."""
+    text = text.strip()
+    try:
+        return datetime.strptime(text[:10], "%Y-%m-%d").date()
+    except ValueError:
+        return datetime.strptime(text.title(), "%b %d, %Y").date()
+
+
+def fetch_team_gamelogs(
+    team_ids: Iterable[int],
+    season: str,
+    date_from: Dict[int, date] | None = None,
+) -> Dict[int, List[Dict[str, Any]]]:
+    """Fetch TeamGameLog per team; `date_from[tid]` limits a team to games on/after that date.
+
+    Requests are paced by the stats host's token bucket in `_stats_call`, not a fixed sleep.
+    """
     out: Dict[int, List[Dict[str, Any]]] = {}
     for tid in team_ids:
-        gl = teamgamelog.TeamGameLog(team_id=tid, season=Season(season)).get_normalized_dict()
+        since = (date_from or {}).get(tid)
+        since_param = since.strftime("%m/%d/%Y") if since else ""
+
+        def call() -> Dict[str, Any]:
+            return _stats_call(
+                lambda: teamgamelog.TeamGameLog(team_id=tid, season=season, date_from_nullable=since_param).get_normalized_dict()
+            )
+
+        gl = http_cache.cached_json("teamgamelog", {"team_id": tid, "season": season, "date_from": since_param}, call)
         out[tid] = gl.get("TeamGameLog", [])
-        time.sleep(sleep)  # be polite
     return out
 
 
+# Column order of TeamGameLog rows; bulk rows are reshaped to match.
+TEAM_GAMELOG_FIELDS = [
+    "Team_ID", "Game_ID", "GAME_DATE", "MATCHUP", "WL", "W", "L", "W_PCT", "MIN", "FGM", "FGA", "FG_PCT",
+    "FG3M", "FG3A", "FG3_PCT", "FTM", "FTA", "FT_PCT", "OREB", "DREB", "REB", "AST", "STL", "BLK", "TOV", "PF", "PTS",
+]
+
+
+def fetch_league_gamelog(season: str, player_or_team: str = "T", date_from: date | None = None) -> List[Dict[str, Any]]:
+    """One LeagueGameLog request: every team's ('T') or player's ('P') games for a season."""
+    since_param = date_from.strftime("%m/%d/%Y") if date_from else ""
+    resp = http_cache.cached_json(
+        "leaguegamelog",
+        {"season": season, "player_or_team": player_or_team, "date_from": since_param},
+        lambda: _stats_call(lambda: leaguegamelog.LeagueGameLog(
+            season=season, player_or_team_abbreviation=player_or_team, date_from_nullable=since_param
+        ).get_normalized_dict()),
+    )
+    return resp.get("LeagueGameLog", [])
+
+
+def league_to_team_gamelogs(rows: Iterable[Dict[str, Any]], prior: Dict[int, Tuple[int, int]] | None = None) -> Dict[int, List[Dict[str, Any]]]:
+    """Split LeagueGameLog team rows into per-team TeamGameLog-shaped rows.
+
+    Recomputes the running W/L/W_PCT columns (starting from `prior[tid]` when
+    only a date window was fetched), formats GAME_DATE like TeamGameLog and
+    keeps PLUS_MINUS. Each team's list is most recent first, as TeamGameLog returns it.
+    """
+    by_team: Dict[int, List[Dict[str, Any]]] = {}
+    for r in rows:
+        by_team.setdefault(int(r["TEAM_ID"]), []).append(r)
+    out: Dict[int, List[Dict[str, Any]]] = {}
+    for tid, games in by_team.items():
+        games.sort(key=lambda r: (r["GAME_DATE"], r["GAME_ID"]))
+        w, l = (prior or {}).get(tid, (0, 0))
+        shaped = []
+        for r in games:
+            w += r.get("WL") == "W"
+            l += r.get("WL") == "L"
+            row = {f: r.get(f) for f in TEAM_GAMELOG_FIELDS[8:]}
+            shaped.append({
+                "Team_ID": tid,
+                "Game_ID": r["GAME_ID"],
+                "GAME_DATE": parse_game_date(r["GAME_DATE"]).strftime("%b %d, %Y").upper(),
+                "MATCHUP": r.get("MATCHUP"),
+                "WL": r.get("WL"),
+                "W": w,
+                "L": l,
+                "W_PCT": round(w / (w + l), 3) if w + l else 0.0,
+                **row,
+                "PLUS_MINUS": r.get("PLUS_MINUS"),
+            })
+        shaped.reverse()
+        out[tid] = shaped
+    return out
+
+
+def fetch_team_gamelogs_bulk(season: str, team_ids: Iterable[int] | None = None) -> Dict[int, List[Dict[str, Any]]]:
+    """Same result shape as `fetch_team_gamelogs`, from a single league-wide request."""
+    logs = league_to_team_gamelogs(fetch_league_gamelog(season, "T"))
+    if team_ids is None:
+        return logs
+    return {tid: logs.get(tid, []) for tid in team_ids}
+
+
+def fetch_player_gamelogs_bulk(season: str) -> List[Dict[str, Any]]:
+    """Every player's game rows for a season in one request (LeagueGameLog, 'P')."""
+    return fetch_league_gamelog(season, "P")
+
+
+def _gamelog_key(row: Dict[str, Any]) -> Tuple[str, str]:
+    return str(row.get("TEAM_ID")), str(row.get("Game_ID") or row.get("GAME_ID"))
+
+
+def _watermarks_from_jsonl(path: Path) -> Tuple[Dict[int, date], Dict[int, Tuple[int, int]]]:
+    marks: Dict[int, date] = {}
+    records: Dict[int, Tuple[int, int]] = {}
+    if not path.exists():
+        return marks, records
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            tid, d = int(row["TEAM_ID"]), parse_game_date(row["GAME_DATE"])
+            if tid not in marks or d > marks[tid]:
+                marks[tid] = d
+                records[tid] = (int(row.get("W") or 0), int(row.get("L") or 0))
+    return marks, records
+
+
+def update_team_gamelogs(
+    out_path: Path, team_ids: Iterable[int], season: str, bulk: bool = False
+) -> Dict[str, int]:
+    """Incrementally refresh a `team_gamelogs_{season}.jsonl` file.
+
+    Keeps a per-team last-game-date watermark next to the file and only asks
+    each team for games on or after it. New rows are appended, deduplicated on
+    (TEAM_ID, Game_ID). With `bulk`, one league-wide request from the oldest
+    watermark replaces the per-team requests. Returns counts of teams,
+    requests, rows fetched and rows appended.
+    """
+    marks_path = out_path.with_suffix(".watermarks.json")
+    team_ids = list(team_ids)
+    marks: Dict[int, date] = {}
+    if out_path.exists():
+        stored = read_json(marks_path)
+        if stored:
+            marks = {int(k): date.fromisoformat(v) for k, v in stored.items()}
+        else:
+            marks, _ = _watermarks_from_jsonl(out_path)
+    if bulk:
+        since = min(marks.values()) if marks and all(t in marks for t in team_ids) else None
+        # Records as of each team's last stored game seed the running W/L columns.
+        _, records = _watermarks_from_jsonl(out_path) if since else ({}, {})
+        league_rows = [
+            r for r in fetch_league_gamelog(season, "T", date_from=since)
+            if int(r["TEAM_ID"]) not in marks or parse_game_date(r["GAME_DATE"]) > marks[int(r["TEAM_ID"])]
+        ]
+        logs = league_to_team_gamelogs(league_rows, prior=records)
+        logs = {tid: logs.get(tid, []) for tid in team_ids}
+        requests_made = 1
+    else:
+        logs = fetch_team_gamelogs(team_ids, season, date_from=marks)
+        requests_made = len(team_ids)
+    new_rows: List[Dict[str, Any]] = []
+    for tid, lst in logs.items():
+        for r in lst:
+            r["TEAM_ID"] = tid
+            new_rows.append(r)
+            d = parse_game_date(r["GAME_DATE"])
+            if tid not in marks or d > marks[tid]:
+                marks[tid] = d
+    added = append_jsonl_dedup(out_path, new_rows, _gamelog_key)
+    write_json(marks_path, {str(k): v.isoformat() for k, v in sorted(marks.items())})
+    return {"teams": len(team_ids), "requests": requests_made, "fetched": len(new_rows), "appended": added}
+
+
 def _season_label_from_end_year(end_year: int) -> str:
     return f"{end_year-1}-{str(end_year)[-2:]}"
 
@@ -44,32 +238,62 @@ def get_active_player_ids() -> List[int]:
     return [p["id"] for p in list_players(active_only=True)]
 
 
-def fetch_league_player_stats_by_season(season: str) -> List[Dict[str, Any]]:
+def filter_active_rows(rows: List[Dict[str, Any]], active_ids: np.ndarray) -> List[Dict[str, Any]]:
+    """Keep rows whose PLAYER_ID is in `active_ids`, with one vectorized membership test."""
+    if not rows:
+        return []
+    pids = pd.to_numeric(pd.Series([r.get("PLAYER_ID") for r in rows]), errors="coerce").fillna(-1).to_numpy(np.int64)
+    return list(compress(rows, np.isin(pids, active_ids)))
+
+
+def fetch_league_player_stats_by_season(season: str, attempts: int = STATS_RETRIES) -> List[Dict[str, Any]]:
     """Fetch league-wide player per-season stats (per nba.com public endpoint).
 
     Uses LeagueDashPlayerStats for the specified season label (e.g., '2024-25').
     """
-    resp = leaguedashplayerstats.LeagueDashPlayerStats(season=season).get_normalized_dict()
+    resp = http_cache.cached_json(
+        "leaguedashplayerstats",
+        {"season": season},
+        lambda: _stats_call(
+            lambda: leaguedashplayerstats.LeagueDashPlayerStats(season=season).get_normalized_dict(), attempts
+        ),
+    )
     return resp.get("LeagueDashPlayerStats", [])
 
 
-def fetch_active_players_stats_last_n_years(n: int = 5, sleep: float = 0.6) -> Dict[str, List[Dict[str, Any]]]:
-    seasons = last_n_seasons_labels(n)
-    active_ids = set(get_active_player_ids())
+def fetch_player_stats_seasons(
+    seasons: Iterable[str],
+    active_only: bool = True,
+    max_workers: int = 3,
+    attempts: int = STATS_RETRIES,
+    errors: Dict[str, str] | None = None,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Fetch several seasons of LeagueDashPlayerStats concurrently.
+
+    Pacing comes from the shared stats rate budget and adaptive backoff; each
+    season retries on its own, and a season that still fails is left out of
+    the result (its error recorded in `errors`) instead of aborting the run.
+    """
+    seasons = list(seasons)
+    active_ids = np.array(get_active_player_ids(), dtype=np.int64) if active_only else None
     out: Dict[str, List[Dict[str, Any]]] = {}
-    for s in seasons:
-        rows = fetch_league_player_stats_by_season(s)
-        # Filter to currently active players
-        filtered = []
-        for r in rows:
-            pid = r.get("PLAYER_ID")
+
+    def one(season: str) -> List[Dict[str, Any]]:
+        rows = fetch_league_player_stats_by_season(season, attempts)
+        return filter_active_rows(rows, active_ids) if active_ids is not None else rows
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {season: pool.submit(one, season) for season in seasons}
+        for season, fut in futures.items():
             try:
-                pid_int = int(pid) if pid is not None else -1
-            except Exception:
-                pid_int = -1
-            if pid_int in active_ids:
-                filtered.append(r)
-        rows = filtered
-        out[s] = rows
-        time.sleep(sleep)
+                out[season] = fut.result()
+            except Exception as e:
+                if errors is not None:
+                    errors[season] = f"{type(e).__name__}: {e}"
     return out
+
+
+def fetch_active_players_stats_last_n_years(
+    n: int = 5, max_workers: int = 3, errors: Dict[str, str] | None = None
+) -> Dict[str, List[Dict[str, Any]]]:
+    return fetch_player_stats_seasons(last_n_seasons_labels(n), max_workers=max_workers, errors=errors)
@@ -1,29 +1,267 @@
 from __future__ import annotations
+from itertools import islice
 from pathlib import Path
-from typing import Iterable, Dict, Any
+from typing import Iterable, Iterator, Dict, Any, Callable, Hashable, List, Sequence, Tuple
+from urllib.parse import quote
+import hashlib
 import json
-import pandas as pd
-import duckdb as ddb
+import threading
+import uuid
+from typing import TYPE_CHECKING
+from .metrics import metrics
+
+# Arrow and DuckDB are imported where used so JSON-only callers start quickly.
+if TYPE_CHECKING:
+    import duckdb as ddb
+    import pyarrow as pa
 
 
 def write_jsonl(path: Path, rows: Iterable[Dict[str, Any]]):
     path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("w", encoding="utf-8") as f:
+    n = 0
+    with metrics.span("storage.write_jsonl"), path.open("w", encoding="utf-8") as f:
         for r in rows:
             f.write(json.dumps(r, ensure_ascii=False) + "\n")
+            n += 1
+    metrics.incr("storage.jsonl_rows", n)
 
 
-def to_parquet(path: Path, rows: Iterable[Dict[str, Any]]):
+def append_jsonl_dedup(path: Path, rows: Iterable[Dict[str, Any]], key: Callable[[Dict[str, Any]], Hashable]) -> int:
+    """Append rows whose `key` is not already present in `path`. Returns rows appended."""
     path.parent.mkdir(parents=True, exist_ok=True)
-    df = pd.DataFrame(list(rows))
-    df.to_parquet(path, index=False)
+    seen = set()
+    if path.exists():
+        with path.open("r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    seen.add(key(json.loads(line)))
+    added = 0
+    with path.open("a", encoding="utf-8") as f:
+        for r in rows:
+            k = key(r)
+            if k in seen:
+                continue
+            seen.add(k)
+            f.write(json.dumps(r, ensure_ascii=False) + "\n")
+            added += 1
+    return added
 
 
-def duckdb_write(path: Path, table: str, rows: Iterable[Dict[str, Any]]):
-    con = ddb.connect(str(path))
-    df = pd.DataFrame(list(rows))
-    con.execute(f"CREATE TABLE IF NOT EXISTS {table} AS SELECT * FROM df WHERE 0=1")
-    con.register("df", df)
-    con.execute(f"INSERT INTO {table} SELECT * FROM df")
-    con.close()
+def read_json(path: Path, default: Any = None) -> Any:
+    if not path.exists():
+        return default
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def fingerprint(paths: Iterable[Path], key: Callable[[Path], str] = lambda p: p.name) -> Dict[str, List[int]]:
+    """`{key(path): [mtime_ns, size]}` for the paths that exist; a derived file is stale when this changes."""
+    out = {}
+    for p in paths:
+        try:
+            st = p.stat()
+        except FileNotFoundError:
+            continue
+        out[key(p)] = [st.st_mtime_ns, st.st_size]
+    return out
+
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def write_json(path: Path, obj: Any):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(obj, ensure_ascii=False, indent=2), encoding="utf-8")
+    tmp.replace(path)
+
+
+DEFAULT_BATCH_ROWS = 50_000
+
+
+def iter_batches(rows: Iterable[Dict[str, Any]], batch_size: int = DEFAULT_BATCH_ROWS) -> Iterator[List[Dict[str, Any]]]:
+    it = iter(rows)
+    while True:
+        batch = list(islice(it, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def _to_arrow(batch: List[Dict[str, Any]], schema: pa.Schema | None) -> pa.Table:
+    import pyarrow as pa
+
+    if schema is None:
+        return pa.Table.from_pylist(batch)
+    # Conform to the schema: missing keys become nulls, unknown keys are dropped. Each column is
+    # inferred on its own, then cast checked, so an int column meeting whole floats casts back
+    # but 2.5 raises instead of truncating.
+    try:
+        cols = {f.name: pa.array([r.get(f.name) for r in batch]) for f in schema}
+        return pa.table(cols).cast(schema, safe=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as e:
+        raise ValueError(f"batch does not fit the schema inferred from the first batch; pass schema= explicitly ({e})") from e
+
+
+def _infer_schema(batch: List[Dict[str, Any]]) -> pa.Schema:
+    """Schema of the first batch, with all-null columns widened to string."""
+    import pyarrow as pa
+
+    schema = pa.Table.from_pylist(batch).schema
+    return pa.schema([pa.field(f.name, pa.string()) if pa.types.is_null(f.type) else f for f in schema])
+
+
+def to_parquet(path: Path, rows: Iterable[Dict[str, Any]], batch_size: int = DEFAULT_BATCH_ROWS, schema: pa.Schema | None = None) -> int:
+    """Stream rows into one Parquet file in fixed-size record batches. Returns rows written.
 
+    The schema is taken from the first batch unless given; later batches are
+    conformed to it (missing keys become nulls, unknown keys are dropped).
+    """
+    import pyarrow.parquet as pq
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    writer: pq.ParquetWriter | None = None
+    n = 0
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    try:
+        for batch in iter_batches(rows, batch_size):
+            if writer is None:
+                schema = schema or _infer_schema(batch)
+                writer = pq.ParquetWriter(tmp, schema)
+            writer.write_table(_to_arrow(batch, schema))
+            n += len(batch)
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is not None:
+        tmp.replace(path)
+    return n
+
+
+def _partition_dir(root: Path, keys: Sequence[str], values: Tuple[Any, ...]) -> Path:
+    d = root
+    for k, v in zip(keys, values):
+        d = d / f"{k}={quote(str(v), safe='')}"
+    return d
+
+
+def write_partitioned(
+    root: Path,
+    rows: Iterable[Dict[str, Any]],
+    partition_by: Sequence[str],
+    constants: Dict[str, Any] | None = None,
+    batch_size: int = DEFAULT_BATCH_ROWS,
+    existing: str = "replace",
+    schema: pa.Schema | None = None,
+) -> Dict[str, int]:
+    """Stream rows into a Hive-partitioned Parquet dataset (`root/k1=v1/k2=v2/part-*.parquet`).
+
+    Partition values come from `constants` or from each row. At most
+    `batch_size` rows are buffered across all partitions, so memory stays flat
+    regardless of input size. Partitions that are not touched are never
+    rewritten; for touched ones `existing` picks "replace" (swap in the new
+    file), "append" (add a file alongside) or "skip" (keep the old data).
+    Returns rows written per partition directory.
+    """
+    import pyarrow.parquet as pq
+
+    if existing not in ("replace", "append", "skip"):
+        raise ValueError("existing must be replace, append or skip")
+    constants = constants or {}
+    keys = list(partition_by)
+    run_id = uuid.uuid4().hex[:12]
+    buffers: Dict[Tuple[Any, ...], List[Dict[str, Any]]] = {}
+    writers: Dict[Tuple[Any, ...], pq.ParquetWriter | None] = {}
+    counts: Dict[str, int] = {}
+    buffered = 0
+
+    def flush() -> None:
+        nonlocal schema, buffered
+        for part, batch in buffers.items():
+            if not batch:
+                continue
+            if part not in writers:
+                d = _partition_dir(root, keys, part)
+                if existing == "skip" and d.exists() and any(d.glob("*.parquet")):
+                    writers[part] = None
+                else:
+                    d.mkdir(parents=True, exist_ok=True)
+                    if schema is None:
+                        schema = _infer_schema(batch)
+                    writers[part] = pq.ParquetWriter(d / f"part-{run_id}.parquet.tmp", schema)
+            w = writers[part]
+            if w is not None:
+                w.write_table(_to_arrow(batch, schema))
+                label = str(_partition_dir(Path(), keys, part))
+                counts[label] = counts.get(label, 0) + len(batch)
+            batch.clear()
+        buffered = 0
+
+    try:
+        for r in rows:
+            part = tuple(constants[k] if k in constants else r.get(k) for k in keys)
+            r = {k: v for k, v in r.items() if k not in keys}
+            buffers.setdefault(part, []).append(r)
+            buffered += 1
+            if buffered >= batch_size:
+                flush()
+        flush()
+    finally:
+        for w in writers.values():
+            if w is not None:
+                w.close()
+    for part, w in writers.items():
+        if w is None:
+            continue
+        d = _partition_dir(root, keys, part)
+        if existing == "replace":
+            for old in d.glob("part-*.parquet"):
+                old.unlink()
+        (d / f"part-{run_id}.parquet.tmp").replace(d / f"part-{run_id}.parquet")
+    return counts
+
+
+_connections: Dict[str, "ddb.DuckDBPyConnection"] = {}
+_connections_lock = threading.Lock()
+
+
+def connect(path: Path) -> ddb.DuckDBPyConnection:
+    """Process-wide DuckDB connection per database file.
+
+    DuckDB connections are not safe to share between threads; callers on
+    worker threads should use `connect(path).cursor()`.
+    """
+    import duckdb as ddb
+
+    key = str(Path(path).resolve())
+    with _connections_lock:
+        con = _connections.get(key)
+        if con is None:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            con = _connections[key] = ddb.connect(key)
+        return con
+
+
+def close_connections() -> None:
+    with _connections_lock:
+        for con in _connections.values():
+            con.close()
+        _connections.clear()
+
+
+def duckdb_write(path: Path, table: str, rows: Iterable[Dict[str, Any]], batch_size: int = DEFAULT_BATCH_ROWS):
+    con = connect(path).cursor()
+    schema = None
+    for batch in iter_batches(rows, batch_size):
+        if schema is None:
+            schema = _infer_schema(batch)
+        arrow_batch = _to_arrow(batch, schema)
+        con.register("arrow_batch", arrow_batch)
+        con.execute(f"CREATE TABLE IF NOT EXISTS {table} AS SELECT * FROM arrow_batch WHERE 0=1")
+        con.execute(f"INSERT INTO {table} SELECT * FROM arrow_batch")
+        con.unregister("arrow_batch")
+    con.close()
@@ -0,0 +1,309 @@
+from __future__ import annotations
+import threading
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+import duckdb as ddb
+from .config import WAREHOUSE_PATH
+from .processing.export import raw_files
+from .processing.identity import IdentityIndex, get_identity_index
+from .storage import connect
+
+
+@dataclass(frozen=True)
+class TableSpec:
+    columns: Sequence[Tuple[str, str]]  # (name, DuckDB type)
+    key: Sequence[str]
+    # SQL expressions per column when loading raw rows; defaults to the column itself.
+    load_exprs: Dict[str, str]
+    # Aggregates for rows sharing a key within one load; other columns keep the last row's value.
+    merge: Dict[str, str] | None = None
+
+
+# Natural keys: re-ingesting a season replaces rows instead of duplicating them.
+TABLES: Dict[str, TableSpec] = {
+    "salaries": TableSpec(
+        columns=[
+            ("player_id", "VARCHAR"), ("team", "VARCHAR"), ("year", "INTEGER"), ("player", "VARCHAR"),
+            ("player_url", "VARCHAR"), ("salary", "BIGINT"), ("salary_text", "VARCHAR"),
+        ],
+        key=("player_id", "team", "year"),
+        load_exprs={"player_id": "COALESCE(player_id, player)"},
+        # BBR lists a player once per contract (e.g. two-way then standard); their salaries add up.
+        merge={"salary": "SUM(salary)", "salary_text": "string_agg(NULLIF(salary_text, ''), ' + ' ORDER BY _rn)"},
+    ),
+    "contracts": TableSpec(
+        columns=[
+            ("player_id", "VARCHAR"), ("team", "VARCHAR"), ("base_year", "INTEGER"), ("player", "VARCHAR"),
+            ("player_url", "VARCHAR"), ("current_salary", "BIGINT"), ("current_salary_text", "VARCHAR"),
+            ("years_remaining", "INTEGER"), ("status", "VARCHAR"), ("flags", "VARCHAR[]"), ("base_year_label", "VARCHAR"),
+        ],
+        key=("player_id", "team", "base_year"),
+        load_exprs={"player_id": "COALESCE(player_id, player)"},
+    ),
+    "team_gamelogs": TableSpec(
+        columns=[
+            ("TEAM_ID", "BIGINT"), ("Game_ID", "VARCHAR"), ("season", "VARCHAR"), ("GAME_DATE", "DATE"),
+            ("MATCHUP", "VARCHAR"), ("WL", "VARCHAR"), ("W", "INTEGER"), ("L", "INTEGER"), ("W_PCT", "DOUBLE"),
+            ("MIN", "INTEGER"), ("FGM", "INTEGER"), ("FGA", "INTEGER"), ("FG_PCT", "DOUBLE"), ("FG3M", "INTEGER"),
+            ("FG3A", "INTEGER"), ("FG3_PCT", "DOUBLE"), ("FTM", "INTEGER"), ("FTA", "INTEGER"), ("FT_PCT", "DOUBLE"),
+            ("OREB", "INTEGER"), ("DREB", "INTEGER"), ("REB", "INTEGER"), ("AST", "INTEGER"), ("STL", "INTEGER"),
+            ("BLK", "INTEGER"), ("TOV", "INTEGER"), ("PF", "INTEGER"), ("PTS", "INTEGER"), ("PLUS_MINUS", "INTEGER"),
+        ],
+        key=("TEAM_ID", "Game_ID"),
+        load_exprs={
+            "GAME_DATE": "COALESCE(TRY_CAST(GAME_DATE AS DATE), CAST(strptime(GAME_DATE, '%b %d, %Y') AS DATE))",
+        },
+    ),
+    "player_stats": TableSpec(
+        columns=[
+            ("PLAYER_ID", "BIGINT"), ("season", "VARCHAR"), ("PLAYER_NAME", "VARCHAR"), ("TEAM_ID", "BIGINT"),
+            ("TEAM_ABBREVIATION", "VARCHAR"), ("AGE", "DOUBLE"), ("GP", "INTEGER"), ("MIN", "DOUBLE"),
+            ("FGM", "DOUBLE"), ("FGA", "DOUBLE"), ("FG3M", "DOUBLE"), ("FG3A", "DOUBLE"), ("FTM", "DOUBLE"),
+            ("FTA", "DOUBLE"), ("OREB", "DOUBLE"), ("DREB", "DOUBLE"), ("REB", "DOUBLE"), ("AST", "DOUBLE"),
+            ("TOV", "DOUBLE"), ("STL", "DOUBLE"), ("BLK", "DOUBLE"), ("PF", "DOUBLE"), ("PTS", "DOUBLE"),
+            ("PLUS_MINUS", "DOUBLE"),
+        ],
+        key=("PLAYER_ID", "season"),
+        load_exprs={},
+    ),
+    # BBR slug <-> nba_api PLAYER_ID links from processing.identity.
+    "player_identity": TableSpec(
+        columns=[("bbr_id", "VARCHAR"), ("nba_id", "BIGINT"), ("method", "VARCHAR"), ("score", "DOUBLE")],
+        key=("bbr_id",),
+        load_exprs={},
+    ),
+}
+
+# Raw entity name -> warehouse table.
+RAW_ENTITY_TABLES = {"salaries": "salaries", "contracts": "contracts", "team_gamelogs": "team_gamelogs", "player_stats": "player_stats"}
+
+
+@dataclass(frozen=True)
+class SalaryRow:
+    player_id: str | None
+    player: str
+    team: str
+    year: int
+    salary: int | None
+
+
+@dataclass(frozen=True)
+class GameRow:
+    team_id: int
+    game_id: str
+    game_date: date
+    matchup: str
+    wl: str
+    pts: int
+    plus_minus: int | None
+
+
+class Warehouse:
+    """Long-lived DuckDB warehouse with keyed upserts and typed query helpers.
+
+    One connection per database file is shared for the process (see
+    `storage.connect`); each call runs on its own cursor so threads can query
+    concurrently.
+    """
+
+    def __init__(self, path: Path = WAREHOUSE_PATH):
+        self.path = path
+        self._con = connect(path)
+        self._lock = threading.Lock()
+        self._ensure_tables()
+
+    def cursor(self) -> ddb.DuckDBPyConnection:
+        return self._con.cursor()
+
+    def _ensure_tables(self) -> None:
+        cur = self.cursor()
+        for name, spec in TABLES.items():
+            cols = ", ".join(f'"{c}" {t}' for c, t in spec.columns)
+            key = ", ".join(f'"{k}"' for k in spec.key)
+            cur.execute(f"CREATE TABLE IF NOT EXISTS {name} ({cols}, PRIMARY KEY ({key}))")
+
+    def _upsert_from(self, table: str, source_sql: str, order: str, constants: Dict[str, Any] | None = None) -> int:
+        """INSERT OR REPLACE from a relation, keeping the last row per key within the batch.
+
+        `order` is an SQL expression giving the source's row order (e.g. the reader's
+        line number); it decides the last row and the order of merged text.
+        Returns the net number of new rows.
+        """
+        spec = TABLES[table]
+        constants = constants or {}
+        exprs = []
+        for col, typ in spec.columns:
+            if col in constants:
+                exprs.append(f"CAST(? AS {typ}) AS {_q(col)}")
+            else:
+                exprs.append(f"TRY_CAST({spec.load_exprs.get(col, _q(col))} AS {typ}) AS {_q(col)}")
+        params = [constants[c] for c, _ in spec.columns if c in constants]
+        cols = ", ".join(_q(c) for c, _ in spec.columns)
+        key = ", ".join(_q(k) for k in spec.key)
+        inner = f"SELECT {', '.join(exprs)}, row_number() OVER (ORDER BY {order}) AS _rn FROM {source_sql}"
+        if spec.merge:
+            aggs = [
+                _q(c) if c in spec.key else f"{spec.merge[c]} AS {_q(c)}" if c in spec.merge else f"arg_max({_q(c)}, _rn) AS {_q(c)}"
+                for c, _ in spec.columns
+            ]
+            sql = f"INSERT OR REPLACE INTO {table} SELECT {', '.join(aggs)} FROM ({inner}) GROUP BY {key}"
+        else:
+            sql = (
+                f"INSERT OR REPLACE INTO {table} SELECT {cols} FROM ({inner}) "
+                f"QUALIFY row_number() OVER (PARTITION BY {key} ORDER BY _rn DESC) = 1"
+            )
+        with self._lock:
+            cur = self.cursor()
+            before = cur.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+            cur.execute(sql, params)
+            after = cur.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+        return after - before
+
+    def load_jsonl(self, table: str, path: Path, **constants: Any) -> int:
+        """Bulk-load a raw JSONL file with DuckDB's reader (no pandas). Returns net new rows."""
+        spec = TABLES[table]
+        # Read every column as text (absent keys load as NULL) and cast in SQL.
+        wanted = {c: ("VARCHAR[]" if t.endswith("[]") else "VARCHAR") for c, t in spec.columns if c not in constants}
+        columns = "{" + ", ".join(f"'{c}': '{t}'" for c, t in wanted.items()) + "}"
+        src = f"read_json('{_sql_path(path)}', format='newline_delimited', columns={columns}) WITH ORDINALITY"
+        return self._upsert_from(table, src, "ordinality", constants)
+
+    def load_parquet(self, table: str, dataset_root: Path) -> int:
+        """Bulk-load a Hive-partitioned Parquet dataset written by `export-parquet`."""
+        src = (
+            f"read_parquet('{_sql_path(dataset_root)}/**/*.parquet', hive_partitioning=true, union_by_name=true, "
+            "filename=true, file_row_number=true)"
+        )
+        return self._upsert_from(table, src, "filename, file_row_number")
+
+    def sync_raw(self, source: str | None = None, entity: str | None = None) -> Dict[str, int]:
+        """Upsert every known raw JSONL file (of `entity`, if given) into its table, then the identity links.
+
+        Returns net new rows per table.
+        """
+        out: Dict[str, int] = {}
+        for _, entity, path, fields, _ in raw_files(source, entity):
+            table = RAW_ENTITY_TABLES.get(entity)
+            if table is None:
+                continue
+            constants = {"season": fields["season"]} if table in ("team_gamelogs", "player_stats") else {}
+            out[table] = out.get(table, 0) + self.load_jsonl(table, path, **constants)
+        out["player_identity"] = self.sync_identity(get_identity_index())
+        return out
+
+    def sync_identity(self, index: IdentityIndex) -> int:
+        """Replace the player_identity table with the index's current links."""
+        rows = [(slug, link["nba_id"], link["method"], link["score"]) for slug, link in index.links.items()]
+        with self._lock:
+            cur = self.cursor()
+            before = cur.execute("SELECT count(*) FROM player_identity").fetchone()[0]
+            cur.execute("BEGIN")
+            cur.execute("DELETE FROM player_identity")
+            if rows:
+                cur.executemany("INSERT INTO player_identity VALUES (?, ?, ?, ?)", rows)
+            cur.execute("COMMIT")
+            after = cur.execute("SELECT count(*) FROM player_identity").fetchone()[0]
+        return after - before
+
+    # --- typed query helpers -------------------------------------------------
+
+    def salaries(self, team: str | None = None, year: int | None = None) -> List[SalaryRow]:
+        where, params = _filters({"team": team, "year": year})
+        rows = self.cursor().execute(
+            f"SELECT player_id, player, team, year, salary FROM salaries {where} ORDER BY team, salary DESC NULLS LAST", params
+        ).fetchall()
+        return [SalaryRow(*r) for r in rows]
+
+    def salaries_by_nba_id(self) -> Dict[int, List[SalaryRow]]:
+        """Salaries per nba_api PLAYER_ID through player_identity, oldest year first.
+
+        Each row is one (year, team), with salaries from multiple contracts already summed.
+        """
+        rows = self.cursor().execute(
+            """
+            SELECT i.nba_id, s.player_id, s.player, s.team, s.year, s.salary
+            FROM salaries s JOIN player_identity i ON i.bbr_id = s.player_id
+            WHERE s.salary > 0
+            ORDER BY i.nba_id, s.year, s.team
+            """
+        ).fetchall()
+        out: Dict[int, List[SalaryRow]] = {}
+        for nba_id, *row in rows:
+            out.setdefault(int(nba_id), []).append(SalaryRow(*row))
+        return out
+
+    def team_payrolls(self, year: int) -> Dict[str, int]:
+        rows = self.cursor().execute(
+            "SELECT team, COALESCE(SUM(salary), 0) FROM salaries WHERE year = ? GROUP BY team ORDER BY team", [year]
+        ).fetchall()
+        return {team: int(total) for team, total in rows}
+
+    def salary_stats(self, year: int) -> Iterator[Dict[str, Any]]:
+        """Salaries for a BBR season year joined to that season's nba_api stats via player_identity."""
+        season = f"{year - 1}-{str(year)[-2:]}"
+        return self.query(
+            """
+            SELECT s.team, s.player, s.salary, p.PLAYER_ID, p.GP, p.MIN, p.PTS, p.REB, p.AST
+            FROM salaries s
+            JOIN player_identity i ON i.bbr_id = s.player_id
+            LEFT JOIN player_stats p ON p.PLAYER_ID = i.nba_id AND p.season = ?
+            WHERE s.year = ?
+            ORDER BY s.salary DESC NULLS LAST
+            """,
+            [season, year],
+        )
+
+    def team_ids(self, season: str) -> List[int]:
+        rows = self.cursor().execute("SELECT DISTINCT TEAM_ID FROM team_gamelogs WHERE season = ? ORDER BY 1", [season]).fetchall()
+        return [r[0] for r in rows]
+
+    def recent_games(self, season: str, n: int = 10, team_id: int | None = None) -> Dict[int, List[GameRow]]:
+        """Last `n` games per team, oldest first (top-k per team in SQL)."""
+        where, params = _filters({"season": season, "TEAM_ID": team_id})
+        rows = self.cursor().execute(
+            f"""
+            SELECT TEAM_ID, Game_ID, GAME_DATE, MATCHUP, WL, PTS, PLUS_MINUS FROM team_gamelogs {where}
+            QUALIFY row_number() OVER (PARTITION BY TEAM_ID ORDER BY GAME_DATE DESC, Game_ID DESC) <= ?
+            ORDER BY TEAM_ID, GAME_DATE, Game_ID
+            """,
+            [*params, n],
+        ).fetchall()
+        out: Dict[int, List[GameRow]] = {}
+        for r in rows:
+            out.setdefault(r[0], []).append(GameRow(*r))
+        return out
+
+    def query(self, sql: str, params: Sequence[Any] = ()) -> Iterator[Dict[str, Any]]:
+        cur = self.cursor().execute(sql, list(params))
+        names = [d[0] for d in cur.description]
+        for row in cur.fetchall():
+            yield dict(zip(names, row))
+
+
+def _filters(values: Dict[str, Any]) -> Tuple[str, List[Any]]:
+    conds = [(f'"{k}" = ?', v) for k, v in values.items() if v is not None]
+    if not conds:
+        return "", []
+    return "WHERE " + " AND ".join(c for c, _ in conds), [v for _, v in conds]
+
+
+def _q(name: str) -> str:
+    return f'"{name}"'
+
+
+def _sql_path(path: Path) -> str:
+    return str(path).replace("'", "''")
+
+
+_default: Warehouse | None = None
+_default_lock = threading.Lock()
+
+
+def get_warehouse() -> Warehouse:
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = Warehouse()
+        return _default